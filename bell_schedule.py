@@ -0,0 +1,200 @@
+# bell_schedule.py
+"""
+Bảng giờ tiết học (tiết -> giờ bắt đầu / kết thúc).
+
+Mặc định là bảng giờ đang dùng từ trước (DEFAULT_PERIODS). Có thể khai báo
+thêm bảng giờ khác cho từng cơ sở / học kỳ trong config.json:
+
+    "bell_schedules": {
+        "co_so_2": {"1": ["07:00", "07:45"], "2": ["07:50", "08:35"], ...}
+    },
+    "bell_schedule": "co_so_2",                  # bảng giờ mặc định
+    "bell_schedule_by_semester": {"38": "default"}
+
+Bảng giờ được kiểm tra 1 lần lúc đọc config (tiết là số nguyên dương, giờ
+hợp lệ, bắt đầu < kết thúc, các tiết không chồng nhau) rồi dùng lại cho cả
+đợt parse. Chuỗi tiết lạ không còn bị âm thầm đổi thành 07:00-07:45 mà
+được đếm lại để báo.
+"""
+import hashlib
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+
+DEFAULT_PERIODS: dict[int, tuple[str, str]] = {
+    1: ("070000", "075000"),
+    2: ("075500", "084500"),
+    3: ("085000", "094000"),
+    4: ("095000", "104000"),
+    5: ("104500", "113500"),
+    6: ("123000", "132000"),
+    7: ("132500", "141500"),
+    8: ("142000", "151000"),
+    9: ("152000", "161000"),
+    10: ("161500", "170500"),
+    11: ("173000", "182000"),
+    12: ("182500", "191500"),
+    13: ("192000", "201000"),
+    14: ("201500", "210500"),
+}
+
+# giờ gán cho buổi có chuỗi tiết không đọc được (giữ như code cũ)
+FALLBACK_TIME = ("070000", "074500")
+
+DEFAULT_NAME = "default"
+
+_PERIOD_RE = re.compile(r"^\s*(\d+)\s*->\s*(\d+)\s*$")
+_TIME_RE = re.compile(r"^(\d{1,2}):?(\d{2})(?::?(\d{2}))?$")
+
+
+@dataclass(frozen=True)
+class PeriodSlot:
+    """Kết quả đọc 1 chuỗi tiết, vd. "1 -> 3"."""
+    first: int
+    last: int
+    start: str   # "HHMMSS"
+    end: str     # "HHMMSS"
+
+
+def normalize_time(value: str) -> str:
+    """'7:00' / '07:00:00' / '070000' -> '070000'. Sai format -> ValueError."""
+    m = _TIME_RE.match(str(value).strip())
+    if not m:
+        raise ValueError(f"giờ không hợp lệ: {value!r}")
+    h, mi, s = int(m.group(1)), int(m.group(2)), int(m.group(3) or 0)
+    if h > 23 or mi > 59 or s > 59:
+        raise ValueError(f"giờ không hợp lệ: {value!r}")
+    return f"{h:02d}{mi:02d}{s:02d}"
+
+
+@dataclass
+class BellSchedule:
+    """
+    1 bảng giờ đã kiểm tra. lookup() đọc chuỗi tiết có cache (số chuỗi tiết
+    khác nhau rất ít), time_of() trả giờ dùng khi parse và đếm tiết lạ.
+    """
+    periods: dict[int, tuple[str, str]]
+    name: str = DEFAULT_NAME
+    unknown: Counter = field(default_factory=Counter, compare=False, repr=False)
+
+    def __post_init__(self):
+        self.periods = self._validate(self.periods)
+        self._cache: dict[str, PeriodSlot | None] = {}
+        self._lock = threading.Lock()
+
+    def _validate(self, periods: dict) -> dict[int, tuple[str, str]]:
+        if not periods:
+            raise ValueError(f"bảng giờ '{self.name}' rỗng")
+        clean: dict[int, tuple[str, str]] = {}
+        for key, value in periods.items():
+            try:
+                idx = int(key)
+                start, end = value
+            except (TypeError, ValueError):
+                raise ValueError(f"bảng giờ '{self.name}': tiết {key!r} sai format, cần [bắt đầu, kết thúc]")
+            if idx <= 0:
+                raise ValueError(f"bảng giờ '{self.name}': số tiết phải > 0 (gặp {key!r})")
+            start, end = normalize_time(start), normalize_time(end)
+            if start >= end:
+                raise ValueError(f"bảng giờ '{self.name}': tiết {idx} bắt đầu sau khi kết thúc")
+            clean[idx] = (start, end)
+
+        ordered = sorted(clean.items())
+        for (i, (_, end_i)), (j, (start_j, _)) in zip(ordered, ordered[1:]):
+            if start_j < end_i:
+                raise ValueError(f"bảng giờ '{self.name}': tiết {j} chồng lên tiết {i}")
+        return dict(ordered)
+
+    # pickle (process pool) không mang theo lock / cache
+    def __getstate__(self):
+        return {"periods": self.periods, "name": self.name, "unknown": Counter()}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def fingerprint(self) -> str:
+        """Hash nội dung bảng giờ (để cache parse biết bảng giờ đã đổi)."""
+        raw = ";".join(f"{i}={s}-{e}" for i, (s, e) in self.periods.items())
+        return hashlib.sha1(raw.encode("ascii")).hexdigest()[:16]
+
+    def lookup(self, lesson_period: str) -> PeriodSlot | None:
+        """'1 -> 3' -> PeriodSlot(1, 3, giờ đầu tiết 1, giờ cuối tiết 3); None nếu không đọc được."""
+        try:
+            return self._cache[lesson_period]
+        except KeyError:
+            pass
+        slot = None
+        m = _PERIOD_RE.match(lesson_period)
+        if m:
+            first, last = int(m.group(1)), int(m.group(2))
+            if first <= last and first in self.periods and last in self.periods:
+                slot = PeriodSlot(first, last, self.periods[first][0], self.periods[last][1])
+        self._cache[lesson_period] = slot
+        return slot
+
+    def time_of(self, lesson_period: str) -> tuple[str, str]:
+        """(start, end) của chuỗi tiết; tiết lạ -> FALLBACK_TIME và được đếm vào unknown."""
+        slot = self.lookup(lesson_period)
+        if slot is None:
+            with self._lock:
+                self.unknown[lesson_period] += 1
+            return FALLBACK_TIME
+        return slot.start, slot.end
+
+    def count_unknown(self, sessions) -> int:
+        """Đếm tiết lạ trong các Session không parse lại (lấy từ cache / process khác)."""
+        missed = Counter(s.lesson_period for s in sessions if self.lookup(s.lesson_period) is None)
+        with self._lock:
+            self.unknown.update(missed)
+        return sum(missed.values())
+
+    def reset_unknown(self):
+        with self._lock:
+            self.unknown.clear()
+
+    def report_unknown(self, limit: int = 10) -> str | None:
+        """Chuỗi báo các tiết lạ đã gặp (None nếu không có)."""
+        if not self.unknown:
+            return None
+        total = sum(self.unknown.values())
+        top = ", ".join(f"'{p}' x{n}" for p, n in self.unknown.most_common(limit))
+        more = "" if len(self.unknown) <= limit else f" và {len(self.unknown) - limit} loại khác"
+        return (
+            f"⚠️ {total} buổi có tiết không có trong bảng giờ '{self.name}' "
+            f"(đã gán {FALLBACK_TIME[0][:2]}:{FALLBACK_TIME[0][2:4]}-"
+            f"{FALLBACK_TIME[1][:2]}:{FALLBACK_TIME[1][2:4]}): {top}{more}"
+        )
+
+
+DEFAULT_BELLS = BellSchedule(DEFAULT_PERIODS)
+
+
+@dataclass
+class BellConfig:
+    """Các bảng giờ đặt tên + bảng nào dùng cho học kỳ nào."""
+    schedules: dict[str, BellSchedule] = field(default_factory=lambda: {DEFAULT_NAME: DEFAULT_BELLS})
+    default: str = DEFAULT_NAME
+    by_semester: dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_config(cls, config: dict) -> "BellConfig":
+        """Đọc từ dict config.json (xem docstring module). Sai format -> ValueError."""
+        schedules = {DEFAULT_NAME: DEFAULT_BELLS}
+        for name, periods in (config.get("bell_schedules") or {}).items():
+            if not isinstance(periods, dict):
+                raise ValueError(f"bảng giờ '{name}' phải là object {{tiết: [bắt đầu, kết thúc]}}")
+            schedules[str(name)] = BellSchedule(periods, name=str(name))
+
+        default = str(config.get("bell_schedule") or DEFAULT_NAME)
+        by_semester = {str(k): str(v) for k, v in (config.get("bell_schedule_by_semester") or {}).items()}
+        for used in [default, *by_semester.values()]:
+            if used not in schedules:
+                raise ValueError(f"không có bảng giờ '{used}' trong bell_schedules")
+        return cls(schedules=schedules, default=default, by_semester=by_semester)
+
+    def for_semester(self, semester: str | None = None) -> BellSchedule:
+        name = self.by_semester.get(str(semester), self.default) if semester is not None else self.default
+        return self.schedules[name]
@@ -0,0 +1,149 @@
+# bench_conflicts.py
+"""
+So logic.find_conflicts (mask theo ngày) với find_conflicts bản gốc (sort
+theo chuỗi ngày / giờ, tách lại "dd-mm-yyyy" cho từng buổi, rồi so từng cặp
+trong ngày) trên lịch giả lập của nhiều sinh viên, mỗi người chọn vài môn
+học đều đặn mỗi tuần suốt học kỳ.
+
+Kết quả 2 cách phải giống hệt nhau (cùng các cặp, cùng thứ tự, cùng object);
+test tự động: tests/test_conflicts.py.
+
+    py bench_conflicts.py
+    py bench_conflicts.py --students 2000 --courses 10 --weeks 18 --clash 0.3
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+from typing import List, Tuple
+
+from bell_schedule import DEFAULT_BELLS
+from logic import find_conflicts
+from models import Session, make_session
+
+
+# ===== BẢN GỐC (copy nguyên từ logic.py trước khi tối ưu, để đo và so kết quả) =====
+
+def _date_sort_key(date_str: str):
+    """
+    date_str: 'dd-mm-yyyy' -> key (yyyy, mm, dd) để sort đúng.
+    """
+    d, m, y = date_str.split('-')
+    return int(y), int(m), int(d)
+
+
+def baseline_find_conflicts(sessions: List[Session]) -> List[Tuple[Session, Session]]:
+    """
+    Tìm các cặp buổi học bị trùng.
+    Điều kiện trùng: cùng ngày + khoảng thời gian overlap.
+    """
+    sessions_sorted = sorted(
+        sessions,
+        key=lambda s: (_date_sort_key(s.date), s.start, s.end)
+    )
+
+    conflicts: List[Tuple[Session, Session]] = []
+    n = len(sessions_sorted)
+
+    for i in range(n):
+        si = sessions_sorted[i]
+        for j in range(i + 1, n):
+            sj = sessions_sorted[j]
+
+            # khác ngày thì không cần xét tiếp cho si
+            if sj.date != si.date:
+                break
+
+            # Kiểm tra overlap: start_j < end_i và end_j > start_i
+            if sj.start < si.end and sj.end > si.start:
+                conflicts.append((si, sj))
+
+    return conflicts
+
+
+# ===== LỊCH GIẢ LẬP =====
+
+
+def build_course(rnd: random.Random, code: int, first_monday: date, weeks: int) -> List[Session]:
+    """1 môn: 1-2 buổi / tuần, cùng thứ + cùng tiết suốt học kỳ."""
+    sessions = []
+    for _ in range(rnd.choice([1, 1, 2])):
+        weekday = rnd.randrange(6)
+        p1 = rnd.randint(1, 12)
+        period = f"{p1} -> {min(14, p1 + rnd.randint(1, 2))}"
+        start, end = DEFAULT_BELLS.time_of(period)
+        for w in range(weeks):
+            d = first_monday + timedelta(weeks=w, days=weekday)
+            sessions.append(make_session(
+                f"{code:012d}", f"Môn {code}", "Lý thuyết", 0, period,
+                "GV", "2A08", d.strftime("%d-%m-%Y"), start, end, "D20CQCN01-N",
+            ))
+    return sessions
+
+
+def build_students(args) -> List[List[Session]]:
+    rnd = random.Random(args.seed)
+    first_monday = date(2025, 8, 4)
+    catalog = [build_course(rnd, 1000 + i, first_monday, args.weeks) for i in range(args.catalog)]
+
+    students = []
+    for _ in range(args.students):
+        if rnd.random() < args.clash:
+            chosen = rnd.sample(catalog, args.courses)   # chọn bừa, dễ trùng
+        else:
+            # chọn lần lượt môn không trùng với các môn đã chọn (lịch "sạch")
+            chosen = []
+            for course in rnd.sample(catalog, len(catalog)):
+                if not find_conflicts([s for c in chosen for s in c] + course):
+                    chosen.append(course)
+                if len(chosen) == args.courses:
+                    break
+        students.append([s for course in chosen for s in course])
+    return students
+
+
+def timed(fn, students) -> tuple[float, list]:
+    t0 = time.perf_counter()
+    results = [fn(sessions) for sessions in students]
+    return time.perf_counter() - t0, results
+
+
+def same(a: list, b: list) -> bool:
+    return len(a) == len(b) and all(x[0] is y[0] and x[1] is y[1] for x, y in zip(a, b))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Đo find_conflicts: mask theo ngày vs bản gốc.")
+    ap.add_argument("--students", type=int, default=500)
+    ap.add_argument("--courses", type=int, default=8, help="số môn mỗi sinh viên")
+    ap.add_argument("--catalog", type=int, default=120, help="số môn để chọn")
+    ap.add_argument("--weeks", type=int, default=15)
+    ap.add_argument("--clash", type=float, default=0.2, help="tỉ lệ sinh viên chọn bừa (có trùng)")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    students = build_students(args)
+    n = sum(map(len, students))
+
+    best_old = best_new = float("inf")
+    for _ in range(args.repeat):
+        t_old, old = timed(baseline_find_conflicts, students)
+        t_new, new = timed(find_conflicts, students)
+        best_old, best_new = min(best_old, t_old), min(best_new, t_new)
+
+    mismatch = [i for i, (a, b) in enumerate(zip(old, new)) if not same(a, b)]
+    pairs = sum(map(len, new))
+    clashing = sum(1 for r in new if r)
+
+    print(f"{len(students)} lịch, {n:,} buổi, {clashing} lịch có trùng, {pairs:,} cặp trùng")
+    print(f"  bản gốc (sort chuỗi + so từng cặp): {best_old * 1000:8.1f} ms")
+    print(f"  mới (mask theo ngày)               : {best_new * 1000:8.1f} ms  (x{best_old / best_new:.1f})")
+    if mismatch:
+        print(f"❌ {len(mismatch)} lịch cho kết quả khác nhau, vd. lịch #{mismatch[0]}")
+        raise SystemExit(1)
+    print("✅ Kết quả giống hệt bản gốc")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+# bench_download.py
+"""
+Đo hiệu năng downloader với portal giả lập ở local (mock_portal.py),
+không gọi vào portal thật.
+
+Mỗi engine tải cùng 1 danh sách lớp vào 1 thư mục tạm riêng rồi báo:
+  - lớp/giây, số lớp OK / lỗi
+  - p50 / p95 thời gian 1 lớp (DownloadResult.elapsed)
+  - tổng số byte ghi ra đĩa
+
+Ví dụ:
+    py bench_download.py
+    py bench_download.py --classes 500 --latency 0.05 --jitter 0.05 --error-rate 0.02
+    py bench_download.py --engines thread,async --workers 32 --rows 300 --fragment
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass
+
+from down_html import (
+    DEFAULT_RETRY,
+    DownloadConfig,
+    DownloadResult,
+    PortalSession,
+    download_classes,
+    download_for_class,
+)
+from mock_portal import start_mock_portal
+
+ENGINES = ["single", "thread", "async"]
+
+
+@dataclass
+class BenchResult:
+    engine: str
+    n: int
+    ok: int
+    failed: int
+    wall: float
+    p50: float
+    p95: float
+    bytes_written: int
+
+    @property
+    def rate(self) -> float:
+        return self.n / self.wall if self.wall > 0 else 0.0
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Percentile kiểu nearest-rank, q trong [0, 100]."""
+    if not values:
+        return 0.0
+    xs = sorted(values)
+    k = max(0, min(len(xs) - 1, round(q / 100 * len(xs) + 0.5) - 1))
+    return xs[k]
+
+
+def dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def run_single(class_codes, url, out_dir, timeout, store_mode, config, **_):
+    """Tải tuần tự bằng download_for_class, 1 PortalSession dùng chung."""
+    with PortalSession(url=url, pool_size=1, timeout=timeout) as portal:
+        return [
+            download_for_class(
+                code, portal=portal, out_dir=out_dir, url=url, timeout=timeout,
+                retry=DEFAULT_RETRY, store_mode=store_mode, config=config,
+            )
+            for code in class_codes
+        ]
+
+
+def run_batch(engine, class_codes, url, out_dir, timeout, store_mode, config,
+              workers, rate, max_failures):
+    return download_classes(
+        class_codes,
+        max_workers=workers,
+        out_dir=out_dir,
+        url=url,
+        timeout=timeout,
+        engine=engine,
+        rate=rate,
+        max_consecutive_failures=max_failures,
+        store_mode=store_mode,
+        config=config,
+    )
+
+
+def bench_engine(engine: str, class_codes: list[str], url: str, **kw) -> BenchResult:
+    out_dir = tempfile.mkdtemp(prefix=f"bench_{engine}_")
+    try:
+        t0 = time.perf_counter()
+        if engine == "single":
+            results: list[DownloadResult] = run_single(class_codes, url, out_dir, **kw)
+        else:
+            results = run_batch(engine, class_codes, url, out_dir, **kw)
+        wall = time.perf_counter() - t0
+
+        latencies = [r.elapsed for r in results if r.ok]
+        ok = sum(1 for r in results if r.ok)
+        return BenchResult(
+            engine=engine,
+            n=len(results),
+            ok=ok,
+            failed=len(results) - ok,
+            wall=wall,
+            p50=percentile(latencies, 50),
+            p95=percentile(latencies, 95),
+            bytes_written=dir_size(out_dir),
+        )
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+
+def print_report(rows: list[BenchResult]):
+    print(f"\n{'engine':<8} {'lớp':>5} {'ok':>5} {'lỗi':>5} {'giây':>7} "
+          f"{'lớp/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'KB ghi':>9}")
+    for r in rows:
+        print(f"{r.engine:<8} {r.n:>5} {r.ok:>5} {r.failed:>5} {r.wall:>7.2f} "
+              f"{r.rate:>8.1f} {r.p50 * 1000:>8.1f} {r.p95 * 1000:>8.1f} "
+              f"{r.bytes_written / 1024:>9.0f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark downloader với portal giả lập.")
+    ap.add_argument("--classes", type=int, default=200, help="số lớp mỗi lần chạy")
+    ap.add_argument("--engines", default=",".join(ENGINES),
+                    help=f"danh sách engine, cách nhau dấu phẩy ({', '.join(ENGINES)})")
+    ap.add_argument("--workers", type=int, default=16, help="số request đồng thời")
+    ap.add_argument("--rate", type=float, default=None, help="giới hạn request/giây")
+    ap.add_argument("--latency", type=float, default=0.02, help="độ trễ server (giây)")
+    ap.add_argument("--jitter", type=float, default=0.01, help="độ trễ ngẫu nhiên thêm (giây)")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="tỉ lệ POST trả 503")
+    ap.add_argument("--rows", type=int, default=40, help="số buổi học mỗi trang")
+    ap.add_argument("--fragment", action="store_true", help="chỉ lưu bảng lịch")
+    ap.add_argument("--timeout", type=float, default=10)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    engines = [e.strip() for e in args.engines.split(",") if e.strip()]
+    unknown = [e for e in engines if e not in ENGINES]
+    if unknown:
+        ap.error(f"engine không hợp lệ: {', '.join(unknown)}")
+
+    server, url = start_mock_portal(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        n_rows=args.rows,
+        seed=args.seed,
+    )
+    class_codes = [f"D{20 + i % 5}CQCN{i:04d}-N" for i in range(args.classes)]
+    config = DownloadConfig.from_dict({})
+    print(f"🚀 Mock portal {url}: latency={args.latency}s (+{args.jitter}s), "
+          f"error_rate={args.error_rate}, {args.rows} buổi/trang")
+
+    rows = []
+    try:
+        for engine in engines:
+            print(f"⏱  {engine} ...")
+            rows.append(bench_engine(
+                engine, class_codes, url,
+                timeout=args.timeout,
+                store_mode="fragment" if args.fragment else "full",
+                config=config,
+                workers=args.workers,
+                rate=args.rate,
+                # lỗi do bench cố tình sinh ra, không để breaker dừng đợt tải
+                max_failures=max(5, args.classes),
+            ))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    print_report(rows)
+    print(f"\nServer: {server.stats}")
+
+
+if __name__ == "__main__":
+    main()
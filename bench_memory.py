@@ -0,0 +1,108 @@
+# bench_memory.py
+"""
+Đo bộ nhớ của N buổi học (mặc định 100k) ở 2 dạng:
+  - trước: dataclass thường (có __dict__), mỗi dòng 1 bản sao chuỗi
+           (giống Session cũ, parser cũ trả về chuỗi mới cho từng ô)
+  - sau:   models.Session (frozen + slots) với chuỗi dùng chung qua intern()
+
+Dữ liệu lấy từ trang giả lập của mock_portal, parse bằng parser thật.
+
+    py bench_memory.py
+    py bench_memory.py --sessions 300000 --classes 800
+"""
+import argparse
+import gc
+import pickle
+import tracemalloc
+from dataclasses import dataclass
+
+import models
+from mock_portal import build_schedule_page
+from parser_html import parse_schedule_html
+
+
+@dataclass
+class LegacySession:
+    """Session như trước khi tối ưu: dataclass thường, không slots."""
+    course_code: str
+    subject_name: str
+    subject_type: str
+    group: int
+    lesson_period: str
+    lecturer_name: str
+    room: str
+    date: str
+    start: str
+    end: str
+    class_name: str
+
+
+def _copy_str(s: str) -> str:
+    # tạo object str mới cùng nội dung (như khi mỗi ô được get_text riêng)
+    return "".join([s[:1], s[1:]]) if len(s) > 1 else s
+
+
+def to_legacy(s: models.Session) -> LegacySession:
+    return LegacySession(*(
+        _copy_str(v) if type(v) is str else v
+        for v in (getattr(s, name) for name in models.SESSION_FIELDS)
+    ))
+
+
+def measure(build) -> tuple[int, object]:
+    """Số byte được cấp phát (còn sống) khi build() chạy xong."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, result
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Đo bộ nhớ Session trước / sau tối ưu.")
+    ap.add_argument("--sessions", type=int, default=100_000)
+    ap.add_argument("--classes", type=int, default=400, help="số lớp giả lập")
+    args = ap.parse_args()
+
+    rows_per_class = max(1, -(-args.sessions // args.classes))
+    pages = [
+        (f"D{20 + i % 5}CQCN{i:03d}-N", build_schedule_page(f"D{20 + i % 5}CQCN{i:03d}-N", n_rows=rows_per_class))
+        for i in range(args.classes)
+    ]
+
+    def parse_all():
+        sessions = []
+        for class_name, page in pages:
+            sessions.extend(parse_schedule_html(page, class_name))
+        return sessions[:args.sessions]
+
+    # dạng mới: bảng chuỗi bắt đầu rỗng để tính cả chuỗi được intern
+    models.clear_interned()
+    after, sessions = measure(parse_all)
+    n = len(sessions)
+
+    before, legacy = measure(lambda: [to_legacy(s) for s in sessions])
+    assert all(
+        getattr(a, f) == getattr(b, f)
+        for a, b in zip(legacy, sessions) for f in models.SESSION_FIELDS
+    )
+
+    # unpickle (cache parse / process pool) vẫn dùng chung chuỗi
+    blob = pickle.dumps(sessions[:1000])
+    restored = pickle.loads(blob)
+    shared = sum(a.subject_name is b.subject_name for a, b in zip(restored, sessions))
+
+    per = 100_000 / n
+    print(f"Số buổi học: {n:,} ({args.classes} lớp), {models.interned_count():,} chuỗi trong bảng")
+    print(f"  trước (dataclass + chuỗi riêng): {before / 1e6:8.1f} MB "
+          f"({before * per / 1e6:.1f} MB / 100k, {before / n:.0f} B/buổi)")
+    print(f"  sau   (slots + intern)         : {after / 1e6:8.1f} MB "
+          f"({after * per / 1e6:.1f} MB / 100k, {after / n:.0f} B/buổi)")
+    print(f"  giảm {100 * (1 - after / before):.0f}%")
+    print(f"  pickle -> unpickle dùng chung chuỗi: {shared}/{len(restored)}")
+
+
+if __name__ == "__main__":
+    main()
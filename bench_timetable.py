@@ -0,0 +1,111 @@
+# bench_timetable.py
+"""
+Đo logic.best_timetables (nhánh và cận) chạy 1 process và nhiều process
+trên 1 học kỳ giả lập: mỗi môn có nhiều lớp, mỗi lớp có buổi lý thuyết
+chung và vài nhóm thực hành, học đều mỗi tuần.
+
+Kết quả của mọi số process phải giống hệt chạy 1 process.
+
+    py bench_timetable.py
+    py bench_timetable.py --subjects 10 --classes 6 --groups 3 --workers 1,2,4,8
+"""
+import argparse
+import os
+import random
+import time
+from datetime import date, timedelta
+
+from bell_schedule import DEFAULT_BELLS
+from logic import ScoreWeights, SolverStats, best_timetables, build_course_options
+from models import Session, make_session
+
+
+def weekly_sessions(
+    rnd: random.Random, code: str, name: str, kind: str, group: int,
+    class_name: str, first_monday: date, weeks: int,
+) -> list[Session]:
+    weekday = rnd.randrange(6)
+    p1 = rnd.choice([1, 1, 4, 7, 7, 10, 12])
+    period = f"{p1} -> {min(14, p1 + 2)}"
+    start, end = DEFAULT_BELLS.time_of(period)
+    room = f"{rnd.choice('ABC')}{rnd.randint(1, 5)}-{rnd.randint(1, 20):02d}"
+    lecturer = f"GV {rnd.randint(1, 40)}"
+    return [
+        make_session(
+            code, name, kind, group, period, lecturer, room,
+            (first_monday + timedelta(weeks=w, days=weekday)).strftime("%d-%m-%Y"),
+            start, end, class_name,
+        )
+        for w in range(weeks)
+    ]
+
+
+def build_semester(args) -> tuple[dict, list[str]]:
+    rnd = random.Random(args.seed)
+    first_monday = date(2025, 8, 4)
+    sessions: list[Session] = []
+    subjects = []
+    for i in range(args.subjects):
+        code, name = f"{2000 + i:012d}", f"Môn {i + 1:02d}"
+        subjects.append(name)
+        for c in range(args.classes):
+            class_name = f"D25CQ{c + 1:02d}-N"
+            sessions += weekly_sessions(rnd, code, name, "Lý thuyết", 0, class_name, first_monday, args.weeks)
+            for g in range(1, args.groups + 1):
+                sessions += weekly_sessions(rnd, code, name, "Thực hành", g, class_name, first_monday, args.weeks)
+    return build_course_options(sessions), subjects
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Đo best_timetables 1 process vs nhiều process.")
+    ap.add_argument("--subjects", type=int, default=10, help="số môn muốn học")
+    ap.add_argument("--classes", type=int, default=5, help="số lớp mở cho mỗi môn")
+    ap.add_argument("--groups", type=int, default=3, help="số nhóm thực hành mỗi lớp")
+    ap.add_argument("--weeks", type=int, default=15)
+    ap.add_argument("--top", type=int, default=10)
+    ap.add_argument("--workers", default=None,
+                    help="các số process cần đo, vd 1,2,4 (mặc định 1,2,4,... tới số nhân CPU)")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    cpus = os.cpu_count() or 1
+    if args.workers:
+        counts = [int(x) for x in args.workers.split(",") if x.strip()]
+    else:
+        counts = [1]
+        while counts[-1] * 2 <= cpus:
+            counts.append(counts[-1] * 2)
+        if counts[-1] != cpus:
+            counts.append(cpus)
+
+    options, subjects = build_semester(args)
+    per_subject = len(options) // len(subjects)
+    print(
+        f"{len(subjects)} môn x {per_subject} lựa chọn = {per_subject ** len(subjects):,} tổ hợp, "
+        f"top {args.top}, máy có {cpus} nhân"
+    )
+
+    weights = ScoreWeights()
+    baseline = None
+    t_serial = None
+    for workers in counts:
+        stats = SolverStats()
+        t0 = time.perf_counter()
+        ranked = best_timetables(options, subjects, k=args.top, weights=weights, workers=workers, stats=stats)
+        elapsed = time.perf_counter() - t0
+        if baseline is None:
+            baseline, t_serial = ranked, elapsed
+        same = "✅" if ranked == baseline else "❌ khác kết quả 1 process"
+        print(
+            f"  {workers:>2} process: {elapsed:7.2f} s  (x{t_serial / elapsed:4.2f})  "
+            f"{stats.nodes:>10,} bước, {stats.solutions:,} lịch chấm điểm  {same}"
+        )
+        if ranked != baseline:
+            raise SystemExit(1)
+
+    if baseline:
+        print(f"Lịch tốt nhất: {baseline[0].summary()}")
+
+
+if __name__ == "__main__":
+    main()
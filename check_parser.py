@@ -0,0 +1,110 @@
+# check_parser.py
+"""
+Đối chiếu engine parse "fast" với engine "bs4" (code gốc):
+mọi file phải ra đúng cùng 1 danh sách Session, theo đúng thứ tự.
+
+    py check_parser.py                      # html_all_classes + trang mẫu
+    py check_parser.py path/to/html_dir     # thư mục khác (đọc cả thư mục con học kỳ)
+
+Ngoài các file trên đĩa còn chạy trên trang sinh bởi mock_portal và vài
+trang HTML "khó" (entity, <br>, comment, dòng kết thúc, bảng bị cắt cụt...).
+Thoát với mã 1 nếu có file khác nhau.
+
+Bản tự động chạy trên các trang mẫu cố định: tests/test_parser_engines.py
+(py -m pytest tests).
+"""
+import os
+import sys
+import time
+
+from mock_portal import build_schedule_page
+from parser_html import build_schedule_fragment, extract_schedule_tables, parse_schedule_html
+
+EDGE_CASES = {
+    "entities-br-comment": (
+        '<table class="table table-lich_hoc"><tr><th>Mã</th></tr>'
+        "<tr><td> 001 </td><td>An&nbsp;toàn &amp; bảo mật<br/>(Lý thuyết: 30 tiết)"
+        "<!-- ghi chú --> Nhóm 3</td><td>1 -&gt; 3</td><td><b>Trần</b> Thị B</td>"
+        "<td>A101</td><td>Thứ 2 (11-08-2025)</td></tr></table>"
+    ),
+    "ket-thuc-row": (
+        '<table class="table-lich_hoc"><tr><td>x</td><td>Kết thúc học phần</td></tr>'
+        "<tr><td>002</td><td>Mạng<br>(Thực hành: 48 tiết)</td><td>13 -&gt; 14</td>"
+        "<td>Lê Văn C</td><td>PM01</td><td>Từ: 01-09-2025<br>Đến: 01-09-2025</td></tr></table>"
+    ),
+    "two-tables-and-other-table": (
+        '<table class="menu"><tr><td>không phải lịch</td></tr></table>'
+        + "".join(
+            f'<table class="table table-lich_hoc"><tr><td>00{i}</td><td>Môn {i}<br>'
+            f"(Lý thuyết: 30 tiết)</td><td>{i} -&gt; {i + 1}</td><td>GV</td><td>P{i}</td>"
+            f"<td>0{i}-10-2025</td></tr></table>"
+            for i in range(1, 4)
+        )
+    ),
+    "bad-period-and-date": (
+        '<table class="table-lich_hoc"><tr><td>003</td><td>Môn lạ (Lý thuyết: 15 tiết)</td>'
+        "<td>?</td><td></td><td>Online</td><td>chưa xếp</td></tr></table>"
+    ),
+    "truncated": (
+        '<table class="table-lich_hoc"><tr><td>004</td><td>Môn cụt<br>(Lý thuyết: 30 tiết)</td>'
+        "<td>2 -&gt; 4</td><td>GV</td><td>B302</td><td>05-11-2025</td>"
+    ),
+}
+
+
+def iter_samples(html_dir: str):
+    """Yield (tên, class_name, html) của mọi mẫu cần đối chiếu."""
+    for name, html in EDGE_CASES.items():
+        yield f"<edge:{name}>", "EDGE", html
+
+    for i in range(20):
+        code = f"D2{i % 5}CQCN{i:02d}-N"
+        page = build_schedule_page(code, n_rows=30 + i * 7)
+        yield f"<mock:{code}>", code, page
+        fragment = build_schedule_fragment(extract_schedule_tables(page), code, "37", "")
+        yield f"<mock-fragment:{code}>", code, fragment
+
+    if not os.path.isdir(html_dir):
+        return
+    for root, _, files in os.walk(html_dir):
+        for filename in sorted(files):
+            if not filename.lower().endswith(".html"):
+                continue
+            path = os.path.join(root, filename)
+            with open(path, "r", encoding="utf-8") as f:
+                yield path, os.path.splitext(filename)[0], f.read()
+
+
+def main():
+    html_dir = sys.argv[1] if len(sys.argv) > 1 else "html_all_classes"
+    timings = {"bs4": 0.0, "fast": 0.0}
+    checked = 0
+    mismatched = []
+
+    for name, class_name, html in iter_samples(html_dir):
+        out = {}
+        for engine in timings:
+            t0 = time.perf_counter()
+            try:
+                out[engine] = parse_schedule_html(html, class_name, engine=engine)
+            except Exception as e:
+                out[engine] = f"{type(e).__name__}: {e}"
+            timings[engine] += time.perf_counter() - t0
+
+        checked += 1
+        if out["bs4"] != out["fast"]:
+            mismatched.append(name)
+            print(f"⛔ Khác nhau: {name}")
+            print(f"   bs4 : {out['bs4']!r:.300}")
+            print(f"   fast: {out['fast']!r:.300}")
+
+    print(f"\n=== Đã so {checked} trang, {len(mismatched)} trang khác nhau ===")
+    print(f"bs4: {timings['bs4']:.2f}s, fast: {timings['fast']:.2f}s "
+          f"(nhanh hơn {timings['bs4'] / max(timings['fast'], 1e-9):.1f} lần)")
+    if mismatched:
+        sys.exit(1)
+    print("✅ Hai engine cho kết quả giống hệt nhau.")
+
+
+if __name__ == "__main__":
+    main()
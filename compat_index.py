@@ -0,0 +1,178 @@
+# compat_index.py
+"""
+Chỉ mục "option nào trùng lịch với option nào" cho các option của
+logic.build_course_options, dùng cho bộ lọc "chỉ hiện lớp không trùng".
+
+Mỗi option được đánh 1 số bit. Với từng ngày, các option được gom theo
+khoảng giờ (start_min, end_min) của buổi học: by_day[day][(start, end)] là
+bitset các option có buổi đúng khoảng đó. Số khoảng giờ khác nhau trong 1
+ngày rất ít (vài chục tổ hợp tiết), nên:
+
+  - hàng trùng của 1 option = OR các bitset có khoảng giờ chồng lên khoảng
+    giờ của nó (tính khi cần, có cache theo ngày)
+  - lọc = OR hàng trùng của các option đã chọn, rồi bỏ các bit đó
+
+    index = CompatibilityIndex(options)
+    index.sync(options)                     # sau mỗi lần options đổi
+    keys = index.filter_compatible(keys, selected_keys)
+
+Cùng điều kiện trùng với logic.find_conflicts: cùng ngày và
+start_a < end_b, start_b < end_a; buổi không rõ ngày (day = 0) bỏ qua.
+"""
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from logic import find_conflicts
+from models import Session
+
+Interval = Tuple[int, int]          # (start_min, end_min)
+Slot = Tuple[int, int, int]         # (day, start_min, end_min)
+
+
+def option_slots(sessions: Iterable[Session]) -> Tuple[Slot, ...]:
+    """Các (ngày, giờ) khác nhau của 1 option, bỏ buổi không rõ ngày."""
+    return tuple(dict.fromkeys((s.day, s.start_min, s.end_min) for s in sessions if s.day))
+
+
+class CompatibilityIndex:
+    """Bitset option trùng lịch, cập nhật được từng option (sync)."""
+
+    def __init__(self, options: Dict[Tuple, List[Session]] | None = None):
+        self._bit: Dict[Tuple, int] = {}               # key -> số bit
+        self._keys: List[Tuple | None] = []            # số bit -> key
+        self._free: List[int] = []                     # số bit đã bỏ, dùng lại
+        self._sessions: Dict[Tuple, List[Session]] = {}  # list đã index (so `is` khi sync)
+        self._slots: Dict[Tuple, Tuple[Slot, ...]] = {}
+        self._by_day: Dict[int, Dict[Interval, int]] = {}
+        self._self_conflict = 0                        # option tự trùng với chính nó
+        self._union_cache: Dict[int, Dict[Interval, int]] = {}
+        self._row_cache: Dict[Tuple, int] = {}
+        if options:
+            self.sync(options)
+
+    def __len__(self) -> int:
+        return len(self._bit)
+
+    def __contains__(self, key) -> bool:
+        return key in self._bit
+
+    # ===== CẬP NHẬT =====
+
+    def add(self, key: Tuple, sessions: List[Session]):
+        if key in self._bit:
+            self.remove(key)
+        bit = self._free.pop() if self._free else len(self._keys)
+        if bit == len(self._keys):
+            self._keys.append(key)
+        else:
+            self._keys[bit] = key
+        self._bit[key] = bit
+        self._sessions[key] = sessions
+
+        flag = 1 << bit
+        slots = option_slots(sessions)
+        self._slots[key] = slots
+        for day, start, end in slots:
+            intervals = self._by_day.setdefault(day, {})
+            intervals[(start, end)] = intervals.get((start, end), 0) | flag
+            self._union_cache.pop(day, None)
+        if find_conflicts(sessions):
+            self._self_conflict |= flag
+        self._row_cache.clear()
+
+    def remove(self, key: Tuple):
+        bit = self._bit.pop(key, None)
+        if bit is None:
+            return
+        del self._sessions[key]
+        self._keys[bit] = None
+        self._free.append(bit)
+
+        mask = ~(1 << bit)
+        for day, start, end in self._slots.pop(key):
+            intervals = self._by_day[day]
+            left = intervals[(start, end)] & mask
+            if left:
+                intervals[(start, end)] = left
+            else:
+                del intervals[(start, end)]
+                if not intervals:
+                    del self._by_day[day]
+            self._union_cache.pop(day, None)
+        self._self_conflict &= mask
+        self._row_cache.clear()
+
+    def sync(self, options: Dict[Tuple, List[Session]]) -> Tuple[int, int]:
+        """
+        Cho index khớp với options: bỏ key không còn, thêm key mới / key có
+        list Session khác (merge_course_options luôn tạo list mới cho lớp
+        vừa đổi). Trả về (số option thêm, số option bỏ).
+        """
+        removed = [k for k in self._bit if k not in options]
+        for key in removed:
+            self.remove(key)
+        added = 0
+        for key, sessions in options.items():
+            if self._sessions.get(key) is not sessions:
+                self.add(key, sessions)
+                added += 1
+        return added, len(removed)
+
+    # ===== TRA CỨU =====
+
+    def _overlap_union(self, day: int, interval: Interval) -> int:
+        """OR bitset các option có buổi trong ngày day chồng lên interval."""
+        cache = self._union_cache.setdefault(day, {})
+        union = cache.get(interval)
+        if union is None:
+            start, end = interval
+            union = 0
+            for (s, e), flags in self._by_day[day].items():
+                if s < end and start < e:
+                    union |= flags
+            cache[interval] = union
+        return union
+
+    def conflicts_of(self, key: Tuple) -> int:
+        """Bitset các option khác trùng lịch với key."""
+        row = self._row_cache.get(key)
+        if row is None:
+            row = 0
+            for day, start, end in self._slots[key]:
+                row |= self._overlap_union(day, (start, end))
+            row &= ~(1 << self._bit[key])
+            self._row_cache[key] = row
+        return row
+
+    def flag(self, key: Tuple) -> int:
+        """Bitset chỉ có bit của key."""
+        return 1 << self._bit[key]
+
+    def conflicting_keys(self, key: Tuple) -> List[Tuple]:
+        row = self.conflicts_of(key)
+        return [k for k, bit in self._bit.items() if row >> bit & 1]
+
+    def self_conflicting(self, key: Tuple) -> bool:
+        return bool(self._self_conflict >> self._bit[key] & 1)
+
+    def compatible(self, a: Tuple, b: Tuple) -> bool:
+        return not self.conflicts_of(a) >> self._bit[b] & 1
+
+    def blocked_by(self, selected_keys: Sequence[Tuple]) -> int:
+        """Bitset option trùng với ít nhất 1 option trong selected_keys."""
+        blocked = 0
+        for key in selected_keys:
+            if key in self._bit:
+                blocked |= self.conflicts_of(key)
+        return blocked
+
+    def filter_compatible(self, keys: Iterable[Tuple], selected_keys: Sequence[Tuple]) -> List[Tuple]:
+        """
+        Các key không trùng với option nào trong selected_keys và không tự
+        trùng với chính nó (cùng kết quả với cách GUI lọc trước đây).
+        Chưa chọn gì thì trả lại nguyên keys.
+        """
+        if not selected_keys:
+            return list(keys)
+        blocked = self.blocked_by(selected_keys) | self._self_conflict
+        bit_of = self._bit
+        return [k for k in keys if k not in bit_of or not blocked >> bit_of[k] & 1]
@@ -1,6 +1,23 @@
 import os
+import re
+import html
 import json
-import requests
+import time
+import random
+import asyncio
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable
+
+# Không import requests / httpx / đọc config.json ở đây: main_gui import
+# module này lúc khởi động, nên mọi thứ nặng (requests, httpx, parser,
+# config) chỉ được nạp khi thật sự tải lần đầu (xem DownloadConfig,
+# _requests(), _httpx()).
+from html_cache import DownloadCache
 
 # ===== ĐỌC CONFIG TỪ FILE =====
 
@@ -56,14 +73,8 @@ def load_config(path: str = "config.json") -> dict:
     return data
 
 
-config = load_config()
-
 # ===== PHẦN THAM SỐ BẠN CUNG CẤP =====
 
-cookies = {
-    'ASP.NET_SessionId': 'xd4ueq1hlynzey1yhaxc0qvl',
-}
-
 headers = {
     'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
     'accept-language': 'vi,en-US;q=0.9,en;q=0.8',
@@ -89,6 +100,8 @@ params = {
 }
 
 # data_template: copy nguyên data đang chạy được
+# (__VIEWSTATE / __VIEWSTATEGENERATOR ở đây chỉ là dự phòng khi không
+#  lấy được state mới từ portal, xem PortalSession)
 data_template = {
     '__EVENTTARGET': '',
     '__EVENTARGUMENT': '',
@@ -104,46 +117,961 @@ data_template = {
     'ctl00$ucRight1$rdSinhVien': '1',
 }
 
-# === APPLY CONFIG (override các key có trong config.json) ===
-for k, v in config.items():
-    data_template[k] = v
+
+@dataclass
+class DownloadConfig:
+    """
+    Cấu hình cho downloader, truyền tường minh vào download_* thay vì đọc
+    config.json lúc import module.
+      - form: các field form ASP.NET ghi đè data_template (vd. cboHocKy)
+    """
+    form: dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DownloadConfig":
+        """
+        Lấy cấu hình từ dict config.json đã đọc sẵn (vd. self.config của GUI).
+        Chỉ lấy các field của form ASP.NET, các key khác ("classes",
+        "download_engine", ...) là cấu hình của app, không gửi lên server.
+        """
+        return cls(form={
+            k: str(v) for k, v in data.items()
+            if k.startswith(("ctl00$", "__"))
+        })
+
+    @classmethod
+    def load(cls, path: str = "config.json") -> "DownloadConfig":
+        """Đọc (và tạo nếu chưa có) config.json như load_config."""
+        return cls.from_dict(load_config(path))
+
+    def form_data(self) -> dict:
+        """Bản copy data_template đã áp cấu hình, dùng cho 1 request."""
+        return {**data_template, **self.form}
+
+
+_default_config: DownloadConfig | None = None
+
+
+def default_config() -> DownloadConfig:
+    """
+    Cấu hình mặc định khi bên gọi không truyền config: đọc config.json ở
+    thư mục hiện tại, chỉ 1 lần, vào lúc tải lần đầu (không phải lúc import).
+    """
+    global _default_config
+    if _default_config is None:
+        _default_config = DownloadConfig.load()
+    return _default_config
+
+
+def _requests():
+    """Import requests lúc cần (lần đầu gửi request), không phải lúc import module."""
+    import requests
+    return requests
+
+
+def _httpx():
+    """Import httpx lúc cần (engine "async"), không phải lúc import module."""
+    try:
+        import httpx
+    except ImportError as e:
+        raise ImportError("engine 'async' cần thư viện httpx (pip install httpx)") from e
+    return httpx
 
 # ===== HÀM GỬI REQUEST CHO TỪNG LỚP =====
 
-def download_for_class(class_code: str):
+PORTAL_URL = 'https://sinhvien.epu.edu.vn/XemLichHoc.aspx'
+OUT_DIR = "html_all_classes"
+
+
+@dataclass
+class DownloadResult:
+    """
+    Kết quả tải lịch của 1 lớp.
+      - status: 'ok' nếu đã lưu file mới,
+                'unchanged' nếu tải lại nhưng nội dung y hệt (không ghi file),
+                'cached' nếu bỏ qua vì vừa tải trong TTL của cache,
+                'error' nếu lỗi (HTTP / mạng) sau khi đã thử lại,
+                'skipped' nếu không tải vì circuit breaker đã ngắt,
+                'cancelled' nếu bị huỷ giữa chừng
+      - attempts: số lần đã gửi request
+      - semester: học kỳ đã tải (None = học kỳ mặc định trong config, thư mục phẳng)
+      - elapsed: thời gian request (giây)
+      - size: số byte HTML đã ghi
+      - html: nội dung đã lưu, chỉ giữ lại khi gọi với keep_html=True
+    """
+    class_code: str
+    status: str
+    status_code: int | None = None
+    elapsed: float = 0.0
+    size: int = 0
+    path: str | None = None
+    error: str | None = None
+    attempts: int = 0
+    semester: str | None = None
+    html: str | None = field(default=None, repr=False)
+
+    @property
+    def ok(self) -> bool:
+        return self.status in ('ok', 'unchanged', 'cached')
+
+
+def make_session(pool_size: int = 10) -> "requests.Session":
+    """
+    Tạo 1 requests.Session dùng chung (keep-alive, gzip) cho cả đợt tải.
+    pool_size nên >= số luồng tải song song.
+    """
+    requests = _requests()
+    session = requests.Session()
+    session.headers.update(headers)
+    session.headers['accept-encoding'] = 'gzip, deflate'
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=pool_size,
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+# ===== SESSION ASP.NET (__VIEWSTATE + cookie lấy mới mỗi lần chạy) =====
+
+STATE_TTL = 600          # giây, sau thời gian này lấy lại state
+CONNECT_TIMEOUT = 5      # giây, timeout lúc kết nối (đọc dùng timeout riêng)
+
+_HIDDEN_INPUT_RE = re.compile(r"<input\b[^>]*>", re.IGNORECASE)
+_ATTR_RE = re.compile(r"""(\w+)\s*=\s*(?:"([^"]*)"|'([^']*)')""")
+
+
+def extract_hidden_fields(page: str) -> dict[str, str]:
+    """
+    Lấy các field ẩn của ASP.NET (__VIEWSTATE, __VIEWSTATEGENERATOR,
+    __EVENTVALIDATION, ...) từ HTML của trang.
+    """
+    fields: dict[str, str] = {}
+    for tag in _HIDDEN_INPUT_RE.findall(page):
+        attrs = {
+            m.group(1).lower(): m.group(2) if m.group(2) is not None else m.group(3)
+            for m in _ATTR_RE.finditer(tag)
+        }
+        name = attrs.get("name", "")
+        if attrs.get("type", "").lower() == "hidden" and name.startswith("__"):
+            fields[name] = html.unescape(attrs.get("value", ""))
+    return fields
+
+
+def is_state_rejected(resp: "requests.Response | httpx.Response", url: str = PORTAL_URL) -> bool:
+    """
+    Đoán xem server có từ chối __VIEWSTATE / session hiện tại không:
+      - lỗi 500 kiểu "Validation of viewstate MAC failed"
+      - bị redirect sang trang khác (hết session -> trang lỗi / đăng nhập)
+      - trả về 200 nhưng không còn là trang form (không có __VIEWSTATE)
+    """
+    if resp.status_code == 500 and "viewstate" in resp.text.lower():
+        return True
+    if resp.history and str(resp.url).split("?")[0].lower() != url.lower():
+        return True
+    if resp.status_code == 200 and "__VIEWSTATE" not in resp.text:
+        return True
+    return False
+
+
+@dataclass
+class PortalState:
+    """State ASP.NET lấy được từ 1 lần GET trang XemLichHoc.aspx."""
+    fields: dict[str, str]
+    fetched_at: float
+    ttl: float
+
+    def expired(self) -> bool:
+        return time.monotonic() - self.fetched_at >= self.ttl
+
+
+def _portal_state(fields: dict[str, str], t0: float, state_ttl: float) -> PortalState:
+    """State từ các field ẩn vừa GET được, không có __VIEWSTATE thì dùng tạm state cũ trong data_template."""
+    if "__VIEWSTATE" in fields:
+        print(f"🔑 Đã lấy state mới từ portal ({time.perf_counter() - t0:.2f}s)")
+        ttl = state_ttl
+    else:
+        print("⚠️ Không thấy __VIEWSTATE trên trang, dùng state mặc định.")
+        fields = {
+            k: v for k, v in data_template.items()
+            if k in ('__VIEWSTATE', '__VIEWSTATEGENERATOR')
+        }
+        ttl = min(state_ttl, 60)  # thử lấy lại sớm
+    return PortalState(fields, time.monotonic(), ttl)
+
+
+class PortalSession:
+    """
+    Gói requests.Session + state ASP.NET dùng chung cho mọi POST trong 1 đợt tải.
+
+      - Lần POST đầu tiên (hoặc khi state hết hạn) GET trang 1 lần để lấy
+        __VIEWSTATE / __VIEWSTATEGENERATOR / cookie mới.
+      - Nếu server từ chối state (is_state_rejected), lấy lại state 1 lần
+        rồi gửi lại; nhiều luồng cùng gặp lỗi thì cũng chỉ lấy lại 1 lần.
+      - GET lỗi thì dùng tạm state cũ trong data_template.
+    """
+
+    def __init__(
+        self,
+        url: str = PORTAL_URL,
+        pool_size: int = 10,
+        state_ttl: float = STATE_TTL,
+        timeout: float = 30,
+    ):
+        self.url = url
+        self.state_ttl = state_ttl
+        self.timeout = timeout
+        self.session = make_session(pool_size=pool_size)
+        self._state: PortalState | None = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def _bootstrap(self):
+        """GET trang portal, lấy state mới (gọi khi đang giữ self._lock)."""
+        requests = _requests()
+        t0 = time.perf_counter()
+        try:
+            resp = self.session.get(
+                self.url,
+                params=params,
+                timeout=(CONNECT_TIMEOUT, self.timeout),
+            )
+            fields = extract_hidden_fields(resp.text) if resp.status_code == 200 else {}
+        except requests.RequestException as e:
+            print(f"⚠️ Không lấy được state từ portal: {e}")
+            fields = {}
+
+        self._state = _portal_state(fields, t0, self.state_ttl)
+        self._generation += 1
+
+    def state(self) -> tuple[PortalState, int]:
+        """Trả về (state hiện tại, số thế hệ), tự lấy mới nếu chưa có / hết hạn."""
+        with self._lock:
+            if self._state is None or self._state.expired():
+                self._bootstrap()
+            return self._state, self._generation
+
+    def refresh(self, seen_generation: int):
+        """Lấy lại state, trừ khi luồng khác đã làm việc này sau seen_generation."""
+        with self._lock:
+            if self._generation == seen_generation:
+                self._bootstrap()
+
+    def post(self, data: dict, headers: dict | None = None) -> "requests.Response":
+        """POST form lên portal với state hiện tại, tự lấy lại state 1 lần nếu bị từ chối."""
+        for attempt in range(2):
+            state, generation = self.state()
+            resp = self.session.post(
+                self.url,
+                params=params,
+                data={**data, **state.fields},
+                headers=headers,
+                timeout=(CONNECT_TIMEOUT, self.timeout),
+            )
+            if attempt == 0 and is_state_rejected(resp, self.url):
+                print("🔄 Server từ chối state, lấy lại state mới...")
+                self.refresh(generation)
+                continue
+            return resp
+        return resp
+
+
+class AsyncPortalSession:
+    """
+    Bản asyncio của PortalSession trên httpx.AsyncClient: cùng cách lấy /
+    lấy lại state ASP.NET, nhưng request là I/O bất đồng bộ thật. Huỷ
+    coroutine đang chờ response là đóng luôn kết nối đó, không còn request
+    nào chạy ngầm sau khi huỷ.
+
+    timeout: giây cho mỗi lần đọc / ghi / chờ kết nối trong pool
+    (kết nối mới: CONNECT_TIMEOUT), giống timeout của PortalSession.
+    """
+
+    def __init__(
+        self,
+        url: str = PORTAL_URL,
+        pool_size: int = 10,
+        state_ttl: float = STATE_TTL,
+        timeout: float = 30,
+    ):
+        httpx = _httpx()
+        self.url = url
+        self.state_ttl = state_ttl
+        self.timeout = timeout
+        self.client = httpx.AsyncClient(
+            headers={**headers, 'accept-encoding': 'gzip, deflate'},
+            timeout=httpx.Timeout(timeout, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size,
+            ),
+            follow_redirects=True,  # như requests, để is_state_rejected thấy redirect
+        )
+        self._state: PortalState | None = None
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def _bootstrap(self):
+        """GET trang portal, lấy state mới (gọi khi đang giữ self._lock)."""
+        httpx = _httpx()
+        t0 = time.perf_counter()
+        try:
+            resp = await self.client.get(self.url, params=params)
+            fields = extract_hidden_fields(resp.text) if resp.status_code == 200 else {}
+        except httpx.HTTPError as e:
+            print(f"⚠️ Không lấy được state từ portal: {e!r}")
+            fields = {}
+
+        self._state = _portal_state(fields, t0, self.state_ttl)
+        self._generation += 1
+
+    async def state(self) -> tuple[PortalState, int]:
+        """Trả về (state hiện tại, số thế hệ), tự lấy mới nếu chưa có / hết hạn."""
+        async with self._lock:
+            if self._state is None or self._state.expired():
+                await self._bootstrap()
+            return self._state, self._generation
+
+    async def refresh(self, seen_generation: int):
+        """Lấy lại state, trừ khi coroutine khác đã làm việc này sau seen_generation."""
+        async with self._lock:
+            if self._generation == seen_generation:
+                await self._bootstrap()
+
+    async def post(self, data: dict, headers: dict | None = None) -> "httpx.Response":
+        """POST form lên portal với state hiện tại, tự lấy lại state 1 lần nếu bị từ chối."""
+        for attempt in range(2):
+            state, generation = await self.state()
+            resp = await self.client.post(
+                self.url,
+                params=params,
+                data={**data, **state.fields},
+                headers=headers,
+            )
+            if attempt == 0 and is_state_rejected(resp, self.url):
+                print("🔄 Server từ chối state, lấy lại state mới...")
+                await self.refresh(generation)
+                continue
+            return resp
+        return resp
+
+
+# ===== THỬ LẠI + CIRCUIT BREAKER =====
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    Thử lại khi lỗi 5xx / timeout / mất kết nối, chờ theo exponential backoff
+    có jitter: lần thử thứ n chờ ngẫu nhiên trong [0, min(max_delay, base_delay * 2^(n-1))].
+    """
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+NO_RETRY = RetryPolicy(max_attempts=1)
+DEFAULT_RETRY = RetryPolicy()
+
+
+class CircuitBreaker:
+    """
+    Ngắt cả đợt tải sau `threshold` lớp lỗi LIÊN TIẾP (đã tính thử lại),
+    để không dội tiếp request vào portal đang quá tải. threshold=0 = tắt.
+    """
+
+    def __init__(self, threshold: int = 5):
+        self.threshold = threshold
+        self.failures = 0
+        self._open = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._open
+
+    def record(self, ok: bool):
+        with self._lock:
+            if ok:
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.threshold and self.failures >= self.threshold and not self._open:
+                self._open = True
+                print(f"🛑 {self.failures} lớp lỗi liên tiếp, dừng tải các lớp còn lại.")
+
+
+def failed_classes(results: list[DownloadResult]) -> list[str]:
+    """Danh sách lớp chưa tải được (lỗi / bị ngắt / bị huỷ) để tải lại sau."""
+    return list(dict.fromkeys(r.class_code for r in results if not r.ok))
+
+
+def download_for_class(
+    class_code: str,
+    portal: PortalSession | None = None,
+    out_dir: str = OUT_DIR,
+    url: str = PORTAL_URL,
+    timeout: float = 30,
+    cache: DownloadCache | None = None,
+    retry: RetryPolicy = NO_RETRY,
+    store_mode: str = "full",
+    keep_html: bool = False,
+    semester: str | None = None,
+    config: DownloadConfig | None = None,
+) -> DownloadResult:
     """
     Gửi 1 POST y hệt request mẫu, chỉ đổi tên lớp.
-    Lưu HTML vào html_all_classes/<class_code>.html
+    Lưu HTML vào <out_dir>/<class_code>.html
+
+    Nếu truyền portal (PortalSession) thì dùng lại kết nối + __VIEWSTATE
+    của đợt tải (xem download_classes), không thì tự mở 1 PortalSession
+    riêng cho lớp này.
+
+    Nếu truyền cache (html_cache.DownloadCache):
+      - lớp vừa tải trong TTL -> bỏ qua, không gửi request
+      - nội dung không đổi so với lần trước -> không ghi đè file
+
+    retry: lỗi 5xx / timeout / mất kết nối thì thử lại theo RetryPolicy.
+
+    store_mode="fragment": chỉ lưu các bảng table-lich_hoc + metadata
+    (lớp, học kỳ, thời điểm tải) thay vì cả trang ASP.NET, file nhỏ hơn
+    nhiều và parse nhanh hơn.
+
+    keep_html=True: giữ nội dung vừa tải trong result.html để parse luôn
+    mà không phải đọc lại file (xem pipeline.py).
+
+    semester: tải học kỳ khác với config (cboHocKy), lưu riêng vào
+    <out_dir>/<semester>/<class_code>.html. None = học kỳ trong config,
+    lưu thẳng vào <out_dir> như cũ.
+
+    config: DownloadConfig (field form, học kỳ mặc định...). None = đọc
+    config.json ở thư mục hiện tại (default_config).
     """
-    data = data_template.copy()
-    data['ctl00$ContentPlaceHolder$txtMaLopHoc'] = class_code
+    requests = _requests()
+    data, semester_id, path = _class_request(class_code, out_dir, semester, config)
+
+    def result(status: str, **kw) -> DownloadResult:
+        return DownloadResult(class_code, status, semester=semester, **kw)
+
+    if cache is not None and cache.is_fresh(path, semester_id):
+        print(f"♻️ Bỏ qua lớp {class_code} (vừa tải trong {cache.ttl:.0f}s)")
+        return result('cached', path=path)
+
+    extra_headers = cache.validators(path, semester_id) if cache else {}
 
     print(f"\n=== Đang tải lịch cho lớp: {class_code} ===")
-    resp = requests.post(
-        'https://sinhvien.epu.edu.vn/XemLichHoc.aspx',
-        params=params,
-        cookies=cookies,
-        headers=headers,
-        data=data,
-        timeout=30,
+    t0 = time.perf_counter()
+    own = None
+    if portal is None:
+        portal = own = PortalSession(url=url, pool_size=1, timeout=timeout)
+    try:
+        attempt = 0
+        while True:
+            attempt += 1
+            error = None
+            try:
+                resp = portal.post(data, headers=extra_headers)
+            except (requests.Timeout, requests.ConnectionError) as e:
+                resp, error = None, e
+            except requests.RequestException as e:
+                elapsed = time.perf_counter() - t0
+                print(f"⛔ Lỗi tải lớp {class_code}: {e}")
+                return result('error', elapsed=elapsed, error=str(e), attempts=attempt)
+
+            retryable = resp is None or resp.status_code >= 500
+            if not retryable or attempt >= retry.max_attempts:
+                break
+            wait = retry.delay(attempt)
+            reason = error if resp is None else f"HTTP {resp.status_code}"
+            print(f"🔁 Lớp {class_code} lỗi ({reason}), thử lại sau {wait:.1f}s...")
+            time.sleep(wait)
+    finally:
+        if own is not None:
+            own.close()
+    elapsed = time.perf_counter() - t0
+
+    if resp is None:
+        print(f"⛔ Lỗi tải lớp {class_code}: {error}")
+        return result('error', elapsed=elapsed, error=str(error), attempts=attempt)
+
+    return _save_response(
+        resp, class_code, path, semester_id, cache, store_mode, keep_html, result,
+        elapsed=elapsed, attempts=attempt,
     )
 
+
+def _class_request(
+    class_code: str,
+    out_dir: str,
+    semester: str | None,
+    config: DownloadConfig | None,
+) -> tuple[dict, str, str]:
+    """(form data, mã học kỳ, đường dẫn file .html) để tải 1 lớp."""
+    data = (config or default_config()).form_data()
+    data['ctl00$ContentPlaceHolder$txtMaLopHoc'] = class_code
+    if semester is not None:
+        data['ctl00$ContentPlaceHolder$cboHocKy'] = semester
+        out_dir = os.path.join(out_dir, semester)
+    semester_id = str(data.get('ctl00$ContentPlaceHolder$cboHocKy', ''))
+    return data, semester_id, os.path.join(out_dir, f"{class_code}.html")
+
+
+def _save_response(
+    resp: "requests.Response | httpx.Response",
+    class_code: str,
+    path: str,
+    semester_id: str,
+    cache: DownloadCache | None,
+    store_mode: str,
+    keep_html: bool,
+    result: Callable[..., DownloadResult],
+    **kw,
+) -> DownloadResult:
+    """
+    Xử lý response cuối cùng của 1 lớp (304 / lỗi HTTP / lưu file + cache),
+    dùng chung cho download_for_class và download_for_class_async.
+    kw (elapsed, attempts) được chép vào DownloadResult.
+    """
+    if resp.status_code == 304 and cache is not None:
+        cache.touch(path)
+        print(f"♻️ Lớp {class_code} không đổi (304)")
+        return result('unchanged', status_code=304, path=path, **kw)
+
     if resp.status_code != 200:
         print(f"⛔ Lỗi {resp.status_code} cho lớp {class_code}")
         print("----- RESPONSE (trích) -----")
         print(resp.text[:400])
         print("----------------------------")
-        return
+        return result(
+            'error',
+            status_code=resp.status_code,
+            error=f"HTTP {resp.status_code}",
+            **kw,
+        )
 
-    out_dir = "html_all_classes"
-    os.makedirs(out_dir, exist_ok=True)
-    path = os.path.join(out_dir, f"{class_code}.html")
-    with open(path, "w", encoding="utf-8") as f:
-        f.write(resp.text)
+    text = resp.text
+    content = None
+    if store_mode == "fragment":
+        from parser_html import build_schedule_fragment, extract_schedule_tables
+        tables = extract_schedule_tables(text)
+        content = "".join(tables).encode("utf-8")
+        text = build_schedule_fragment(
+            tables, class_code, semester_id,
+            datetime.now().isoformat(timespec="seconds"),
+        )
+    body = text.encode("utf-8")
+    kept = text if keep_html else None
+
+    if cache is not None:
+        written = cache.store(
+            class_code, semester_id, path, body,
+            etag=resp.headers.get('ETag'),
+            last_modified=resp.headers.get('Last-Modified'),
+            content=content,
+        )
+        if not written:
+            print(f"♻️ Lớp {class_code} không đổi, giữ nguyên file: {path}")
+            return result(
+                'unchanged',
+                status_code=resp.status_code,
+                size=len(body),
+                path=path,
+                html=kept,
+                **kw,
+            )
+    else:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(body)
     print(f"✅ Đã lưu: {path}")
+    return result(
+        'ok',
+        status_code=resp.status_code,
+        size=len(body),
+        path=path,
+        html=kept,
+        **kw,
+    )
+
+
+async def download_for_class_async(
+    class_code: str,
+    portal: AsyncPortalSession,
+    out_dir: str = OUT_DIR,
+    cache: DownloadCache | None = None,
+    retry: RetryPolicy = NO_RETRY,
+    store_mode: str = "full",
+    keep_html: bool = False,
+    semester: str | None = None,
+    config: DownloadConfig | None = None,
+) -> DownloadResult:
+    """
+    Bản asyncio của download_for_class, tham số giống hệt (timeout lấy
+    theo portal). Mọi chỗ chờ mạng đều await trên AsyncPortalSession; đọc
+    cache + ghi file chạy ngay trên event loop (không await ở giữa), nên
+    lớp bị huỷ giữa chừng thì hoặc chưa ghi gì, hoặc đã ghi xong cả file
+    lẫn entry cache, không có request / ghi file nào chạy tiếp sau khi huỷ.
+    """
+    httpx = _httpx()
+    data, semester_id, path = _class_request(class_code, out_dir, semester, config)
+
+    def result(status: str, **kw) -> DownloadResult:
+        return DownloadResult(class_code, status, semester=semester, **kw)
+
+    if cache is not None and cache.is_fresh(path, semester_id):
+        print(f"♻️ Bỏ qua lớp {class_code} (vừa tải trong {cache.ttl:.0f}s)")
+        return result('cached', path=path)
+
+    extra_headers = cache.validators(path, semester_id) if cache else {}
+
+    print(f"\n=== Đang tải lịch cho lớp: {class_code} ===")
+    t0 = time.perf_counter()
+    attempt = 0
+    while True:
+        attempt += 1
+        error = None
+        try:
+            resp = await portal.post(data, headers=extra_headers)
+        except (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError) as e:
+            resp, error = None, e
+        except httpx.HTTPError as e:
+            elapsed = time.perf_counter() - t0
+            print(f"⛔ Lỗi tải lớp {class_code}: {e!r}")
+            return result('error', elapsed=elapsed, error=repr(e), attempts=attempt)
+
+        retryable = resp is None or resp.status_code >= 500
+        if not retryable or attempt >= retry.max_attempts:
+            break
+        wait = retry.delay(attempt)
+        reason = repr(error) if resp is None else f"HTTP {resp.status_code}"
+        print(f"🔁 Lớp {class_code} lỗi ({reason}), thử lại sau {wait:.1f}s...")
+        await asyncio.sleep(wait)
+    elapsed = time.perf_counter() - t0
+
+    if resp is None:
+        # httpx hay để message rỗng (vd. ReadTimeout('')), repr còn có tên lỗi
+        print(f"⛔ Lỗi tải lớp {class_code}: {error!r}")
+        return result('error', elapsed=elapsed, error=repr(error), attempts=attempt)
+
+    return _save_response(
+        resp, class_code, path, semester_id, cache, store_mode, keep_html, result,
+        elapsed=elapsed, attempts=attempt,
+    )
+
+
+def _download_guarded(
+    breaker: CircuitBreaker,
+    fetch: Callable[..., DownloadResult],
+    class_code: str,
+    semester: str | None,
+) -> DownloadResult:
+    """Gọi fetch (download_for_class) nhưng bỏ qua nếu breaker đã ngắt, và ghi nhận kết quả vào breaker."""
+    if breaker.is_open:
+        return DownloadResult(class_code, 'skipped', error="circuit open", semester=semester)
+    res = fetch(class_code, semester=semester)
+    breaker.record(res.ok)
+    return res
+
+
+def _batch_jobs(
+    class_codes: list[str],
+    semesters: list[str] | None,
+) -> list[tuple[str, str | None]]:
+    """Các cặp (lớp, học kỳ) cần tải, bỏ trùng, giữ thứ tự (theo học kỳ rồi theo lớp)."""
+    codes = list(dict.fromkeys(class_codes))
+    sems = list(dict.fromkeys(str(x) for x in semesters)) if semesters else [None]
+    return [(code, sem) for sem in sems for code in codes]
+
+
+def download_classes(
+    class_codes: list[str],
+    max_workers: int = 8,
+    out_dir: str = OUT_DIR,
+    url: str = PORTAL_URL,
+    timeout: float = 30,
+    on_result: Callable[[DownloadResult, int, int], None] | None = None,
+    engine: str = "thread",
+    rate: float | None = None,
+    cache: DownloadCache | None = None,
+    retry: RetryPolicy = DEFAULT_RETRY,
+    max_consecutive_failures: int = 5,
+    store_mode: str = "full",
+    keep_html: bool = False,
+    semesters: list[str] | None = None,
+    config: DownloadConfig | None = None,
+) -> list[DownloadResult]:
+    """
+    Tải lịch cho nhiều lớp cùng lúc:
+      - dùng chung 1 PortalSession (keep-alive, gzip, __VIEWSTATE lấy 1 lần)
+      - chạy qua ThreadPoolExecutor tối đa max_workers luồng
+
+    engine="async" thì chuyển sang download_classes_async (cần httpx)
+    (max_workers = số request đồng thời, rate = số request/giây).
+
+    cache: html_cache.DownloadCache dùng chung cho cả đợt, manifest được
+    ghi ra đĩa khi tải xong.
+
+    retry: chính sách thử lại cho từng lớp. Sau max_consecutive_failures lớp
+    lỗi liên tiếp thì ngắt (CircuitBreaker): các lớp còn lại có status
+    'skipped', lấy lại bằng failed_classes(results) để tải sau.
+
+    store_mode: "full" (cả trang) hoặc "fragment" (chỉ bảng lịch), xem
+    download_for_class.
+
+    semesters: list mã học kỳ (cboHocKy) -> tải mọi cặp (lớp, học kỳ) trong
+    cùng 1 đợt, mỗi học kỳ lưu vào <out_dir>/<semester>/. None = chỉ học kỳ
+    trong config, lưu thẳng vào <out_dir>.
+
+    config: DownloadConfig dùng chung cho cả đợt (None = default_config()).
+
+    on_result(result, done, total) được gọi ở luồng gọi hàm (không phải
+    luồng tải) mỗi khi 1 lớp xong, nên GUI có thể cập nhật tiến độ an toàn.
+
+    Trả về list DownloadResult theo thứ tự học kỳ rồi tới thứ tự class_codes.
+    """
+    if engine == "async":
+        return asyncio.run(download_classes_async(
+            class_codes,
+            concurrency=max_workers,
+            rate=rate,
+            out_dir=out_dir,
+            url=url,
+            timeout=timeout,
+            on_result=on_result,
+            cache=cache,
+            retry=retry,
+            max_consecutive_failures=max_consecutive_failures,
+            store_mode=store_mode,
+            keep_html=keep_html,
+            semesters=semesters,
+            config=config,
+        ))
+    if engine != "thread":
+        raise ValueError(f"engine không hợp lệ: {engine!r} (chỉ có 'thread' / 'async')")
+
+    jobs = _batch_jobs(class_codes, semesters)
+    if not jobs:
+        return []
+
+    workers = max(1, min(max_workers, len(jobs)))
+    results: dict[tuple[str, str | None], DownloadResult] = {}
+    breaker = CircuitBreaker(max_consecutive_failures)
+
+    with PortalSession(url=url, pool_size=workers, timeout=timeout) as portal, \
+            ThreadPoolExecutor(max_workers=workers) as pool:
+        fetch = partial(
+            download_for_class,
+            portal=portal, out_dir=out_dir, url=url, timeout=timeout, cache=cache,
+            retry=retry, store_mode=store_mode, keep_html=keep_html,
+            config=config or default_config(),
+        )
+        futures = {
+            pool.submit(_download_guarded, breaker, fetch, code, sem): (code, sem)
+            for code, sem in jobs
+        }
+        for done, fut in enumerate(as_completed(futures), start=1):
+            code, sem = futures[fut]
+            if fut.cancelled():
+                res = DownloadResult(code, 'skipped', error="circuit open", semester=sem)
+            else:
+                try:
+                    res = fut.result()
+                except Exception as e:
+                    res = DownloadResult(code, 'error', error=str(e), semester=sem)
+            results[code, sem] = res
+            if breaker.is_open:
+                # huỷ luôn các lớp chưa bắt đầu
+                for f in futures:
+                    f.cancel()
+            if on_result is not None:
+                on_result(res, done, len(jobs))
+
+    if cache is not None:
+        cache.save()
+    return [results[job] for job in jobs]
+
+
+# ===== ENGINE ASYNCIO (giới hạn đồng thời + số request/giây) =====
+
+class TokenBucket:
+    """
+    Bộ giới hạn tốc độ kiểu token bucket cho asyncio:
+    nạp `rate` token mỗi giây, tối đa `capacity` token (cho phép burst ngắn).
+    Mỗi request lấy 1 token, hết token thì chờ.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        if rate <= 0:
+            raise ValueError("rate phải > 0")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+async def download_classes_async(
+    class_codes: list[str],
+    concurrency: int = 50,
+    rate: float | None = None,
+    out_dir: str = OUT_DIR,
+    url: str = PORTAL_URL,
+    timeout: float = 30,
+    on_result: Callable[[DownloadResult, int, int], None] | None = None,
+    stop: threading.Event | None = None,
+    cache: DownloadCache | None = None,
+    retry: RetryPolicy = DEFAULT_RETRY,
+    max_consecutive_failures: int = 5,
+    store_mode: str = "full",
+    keep_html: bool = False,
+    semesters: list[str] | None = None,
+    config: DownloadConfig | None = None,
+) -> list[DownloadResult]:
+    """
+    Bản asyncio của download_classes, I/O bất đồng bộ thật (httpx, xem
+    AsyncPortalSession / download_for_class_async):
+      - tối đa `concurrency` request cùng lúc (asyncio.Semaphore + pool
+        kết nối cùng cỡ)
+      - tối đa `rate` request/giây (TokenBucket), None = không giới hạn
+      - mỗi lần kết nối / đọc / ghi có timeout riêng (CONNECT_TIMEOUT /
+        `timeout` giây); quá hạn thì thử lại theo `retry`, hết lượt thì
+        status 'error'
+      - `stop` (threading.Event) được set thì các lớp chưa chạy trả về
+        status 'cancelled'; huỷ coroutine thì request đang chờ bị ngắt
+        (đóng kết nối), lớp đó không ghi file / cache
+      - thử lại / circuit breaker / nhiều học kỳ giống download_classes
+
+    Cần thư viện httpx (chỉ import khi gọi hàm này).
+    """
+    jobs = _batch_jobs(class_codes, semesters)
+    if not jobs:
+        return []
+
+    workers = max(1, min(concurrency, len(jobs)))
+    limit = asyncio.Semaphore(workers)
+    bucket = TokenBucket(rate) if rate else None
+    breaker = CircuitBreaker(max_consecutive_failures)
+    results: dict[tuple[str, str | None], DownloadResult] = {}
+
+    portal = AsyncPortalSession(url=url, pool_size=workers, timeout=timeout)
+    download = partial(
+        download_for_class_async,
+        portal=portal, out_dir=out_dir, cache=cache, retry=retry,
+        store_mode=store_mode, keep_html=keep_html,
+        config=config or default_config(),
+    )
+
+    async def fetch(code: str, semester: str | None) -> DownloadResult:
+        async with limit:
+            if stop is not None and stop.is_set():
+                return DownloadResult(code, 'cancelled', error="cancelled", semester=semester)
+            if bucket is not None:
+                await bucket.acquire()
+            if breaker.is_open:
+                return DownloadResult(code, 'skipped', error="circuit open", semester=semester)
+            res = await download(code, semester=semester)
+            breaker.record(res.ok)
+            return res
+
+    tasks = {asyncio.ensure_future(fetch(code, s)): (code, s) for code, s in jobs}
+    try:
+        done = 0
+        pending = set(tasks)
+        while pending:
+            finished, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in finished:
+                code, s = tasks[task]
+                try:
+                    res = task.result()
+                except Exception as e:
+                    res = DownloadResult(code, 'error', error=str(e), semester=s)
+                results[code, s] = res
+                done += 1
+                if on_result is not None:
+                    on_result(res, done, len(jobs))
+    finally:
+        # huỷ các lớp còn lại (request đang chờ bị ngắt ngay) và đợi chúng
+        # dừng hẳn, rồi mới đóng client + ghi manifest cache
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await portal.aclose()
+        if cache is not None:
+            cache.save()
+
+    return [results[job] for job in jobs]
+
+
+def print_download_summary(results: list[DownloadResult]):
+    ok = [r for r in results if r.ok]
+    failed = [r for r in results if not r.ok]
+    skipped = sum(1 for r in results if r.status in ('cached', 'unchanged'))
+    total_time = sum(r.elapsed for r in results)
+    total_size = sum(r.size for r in results)
+    print(
+        f"\n=== Tải xong {len(ok)}/{len(results)} lớp, {skipped} lớp không đổi "
+        f"({total_size / 1024:.0f} KB, tổng thời gian request {total_time:.1f}s) ==="
+    )
+    for r in failed:
+        where = f" (học kỳ {r.semester})" if r.semester else ""
+        print(f"  ⛔ {r.class_code}{where}: {r.error}")
+    if failed:
+        print("Có thể tải lại các lớp này bằng cách nhập:")
+        print("  " + ",".join(failed_classes(results)))
 
 
 def main():
+    ap = argparse.ArgumentParser(description="Tải HTML lịch học theo lớp.")
+    ap.add_argument("--engine", choices=["thread", "async"], default="thread")
+    ap.add_argument("--workers", type=int, default=8,
+                    help="số request đồng thời")
+    ap.add_argument("--rate", type=float, default=None,
+                    help="giới hạn số request/giây (engine async)")
+    ap.add_argument("--fragment", action="store_true",
+                    help="chỉ lưu bảng lịch (file nhỏ, parse nhanh hơn)")
+    ap.add_argument("--semesters", default=None,
+                    help="tải nhiều học kỳ cùng lúc, vd: 37,38 "
+                         "(lưu vào html_all_classes/<học kỳ>/)")
+    ap.add_argument("--ttl", type=float, default=0,
+                    help="bỏ qua lớp đã tải trong vòng N giây (mặc định 0 = luôn tải)")
+    args = ap.parse_args()
+
     print("Nhập danh sách lớp muốn tải (cách nhau bằng dấu phẩy), ví dụ:")
     print("  D18QTANM,D18CQCN01-N,D20CQAT01-N")
     raw = input("Lớp: ").strip()
@@ -153,8 +1081,18 @@ def main():
         print("⛔ Không có lớp nào.")
         return
 
-    for cls in class_list:
-        download_for_class(cls)
+    results = download_classes(
+        class_list,
+        config=DownloadConfig.load(),
+        max_workers=args.workers,
+        engine=args.engine,
+        rate=args.rate,
+        cache=DownloadCache(OUT_DIR, ttl=args.ttl),
+        store_mode="fragment" if args.fragment else "full",
+        semesters=[x.strip() for x in args.semesters.split(",") if x.strip()]
+        if args.semesters else None,
+    )
+    print_download_summary(results)
 
 
 if __name__ == "__main__":
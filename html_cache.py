@@ -0,0 +1,171 @@
+# html_cache.py
+"""
+Manifest cache cho thư mục html_all_classes.
+
+File <out_dir>/_manifest.json ghi lại với mỗi file lịch (1 lớp của 1 học kỳ,
+khoá theo đường dẫn tương đối trong out_dir):
+  - fetched_at: lần cuối tải/kiểm tra (epoch giây)
+  - sha256, size: hash + kích thước nội dung đã lưu
+  - etag, last_modified: validator server trả về (nếu có)
+
+Nhờ đó:
+  - tải lại trong thời gian TTL thì bỏ qua hẳn, không gửi request
+  - tải lại mà nội dung không đổi thì KHÔNG ghi đè file (giữ nguyên mtime)
+
+Thư mục phẳng dùng cùng 1 đường dẫn cho mọi học kỳ (đổi cboHocKy trong
+config), nên entry của học kỳ khác với học kỳ đang tải được coi như chưa có.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+
+MANIFEST_NAME = "_manifest.json"
+
+
+@dataclass
+class CacheEntry:
+    class_code: str
+    semester: str
+    fetched_at: float
+    sha256: str
+    size: int
+    etag: str | None = None
+    last_modified: str | None = None
+
+
+class DownloadCache:
+    """
+    Cache dùng chung cho 1 đợt tải (an toàn khi gọi từ nhiều luồng).
+    ttl: số giây coi file vừa tải là còn mới (0 = luôn tải lại).
+    """
+
+    def __init__(self, out_dir: str, ttl: float = 3600):
+        self.out_dir = out_dir
+        self.ttl = ttl
+        self.path = os.path.join(out_dir, MANIFEST_NAME)
+        self._lock = threading.Lock()
+        self._entries: dict[str, CacheEntry] = {}
+        self._dirty = False
+        self._load()
+
+    def _key(self, path: str) -> str:
+        # "A.html" (thư mục phẳng) và "37/A.html" (theo học kỳ) là 2 entry khác nhau
+        return os.path.relpath(path, self.out_dir).replace(os.sep, "/")
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"⚠️ Manifest cache hỏng ({e}), bỏ qua.")
+            return
+
+        for key, item in raw.get("entries", {}).items():
+            try:
+                self._entries[key] = CacheEntry(**item)
+            except TypeError:
+                continue  # entry sai format -> coi như chưa có
+
+    def save(self):
+        """Ghi manifest ra đĩa (chỉ khi có thay đổi), ghi qua file tạm cho an toàn."""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"entries": {k: asdict(e) for k, e in self._entries.items()}}
+            os.makedirs(self.out_dir, exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self.path)
+            self._dirty = False
+
+    def get(self, path: str, semester: str | None = None) -> CacheEntry | None:
+        """Entry của path; có semester thì entry của học kỳ khác trả về None."""
+        with self._lock:
+            entry = self._entries.get(self._key(path))
+        if entry is not None and semester is not None and entry.semester != str(semester):
+            return None
+        return entry
+
+    def is_fresh(self, path: str, semester: str | None = None) -> bool:
+        """True nếu file (của đúng học kỳ semester) còn trên đĩa và được tải trong vòng ttl giây."""
+        entry = self.get(path, semester)
+        if entry is None or not os.path.exists(path):
+            return False
+        return time.time() - entry.fetched_at < self.ttl
+
+    def validators(self, path: str, semester: str | None = None) -> dict:
+        """Header If-None-Match / If-Modified-Since cho request có điều kiện."""
+        entry = self.get(path, semester)
+        if entry is None or not os.path.exists(path):
+            return {}
+        h = {}
+        if entry.etag:
+            h["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            h["If-Modified-Since"] = entry.last_modified
+        return h
+
+    def touch(self, path: str):
+        """Server báo không đổi (304): chỉ cập nhật thời điểm kiểm tra."""
+        with self._lock:
+            entry = self._entries.get(self._key(path))
+            if entry is not None:
+                entry.fetched_at = time.time()
+                self._dirty = True
+
+    def store(
+        self,
+        class_code: str,
+        semester: str,
+        path: str,
+        body: bytes,
+        etag: str | None = None,
+        last_modified: str | None = None,
+        content: bytes | None = None,
+    ) -> bool:
+        """
+        Ghi body vào path nếu nội dung khác lần trước.
+        Trả về True nếu đã ghi file, False nếu nội dung y hệt (file giữ nguyên).
+
+        content: phần dùng để so sánh nếu khác body (vd. body có kèm thời
+        điểm tải thì chỉ hash phần bảng lịch), mặc định = body.
+        """
+        digest = hashlib.sha256(body if content is None else content).hexdigest()
+        key = self._key(path)
+
+        with self._lock:
+            old = self._entries.get(key)
+        unchanged = (
+            old is not None
+            and old.semester == str(semester)
+            and old.sha256 == digest
+            and os.path.exists(path)
+            and os.path.getsize(path) == old.size
+        )
+
+        if not unchanged:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(body)
+            os.replace(tmp, path)
+
+        with self._lock:
+            self._entries[key] = CacheEntry(
+                class_code=class_code,
+                semester=semester,
+                fetched_at=time.time(),
+                sha256=digest,
+                size=old.size if unchanged else len(body),
+                etag=etag,
+                last_modified=last_modified,
+            )
+            self._dirty = True
+
+        return not unchanged
@@ -0,0 +1,87 @@
+# html_watch.py
+"""
+Theo dõi thư mục html_all_classes bằng cách so stat (size, mtime_ns) giữa
+2 lần poll, không cần thư viện watcher riêng của hệ điều hành.
+
+    watcher = HtmlDirWatcher(html_dir, semester)   # chụp trạng thái ban đầu
+    ...
+    changes = watcher.poll()
+    for class_name in changes.added + changes.changed: ...parse lại...
+    for class_name in changes.removed: ...bỏ lịch lớp đó...
+"""
+import os
+from dataclasses import dataclass, field
+
+from parser_html import semester_dir
+
+# class_name -> (size, mtime_ns)
+Snapshot = dict[str, tuple[int, int]]
+
+
+@dataclass
+class DirChanges:
+    added: list[str] = field(default_factory=list)
+    changed: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.changed or self.removed)
+
+    @property
+    def updated(self) -> list[str]:
+        """Các lớp cần parse lại (mới thêm + đã đổi)."""
+        return self.added + self.changed
+
+
+def snapshot_html_dir(html_dir: str) -> Snapshot:
+    """Stat các file .html (không tính thư mục con) trong html_dir."""
+    snap: Snapshot = {}
+    try:
+        entries = os.scandir(html_dir)
+    except FileNotFoundError:
+        return snap
+    with entries:
+        for entry in entries:
+            class_name, ext = os.path.splitext(entry.name)
+            if ext.lower() != ".html" or not entry.is_file():
+                continue
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue  # bị xoá / thay thế đúng lúc đang quét
+            snap[class_name] = (st.st_size, st.st_mtime_ns)
+    return snap
+
+
+def diff_snapshots(old: Snapshot, new: Snapshot) -> DirChanges:
+    return DirChanges(
+        added=sorted(k for k in new if k not in old),
+        changed=sorted(k for k in new if k in old and new[k] != old[k]),
+        removed=sorted(k for k in old if k not in new),
+    )
+
+
+class HtmlDirWatcher:
+    """
+    Nhớ trạng thái lần poll trước, mỗi lần poll() trả về phần thay đổi.
+
+    semester: theo dõi html_dir/<semester>/, đúng thư mục mà
+    load_all_sessions(html_dir, semester) đọc.
+    """
+
+    def __init__(self, html_dir: str, semester: str | None = None):
+        self.html_dir = semester_dir(html_dir, semester)
+        self.snapshot: Snapshot = snapshot_html_dir(html_dir)
+
+    def reset(self):
+        """Coi trạng thái hiện tại là đã xử lý (vd. sau khi vừa reload toàn bộ)."""
+        self.snapshot = snapshot_html_dir(self.html_dir)
+
+    def poll(self) -> DirChanges:
+        new = snapshot_html_dir(self.html_dir)
+        changes = diff_snapshots(self.snapshot, new)
+        self.snapshot = new
+        return changes
+
+    def path_of(self, class_name: str) -> str:
+        return os.path.join(self.html_dir, f"{class_name}.html")
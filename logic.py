@@ -1,14 +1,176 @@
 # logic.py
-from collections import defaultdict
+import time
+from bisect import insort
+from dataclasses import dataclass, field, fields
 from datetime import datetime
-from typing import Dict, List, Tuple
+from operator import attrgetter
+from typing import Dict, Iterable, Iterator, List, Mapping, Sequence, Tuple
 
-from models import Session
+from bell_schedule import DEFAULT_BELLS, BellSchedule
+from models import SESSION_FIELDS, Session
+from session_table import SessionTable
+
+
+# ====== DEDUP ======
+# Cùng 1 lớp học phần (cùng mã môn, nhóm, ngày, tiết, phòng, GV) thường nằm
+# trong file HTML của nhiều lớp hành chính. Giữ 1 Session chuẩn cho mỗi buổi
+# thật + danh sách các lớp có buổi đó; build_course_options nhận danh sách
+# này để vẫn tạo option cho từng lớp.
+#
+# Option của mọi lớp dùng chung Session chuẩn, nên s.class_name của 1 buổi
+# không hẳn là lớp của option chứa nó: lớp thật nằm trong key option
+# (key[2]), xem session_classes().
+
+# Khoá của 1 buổi học thật: mọi trường của Session trừ class_name
+# section_key(s) -> tuple (attrgetter chạy trong C, nhanh hơn hàm Python)
+SECTION_FIELDS = tuple(name for name in SESSION_FIELDS if name != "class_name")
+section_key = attrgetter(*SECTION_FIELDS)
+
+
+@dataclass
+class DedupStats:
+    rows: int       # số buổi đọc được từ các lớp (chưa gộp)
+    unique: int     # số buổi sau khi gộp
+    shared: int     # số buổi có ở từ 2 lớp trở lên
+
+    @property
+    def removed(self) -> int:
+        return self.rows - self.unique
+
+    def summary(self) -> str:
+        pct = 100 * self.removed / self.rows if self.rows else 0
+        return (
+            f"Gộp lịch trùng giữa các lớp: {self.rows} -> {self.unique} buổi "
+            f"(bỏ {self.removed}, {pct:.0f}%; {self.shared} buổi dùng chung)"
+        )
+
+
+class SessionDedup:
+    """
+    Tập Session chuẩn (mỗi buổi thật 1 object) + lớp nào có buổi nào.
+
+    Session chuẩn là bản của lớp đầu tiên có buổi đó (class_name của nó là
+    lớp đó); đủ các lớp nằm trong members[s]. Mỗi lớp giữ danh sách buổi
+    của nó theo đúng thứ tự trong file (by_class), nên option dựng từ đây
+    có cùng thứ tự buổi như dựng từ list Session gốc. Thêm / bỏ được từng
+    lớp (reload 1 file HTML) mà không phải gộp lại từ đầu.
+    """
+
+    def __init__(self, sessions: Iterable[Session] = ()):
+        # section_key -> (Session chuẩn, list lớp), list lớp chính là members[s]
+        self._canonical: Dict[Tuple, Tuple[Session, List[str]]] = {}
+        self.members: Dict[Session, List[str]] = {}
+        self._by_class: Dict[str, List[Session]] = {}
+        self._rows: Dict[str, int] = {}
+        self.add(sessions)
+
+    def add(self, sessions: Iterable[Session]) -> List[Session]:
+        """Thêm lịch (1 hay nhiều lớp), trả về các Session chuẩn vừa gắn thêm lớp."""
+        canonical, members, by_class = self._canonical, self.members, self._by_class
+        added: List[Session] = []
+        for s in sessions:
+            cls = s.class_name
+            self._rows[cls] = self._rows.get(cls, 0) + 1
+            key = section_key(s)
+            entry = canonical.get(key)
+            if entry is None:
+                c, owners = canonical[key] = (s, [])
+                members[c] = owners
+            else:
+                c, owners = entry
+            # dòng lặp lại ngay trong 1 lớp vẫn giữ trong by_class (như list gốc)
+            by_class.setdefault(cls, []).append(c)
+            if cls not in owners:
+                owners.append(cls)
+                added.append(c)
+        return added
+
+    def remove_classes(self, class_names: Iterable[str]):
+        """Bỏ các lớp; buổi không còn lớp nào có thì bỏ luôn."""
+        for cls in class_names:
+            self._rows.pop(cls, None)
+            for c in dict.fromkeys(self._by_class.pop(cls, ())):
+                owners = self.members[c]
+                owners.remove(cls)
+                if not owners:
+                    del self.members[c]
+                    del self._canonical[section_key(c)]
+
+    def sessions(self, class_name: str | None = None) -> List[Session]:
+        """Các Session chuẩn (của 1 lớp nếu có class_name, theo thứ tự trong file)."""
+        if class_name is not None:
+            return list(self._by_class.get(class_name, ()))
+        return list(self.members)
+
+    def by_class(self, class_names: Iterable[str] | None = None) -> Dict[str, List[Session]]:
+        """{lớp: Session chuẩn của lớp theo thứ tự trong file} (mọi lớp nếu class_names = None)."""
+        if class_names is None:
+            return dict(self._by_class)
+        return {cls: self._by_class[cls] for cls in class_names if cls in self._by_class}
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def stats(self) -> DedupStats:
+        return DedupStats(
+            rows=sum(self._rows.values()),
+            unique=len(self.members),
+            shared=sum(1 for owners in self.members.values() if len(owners) > 1),
+        )
+
+
+def dedup_sessions(sessions: Iterable[Session]) -> SessionDedup:
+    """Gộp lịch đọc từ nhiều lớp (vd. kết quả load_all_sessions)."""
+    return SessionDedup(sessions)
+
+
+def session_classes(options: Dict[Tuple, List[Session]], keys: Iterable[Tuple]) -> Dict[Session, str]:
+    """
+    Buổi -> lớp của option (trong keys) chứa buổi đó, lấy từ key option chứ
+    không phải s.class_name (buổi dùng chung mang tên lớp nạp nó đầu tiên).
+    Buổi nằm trong option của nhiều lớp thì ghi "K1, K2".
+    """
+    owners: Dict[Session, List[str]] = {}
+    for key in keys:
+        for s in options.get(key, ()):
+            names = owners.setdefault(s, [])
+            if key[2] not in names:
+                names.append(key[2])
+    return {s: ", ".join(names) for s, names in owners.items()}
 
 
 # ====== BUILD OPTIONS ======
 
-def build_course_options(sessions: List[Session]) -> Dict[Tuple, List[Session]]:
+def _group_by_class(dedup: SessionDedup, class_names: Iterable[str] | None):
+    """
+    (bảng của các Session chuẩn, by_course) cho build_course_options:
+    by_course[(mã môn, mã tên môn, lớp)][group] = [dòng, ...] theo thứ tự
+    buổi trong file của lớp đó.
+    """
+    per_class = dedup.by_class(class_names)
+    row_of: Dict[int, int] = {}     # id(Session chuẩn) -> dòng, khỏi hash cả Session
+    canonical: List[Session] = []
+    for sessions in per_class.values():
+        for c in sessions:
+            if id(c) not in row_of:
+                row_of[id(c)] = len(canonical)
+                canonical.append(c)
+    table = SessionTable.from_sessions(canonical)
+
+    cc_col, sn_col, g_col = (table.column(c) for c in ("course_code", "subject_name", "group"))
+    by_course: Dict[Tuple, Dict[int, List[int]]] = {}
+    for class_name, sessions in per_class.items():
+        for c in sessions:
+            i = row_of[id(c)]
+            groups = by_course.setdefault((cc_col[i], sn_col[i], class_name), {})
+            groups.setdefault(g_col[i], []).append(i)
+    return table, by_course
+
+
+def build_course_options(
+    sessions: List[Session] | SessionTable | SessionDedup,
+    class_names: Iterable[str] | None = None,
+) -> Dict[Tuple, List[Session]]:
     """
     Gom lịch theo từng MÔN + LỚP + NHÓM, trong đó:
 
@@ -18,6 +180,14 @@ def build_course_options(sessions: List[Session]) -> Dict[Tuple, List[Session]]:
     - Nếu môn KHÔNG có nhóm (chỉ LT hoặc chỉ TH)
       => 1 option duy nhất, group = 0, chứa toàn bộ buổi học.
 
+    sessions: list Session hoặc SessionTable (gom trên cột mã số, không
+    phải hash lại tuple chuỗi cho từng buổi), hoặc SessionDedup: mỗi lớp
+    có option của nó, các lớp dùng chung object Session chuẩn (không tạo
+    bản sao cho từng lớp). Buổi trong option giữ thứ tự trong file của lớp
+    đó, nên kết quả chỉ khác dựng từ list gốc ở s.class_name của buổi dùng
+    chung; lớp của option là key[2] (xem session_classes).
+    class_names: chỉ dựng option cho các lớp này (chỉ dùng với SessionDedup).
+
     Trả về:
         {
           (course_code, subject_name, class_name, group): [Session, ...],
@@ -25,24 +195,31 @@ def build_course_options(sessions: List[Session]) -> Dict[Tuple, List[Session]]:
         }
     """
     # Tạm thời gom theo khóa KHÔNG có group
-    # by_course[(code, name, class)][group] = [Session, ...]
-    by_course = defaultdict(lambda: defaultdict(list))
+    # by_course[(code, name, class)][group] = [chỉ số dòng, ...]
+    if isinstance(sessions, SessionDedup):
+        table, by_course = _group_by_class(sessions, class_names)
+    else:
+        table = sessions if isinstance(sessions, SessionTable) else SessionTable.from_sessions(sessions)
+        by_course = {}
+        rows_by_key = table.group_rows(("course_code", "subject_name", "class_name", "group"))
+        for (cc, sn, cl, g), rows in rows_by_key.items():
+            by_course.setdefault((cc, sn, table.values["class_name"][cl]), {})[g] = rows
 
-    for s in sessions:
-        course_key = (s.course_code, s.subject_name, s.class_name)
-        by_course[course_key][s.group].append(s)
+    course_codes = table.values["course_code"]
+    subject_names = table.values["subject_name"]
 
     options: Dict[Tuple, List[Session]] = {}
 
-    for (course_code, subject_name, class_name), groups in by_course.items():
-        common_sessions = groups.get(0, [])  # LT chung / không nhóm
+    for (cc, sn, class_name), groups in by_course.items():
+        course_code, subject_name = course_codes[cc], subject_names[sn]
+        common_sessions = table.sessions(groups.get(0, []))  # LT chung / không nhóm
         group_ids = sorted(g for g in groups.keys() if g != 0)
 
         if group_ids:
             # Có nhiều nhóm thực hành:
             # mỗi option = LT (group 0) + TH của đúng 1 nhóm
             for g in group_ids:
-                sessions_for_option = common_sessions + groups[g]
+                sessions_for_option = common_sessions + table.sessions(groups[g])
                 key = (course_code, subject_name, class_name, g)
                 options[key] = sessions_for_option
         else:
@@ -53,6 +230,39 @@ def build_course_options(sessions: List[Session]) -> Dict[Tuple, List[Session]]:
     return options
 
 
+def merge_course_options(
+    options: Dict[Tuple, List[Session]],
+    sessions: List[Session] | SessionDedup,
+    class_names: List[str] | None = None,
+) -> List[Tuple]:
+    """
+    Cập nhật options tại chỗ với lịch mới của 1 (hoặc vài) lớp:
+    bỏ hết option cũ của các lớp class_names (mặc định = các lớp có trong
+    sessions) rồi thêm option build từ sessions.
+    sessions là SessionDedup thì chỉ dựng lại option của class_names
+    (mặc định: mọi lớp trong đó).
+
+    Vì key option có chứa class_name nên option của các lớp khác
+    không bị ảnh hưởng. Trả về list key vừa thêm.
+    """
+    if class_names is None:
+        if isinstance(sessions, SessionDedup):
+            class_names = list(sessions.by_class())
+        else:
+            class_names = sorted({s.class_name for s in sessions})
+    names = set(class_names)
+
+    for key in [k for k in options if k[2] in names]:
+        del options[key]
+
+    if isinstance(sessions, SessionDedup):
+        new_options = build_course_options(sessions, class_names)
+    else:
+        new_options = build_course_options(sessions)
+    options.update(new_options)
+    return list(new_options)
+
+
 def list_options(options: Dict[Tuple, List[Session]]) -> Dict[int, Tuple]:
     """
     In ra danh sách option để user chọn, đánh số 1..N.
@@ -108,57 +318,704 @@ def get_sessions_from_selected(
 
 
 # ====== FIND CONFLICTS ======
+# Mỗi ngày có 1 mask số nguyên: bit i = phút thứ i trong ngày đã có buổi học.
+# Ngày nào các mask không chồng nhau (AND = 0) thì chắc chắn không trùng, bỏ
+# qua luôn; chỉ ngày có va chạm mới so từng cặp để báo (Session, Session).
+# Dùng bit theo phút (không theo số tiết) để kết quả đúng như so giờ, kể cả
+# khi các học kỳ dùng bảng giờ khác nhau hoặc có buổi mang giờ mặc định.
 
-def _date_sort_key(date_str: str):
-    """
-    date_str: 'dd-mm-yyyy' -> key (yyyy, mm, dd) để sort đúng.
-    """
-    d, m, y = date_str.split('-')
-    return int(y), int(m), int(d)
+def session_mask(s: Session) -> int:
+    """Mask phút [start_min, end_min) của buổi s (0 nếu giờ kết thúc <= giờ bắt đầu)."""
+    width = s.end_min - s.start_min
+    if width <= 0:
+        return 0
+    return ((1 << width) - 1) << s.start_min
 
 
-def find_conflicts(sessions: List[Session]) -> List[Tuple[Session, Session]]:
-    """
-    Tìm các cặp buổi học bị trùng.
-    Điều kiện trùng: cùng ngày + khoảng thời gian overlap.
-    """
-    sessions_sorted = sorted(
-        sessions,
-        key=lambda s: (_date_sort_key(s.date), s.start, s.end)
-    )
+_SORT_KEY = attrgetter("day", "start_min", "end_min")
+
 
+def _pairwise_conflicts(sessions: Iterable[Session]) -> List[Tuple[Session, Session]]:
+    """So từng cặp trong cùng ngày, thứ tự như sort theo (day, start_min, end_min)."""
+    ordered = sorted(sessions, key=_SORT_KEY)
     conflicts: List[Tuple[Session, Session]] = []
-    n = len(sessions_sorted)
+    n = len(ordered)
 
     for i in range(n):
-        si = sessions_sorted[i]
+        si = ordered[i]
         for j in range(i + 1, n):
-            sj = sessions_sorted[j]
+            sj = ordered[j]
 
-            # khác ngày thì không cần xét tiếp cho si
-            if sj.date != si.date:
+            # khác ngày, hoặc sj (và mọi buổi sau) bắt đầu khi si đã kết thúc
+            if sj.day != si.day or sj.start_min >= si.end_min:
                 break
 
             # Kiểm tra overlap: start_j < end_i và end_j > start_i
-            if sj.start < si.end and sj.end > si.start:
+            if sj.end_min > si.start_min:
                 conflicts.append((si, sj))
 
     return conflicts
 
 
-def print_conflicts(conflicts: List[Tuple[Session, Session]]):
+def find_conflicts(sessions: List[Session]) -> List[Tuple[Session, Session]]:
+    """
+    Tìm các cặp buổi học bị trùng.
+    Điều kiện trùng: cùng ngày + khoảng thời gian overlap.
+    So trên các trường số tính sẵn (day, start_min, end_min) của Session.
+    Buổi không rõ ngày (day = 0) không xếp được lên lịch nên bỏ qua.
+
+    Thứ tự kết quả: theo ngày, rồi theo (start_min, end_min) của buổi đầu
+    cặp (sort ổn định theo thứ tự trong sessions).
+    """
+    # lượt 1: OR mask từng ngày, ghi lại ngày nào có va chạm
+    occupied: Dict[int, int] = {}
+    clashing = set()
+    for s in sessions:
+        day = s.day
+        if not day:
+            continue
+        # = session_mask(s), viết thẳng vào vòng lặp cho nhanh
+        width = s.end_min - s.start_min
+        mask = ((1 << width) - 1) << s.start_min if width > 0 else 0
+        busy = occupied.get(day, 0)
+        if busy & mask or not mask:
+            # buổi giờ lạ (kết thúc <= bắt đầu): để so từng cặp quyết định
+            clashing.add(day)
+        occupied[day] = busy | mask
+
+    if not clashing:
+        return []
+
+    # lượt 2: chỉ so từng cặp trong các ngày có va chạm
+    return _pairwise_conflicts(s for s in sessions if s.day in clashing)
+
+
+def print_conflicts(
+    conflicts: List[Tuple[Session, Session]],
+    classes: Mapping[Session, str] | None = None,
+):
+    """classes: buổi -> lớp (session_classes), mặc định s.class_name."""
     if not conflicts:
         print("✅ Không trùng lịch!")
         return
 
+    classes = classes or {}
     print("❌ Có các cặp trùng lịch sau:")
     for a, b in conflicts:
+        ca, cb = classes.get(a, a.class_name), classes.get(b, b.class_name)
         print(
-            f"- {a.subject_name} ({a.class_name}, nhóm {a.group}, {a.date}, {a.lesson_period}, phòng {a.room}) "
-            f"trùng với {b.subject_name} ({b.class_name}, nhóm {b.group}, {b.date}, {b.lesson_period}, phòng {b.room})"
+            f"- {a.subject_name} ({ca}, nhóm {a.group}, {a.date}, {a.lesson_period}, phòng {a.room}) "
+            f"trùng với {b.subject_name} ({cb}, nhóm {b.group}, {b.date}, {b.lesson_period}, phòng {b.room})"
+        )
+
+
+# ====== TỰ XẾP LỊCH ======
+# Chọn cho mỗi môn muốn học đúng 1 option (lớp + nhóm) sao cho không option
+# nào trùng lịch nhau. Quay lui trên bitset của compat_index: mỗi option có
+# 1 bit và 1 "hàng trùng" (bitset các option trùng với nó), nên kiểm tra
+# trùng chỉ là AND số nguyên.
+
+@dataclass
+class SolverStats:
+    nodes: int = 0          # số lần thử gán 1 option
+    solutions: int = 0
+    pruned: int = 0         # số nhánh bị cắt
+    elapsed: float = 0.0
+    stopped: str = ""       # "" = đã duyệt hết; "limit" / "timeout" / "max_nodes"
+    missing: List[str] = field(default_factory=list)  # môn không có option dùng được
+
+    def summary(self) -> str:
+        reason = {
+            "": "đã duyệt hết",
+            "limit": "đủ số lịch cần tìm",
+            "timeout": "hết thời gian",
+            "max_nodes": "vượt giới hạn số bước",
+        }.get(self.stopped, self.stopped)
+        return (
+            f"{self.solutions} lịch, {self.nodes:,} bước, cắt {self.pruned:,} nhánh, "
+            f"{self.elapsed * 1000:.0f} ms ({reason})"
+        )
+
+
+class _SearchStop(Exception):
+    pass
+
+
+def _prepare_search(options, subjects, index, stats: SolverStats):
+    """
+    Phần chung của iter_timetables / best_timetables: lấy option dùng được
+    của từng môn, dựng index nếu chưa có. Trả về (subjects, order, index)
+    với order = {môn: [key...]} theo thứ tự xếp (môn ít lựa chọn trước),
+    hoặc None nếu có môn không còn option nào.
+    """
+    from compat_index import CompatibilityIndex  # compat_index import logic
+
+    subjects = list(dict.fromkeys(subjects))
+    cands = subject_candidates(options, subjects)
+    if index is None:
+        index = CompatibilityIndex({k: options[k] for keys in cands.values() for k in keys})
+    for name, keys in cands.items():
+        keys[:] = [k for k in keys if not index.self_conflicting(k)]
+    stats.missing = [name for name in subjects if not cands[name]]
+    if stats.missing or not subjects:
+        return None
+
+    # môn ít lựa chọn xếp trước (fail-first), cắt nhánh sớm hơn
+    order = {name: cands[name] for name in sorted(subjects, key=lambda name: len(cands[name]))}
+    return subjects, order, index
+
+
+def _output_positions(subjects: List[str], order: Dict[str, List[Tuple]]) -> List[int]:
+    """Vị trí trong thứ tự xếp của từng môn trong subjects (để trả kết quả theo subjects)."""
+    ordered = list(order)
+    return [ordered.index(name) for name in subjects]
+
+
+def subject_candidates(
+    options: Dict[Tuple, List[Session]],
+    subjects: Iterable[str],
+) -> Dict[str, List[Tuple]]:
+    """Môn -> các key option của môn đó (sort theo key)."""
+    cands: Dict[str, List[Tuple]] = {name: [] for name in subjects}
+    for key in sorted(options):
+        bucket = cands.get(key[1])
+        if bucket is not None:
+            bucket.append(key)
+    return cands
+
+
+def iter_timetables(
+    options: Dict[Tuple, List[Session]],
+    subjects: Iterable[str],
+    limit: int | None = None,
+    timeout: float | None = None,
+    max_nodes: int | None = None,
+    index=None,
+    stats: SolverStats | None = None,
+) -> Iterator[Tuple[Tuple, ...]]:
+    """
+    Sinh dần các bộ option không trùng lịch, mỗi bộ có đúng 1 option cho mỗi
+    môn trong subjects (tên môn = key[1]), theo thứ tự của subjects.
+
+    limit: dừng sau limit bộ; timeout (giây) / max_nodes: chặn input quá lớn.
+    index: CompatibilityIndex đã sync với options (vd. của GUI); None thì
+    dựng index riêng chỉ cho option của các môn cần xếp.
+    stats: truyền SolverStats vào để đọc số liệu / lý do dừng sau khi chạy.
+
+    Option tự trùng với chính nó bị bỏ qua. Môn nào không còn option nào
+    thì không có bộ nào (stats.missing).
+    """
+    if stats is None:
+        stats = SolverStats()
+    started = time.perf_counter()
+    deadline = started + timeout if timeout else None
+
+    space = _prepare_search(options, subjects, index, stats)
+    if space is None:
+        stats.elapsed = time.perf_counter() - started
+        return
+    subjects, order, index = space
+
+    levels = [
+        [(key, index.flag(key), index.conflicts_of(key)) for key in keys]
+        for keys in order.values()
+    ]
+    # domains[d] = bitset mọi option của môn ở tầng d
+    domains = [sum(flag for _, flag, _ in level) for level in levels]
+    out_pos = _output_positions(subjects, order)
+    chosen: List[Tuple | None] = [None] * len(levels)
+    depth_end = len(levels)
+
+    def walk(depth: int, blocked: int) -> Iterator[Tuple[Tuple, ...]]:
+        if depth == depth_end:
+            yield tuple(chosen[i] for i in out_pos)
+            return
+        rest = domains[depth + 1:]
+        for key, flag, row in levels[depth]:
+            stats.nodes += 1
+            if max_nodes and stats.nodes > max_nodes:
+                raise _SearchStop("max_nodes")
+            if deadline and not stats.nodes & 255 and time.perf_counter() > deadline:
+                raise _SearchStop("timeout")
+            if blocked & flag:
+                stats.pruned += 1
+                continue
+            now_blocked = blocked | row
+            # mỗi môn còn lại phải còn ít nhất 1 option chưa bị chặn
+            if any(not domain & ~now_blocked for domain in rest):
+                stats.pruned += 1
+                continue
+            chosen[depth] = key
+            yield from walk(depth + 1, now_blocked)
+
+    try:
+        for combo in walk(0, 0):
+            stats.solutions += 1
+            yield combo
+            if limit and stats.solutions >= limit:
+                stats.stopped = "limit"
+                return
+    except _SearchStop as e:
+        stats.stopped = str(e)
+    finally:
+        stats.elapsed = time.perf_counter() - started
+
+
+def find_timetables(
+    options: Dict[Tuple, List[Session]],
+    subjects: Iterable[str],
+    limit: int | None = None,
+    **kwargs,
+) -> List[Tuple[Tuple, ...]]:
+    """Như iter_timetables nhưng trả về list (tối đa limit bộ)."""
+    return list(iter_timetables(options, subjects, limit=limit, **kwargs))
+
+
+# ====== XẾP LỊCH TỐI ƯU ======
+# Xếp hạng các bộ option không trùng theo "chi phí" (càng thấp càng tốt):
+#   days     số ngày phải lên trường (mỗi ngày có ít nhất 1 buổi)
+#   gaps     số tiết trống kẹp giữa 2 buổi trong cùng 1 ngày
+#   evening  số tiết học buổi tối (từ tiết evening_from)
+#   lecturer / room  số buổi không do GV ưa thích dạy / không ở phòng ưa thích
+# Mỗi option được tính sẵn mask tiết theo từng ngày (bit p = tiết p theo
+# bảng giờ). Nhánh và cận (branch and bound): chi phí đã có + chi phí nhỏ
+# nhất chắc chắn phải thêm của các môn còn lại mà đã tệ hơn lịch thứ K tốt
+# nhất hiện có thì bỏ cả nhánh.
+
+SCORE_COMPONENTS = ("days", "gaps", "evening", "lecturer", "room")
+
+
+@dataclass
+class ScoreWeights:
+    days: float = 10.0
+    gaps: float = 2.0
+    evening: float = 3.0
+    lecturer: float = 1.0
+    room: float = 0.5
+    preferred_lecturers: Tuple[str, ...] = ()
+    preferred_rooms: Tuple[str, ...] = ()
+    evening_from: int = 11
+
+    def __post_init__(self):
+        for name in SCORE_COMPONENTS:
+            value = getattr(self, name)
+            if not isinstance(value, (int, float)) or value < 0:
+                raise ValueError(f"trọng số '{name}' phải là số >= 0 (gặp {value!r})")
+        self.preferred_lecturers = tuple(self.preferred_lecturers)
+        self.preferred_rooms = tuple(self.preferred_rooms)
+
+    @classmethod
+    def from_config(cls, config: dict) -> "ScoreWeights":
+        """Đọc config["score_weights"] (các trường như dataclass). Sai -> ValueError."""
+        raw = config.get("score_weights") or {}
+        if not isinstance(raw, dict):
+            raise ValueError("score_weights phải là object")
+        unknown = set(raw) - {f.name for f in fields(cls)}
+        if unknown:
+            raise ValueError(f"score_weights có khoá lạ: {', '.join(sorted(unknown))}")
+        return cls(**raw)
+
+    def cost(self, counts: Sequence[int]) -> float:
+        """counts theo thứ tự SCORE_COMPONENTS."""
+        days, gaps, evening, lecturer, room = counts
+        return (
+            self.days * days + self.gaps * gaps + self.evening * evening
+            + self.lecturer * lecturer + self.room * room
         )
 
 
+@dataclass
+class ScoredTimetable:
+    cost: float
+    keys: Tuple[Tuple, ...]   # 1 key option cho mỗi môn, theo thứ tự môn truyền vào
+    days: int
+    gaps: int
+    evening: int
+    lecturer: int
+    room: int
+
+    def summary(self) -> str:
+        text = f"{self.cost:g} điểm: {self.days} ngày, {self.gaps} tiết trống, {self.evening} tiết tối"
+        if self.lecturer:
+            text += f", {self.lecturer} buổi GV khác"
+        if self.room:
+            text += f", {self.room} buổi phòng khác"
+        return text
+
+
+@dataclass
+class _OptionProfile:
+    day_masks: Tuple[Tuple[int, int], ...]   # (day, mask tiết) mỗi ngày có học
+    dayset: int                              # bit (day - ngày đầu) của các ngày có học
+    evening: int
+    lecturer: int
+    room: int
+
+
+def _period_bits(s: Session, bells: BellSchedule) -> int:
+    """Mask tiết của buổi s; chuỗi tiết lạ thì lấy các tiết giao với giờ học."""
+    slot = bells.lookup(s.lesson_period)
+    if slot is not None:
+        return ((1 << (slot.last - slot.first + 1)) - 1) << slot.first
+    return sum(1 << p for p, (start, end) in bells.periods.items() if start < s.end and s.start < end)
+
+
+def _option_profile(
+    sessions: List[Session], weights: ScoreWeights, bells: BellSchedule, base_day: int,
+    period_cache: Dict[Tuple[str, str, str], int],
+) -> _OptionProfile:
+    evening_mask = sum(1 << p for p in bells.periods if p >= weights.evening_from)
+    lecturers, rooms = set(weights.preferred_lecturers), set(weights.preferred_rooms)
+    masks: Dict[int, int] = {}
+    evening = lecturer = room = 0
+    for s in sessions:
+        if not s.day:
+            continue
+        key = (s.lesson_period, s.start, s.end)
+        bits = period_cache.get(key)
+        if bits is None:
+            bits = period_cache[key] = _period_bits(s, bells)
+        masks[s.day] = masks.get(s.day, 0) | bits
+        evening += (bits & evening_mask).bit_count()
+        if lecturers and s.lecturer_name not in lecturers:
+            lecturer += 1
+        if rooms and s.room not in rooms:
+            room += 1
+    dayset = 0
+    for day in masks:
+        dayset |= 1 << (day - base_day)
+    return _OptionProfile(tuple(masks.items()), dayset, evening, lecturer, room)
+
+
+def idle_periods(day_masks: Iterable[int]) -> int:
+    """Tổng số tiết trống kẹp giữa tiết đầu và tiết cuối của từng ngày."""
+    idle = 0
+    for mask in day_masks:
+        if mask:
+            idle += mask.bit_length() - (mask & -mask).bit_length() + 1 - mask.bit_count()
+    return idle
+
+
+def score_timetable(
+    options: Dict[Tuple, List[Session]],
+    keys: Sequence[Tuple],
+    weights: ScoreWeights | None = None,
+    bells: BellSchedule = DEFAULT_BELLS,
+) -> ScoredTimetable:
+    """Tính điểm 1 bộ option bất kỳ (không kiểm tra trùng lịch)."""
+    weights = weights or ScoreWeights()
+    sessions = [s for k in keys for s in options[k]]
+    base_day = min((s.day for s in sessions if s.day), default=0)
+    profile = _option_profile(sessions, weights, bells, base_day, {})
+    counts = (
+        profile.dayset.bit_count(), idle_periods(m for _, m in profile.day_masks),
+        profile.evening, profile.lecturer, profile.room,
+    )
+    return ScoredTimetable(weights.cost(counts), tuple(keys), *counts)
+
+
+def best_timetables(
+    options: Dict[Tuple, List[Session]],
+    subjects: Iterable[str],
+    k: int = 10,
+    weights: ScoreWeights | None = None,
+    bells: BellSchedule = DEFAULT_BELLS,
+    timeout: float | None = None,
+    max_nodes: int | None = None,
+    index=None,
+    stats: SolverStats | None = None,
+    workers: int = 1,
+) -> List[ScoredTimetable]:
+    """
+    K bộ option không trùng lịch có chi phí thấp nhất (mỗi môn 1 option),
+    sắp theo (cost, keys). Các tham số timeout / max_nodes / index / stats
+    như iter_timetables; bị dừng giữa chừng thì trả về K bộ tốt nhất đã gặp.
+    stats.solutions = số bộ hoàn chỉnh đã chấm điểm.
+
+    workers > 1 (0 = mọi nhân CPU): chia cây tìm kiếm theo option của các
+    môn đầu cho nhiều process (xem _parallel_best); kết quả giống hệt chạy
+    1 process nếu không bị dừng vì timeout / max_nodes.
+    """
+    weights = weights or ScoreWeights()
+    if stats is None:
+        stats = SolverStats()
+    started = time.perf_counter()
+
+    space = _prepare_search(options, subjects, index, stats)
+    if space is None or k <= 0:
+        stats.elapsed = time.perf_counter() - started
+        return []
+    subjects, order, index = space
+    levels = _build_levels(options, order, index, weights, bells)
+    out_pos = _output_positions(subjects, order)
+
+    from parser_html import resolve_workers
+
+    workers = resolve_workers(workers)
+    try:
+        if workers > 1:
+            best = _parallel_best(levels, out_pos, k, weights, workers, timeout, max_nodes, stats)
+        else:
+            deadline = started + timeout if timeout else None
+            best = _search_best(levels, out_pos, k, weights, stats, deadline, max_nodes)
+    finally:
+        stats.elapsed = time.perf_counter() - started
+
+    return [ScoredTimetable(cost, keys, *counts) for cost, keys, counts in best]
+
+
+def _build_levels(options, order, index, weights: ScoreWeights, bells: BellSchedule) -> list:
+    """Mỗi tầng (môn) 1 list (key, bit, hàng trùng, _OptionProfile), option rẻ trước."""
+    base_day = min(
+        (s.day for keys in order.values() for key in keys for s in options[key] if s.day),
+        default=0,
+    )
+    period_cache: Dict[Tuple[str, str, str], int] = {}
+    levels = []
+    for keys in order.values():
+        level = []
+        for key in keys:
+            p = _option_profile(options[key], weights, bells, base_day, period_cache)
+            extra = weights.cost((0, 0, p.evening, p.lecturer, p.room))
+            level.append((extra, key, index.flag(key), index.conflicts_of(key), p))
+        # option "rẻ" thử trước để sớm có cận tốt
+        level.sort(key=lambda item: (item[0], item[1]))
+        levels.append([item[1:] for item in level])
+    return levels
+
+
+def _search_best(
+    levels: list,
+    out_pos: List[int],
+    k: int,
+    weights: ScoreWeights,
+    stats: SolverStats,
+    deadline: float | None,
+    max_nodes: int | None,
+    shared_bound=None,
+    shared_nodes=None,
+) -> List[Tuple[float, Tuple, Tuple[int, ...]]]:
+    """
+    Nhánh và cận trên levels, trả về tối đa k (cost, keys, counts) sort tăng.
+
+    shared_bound / shared_nodes (multiprocessing.Value, khi chạy nhiều
+    process): chi phí lịch thứ k tốt nhất của mọi process (để cắt nhánh theo
+    kết quả của process khác) và tổng số bước đã chạy (cho max_nodes).
+    """
+    chosen: List[Tuple | None] = [None] * len(levels)
+    depth_end = len(levels)
+    masks: Dict[int, int] = {}
+    best: List[Tuple[float, Tuple, Tuple[int, ...]]] = []   # sort tăng dần, tối đa k phần tử
+    flushed = 0   # số bước đã cộng vào shared_nodes
+
+    def bound() -> float:
+        limit = best[-1][0] if len(best) == k else float("inf")
+        if shared_bound is not None:
+            limit = min(limit, shared_bound.value)
+        return limit
+
+    def checkpoint():
+        nonlocal flushed
+        if deadline and time.perf_counter() > deadline:
+            raise _SearchStop("timeout")
+        if shared_nodes is not None:
+            with shared_nodes.get_lock():
+                shared_nodes.value += stats.nodes - flushed
+                total = shared_nodes.value
+            flushed = stats.nodes
+            if max_nodes and total > max_nodes:
+                raise _SearchStop("max_nodes")
+
+    def offer(entry):
+        if len(best) < k:
+            insort(best, entry)
+        elif entry[:2] < best[-1][:2]:
+            best.pop()
+            insort(best, entry)
+        else:
+            return
+        if shared_bound is not None and len(best) == k and best[-1][0] < shared_bound.value:
+            with shared_bound.get_lock():
+                if best[-1][0] < shared_bound.value:
+                    shared_bound.value = best[-1][0]
+
+    def walk(depth: int, blocked: int, dayset: int, evening: int, lecturer: int, room: int):
+        if depth == depth_end:
+            stats.solutions += 1
+            counts = (dayset.bit_count(), idle_periods(masks.values()), evening, lecturer, room)
+            offer((weights.cost(counts), tuple(chosen[i] for i in out_pos), counts))
+            return
+
+        rest = levels[depth + 1:]
+        for key, flag, row, p in levels[depth]:
+            stats.nodes += 1
+            if shared_nodes is None and max_nodes and stats.nodes > max_nodes:
+                raise _SearchStop("max_nodes")
+            if not stats.nodes & 255:
+                checkpoint()
+            if blocked & flag:
+                stats.pruned += 1
+                continue
+
+            now_blocked = blocked | row
+            now_days = dayset | p.dayset
+            now = (evening + p.evening, lecturer + p.lecturer, room + p.room)
+
+            # cận dưới: mỗi môn còn lại phải thêm ít nhất option rẻ nhất còn
+            # dùng được của nó; số ngày ít nhất là ngày hiện có + số ngày mới
+            # nhiều nhất mà 1 môn còn lại bắt buộc phải thêm
+            lb_ev, lb_le, lb_ro = now
+            new_days = 0
+            dead = False
+            for level in rest:
+                min_ev = min_le = min_ro = min_new = None
+                for _, other_flag, _, q in level:
+                    if now_blocked & other_flag:
+                        continue
+                    added = (q.dayset & ~now_days).bit_count()
+                    if min_ev is None:
+                        min_ev, min_le, min_ro, min_new = q.evening, q.lecturer, q.room, added
+                    else:
+                        min_ev = min(min_ev, q.evening)
+                        min_le = min(min_le, q.lecturer)
+                        min_ro = min(min_ro, q.room)
+                        min_new = min(min_new, added)
+                if min_ev is None:
+                    dead = True    # môn này không còn option nào
+                    break
+                lb_ev += min_ev
+                lb_le += min_le
+                lb_ro += min_ro
+                new_days = max(new_days, min_new)
+            if dead:
+                stats.pruned += 1
+                continue
+            # cắt khi chắc chắn tệ hơn hẳn lịch thứ k (bằng điểm vẫn xét tiếp
+            # để thứ tự theo keys giống nhau dù chia việc kiểu gì)
+            lower = weights.cost((now_days.bit_count() + new_days, 0, lb_ev, lb_le, lb_ro))
+            if lower > bound():
+                stats.pruned += 1
+                continue
+
+            chosen[depth] = key
+            saved = [(day, masks.get(day, 0)) for day, _ in p.day_masks]
+            for day, mask in p.day_masks:
+                masks[day] = masks.get(day, 0) | mask
+            walk(depth + 1, now_blocked, now_days, *now)
+            for day, old in saved:
+                if old:
+                    masks[day] = old
+                else:
+                    del masks[day]
+
+    try:
+        walk(0, 0, 0, 0, 0, 0)
+    except _SearchStop as e:
+        stats.stopped = str(e)
+    if shared_nodes is not None:
+        with shared_nodes.get_lock():
+            shared_nodes.value += stats.nodes - flushed
+    return best
+
+
+# ----- chạy nhiều process -----
+# Cây tìm kiếm được cắt ở vài tầng đầu: mỗi việc là 1 tiền tố (option đã
+# chọn cho các môn đầu, không trùng nhau). Các process dùng chung 1 cận (chi
+# phí lịch thứ k tốt nhất đã biết) qua multiprocessing.Value nên process này
+# cắt được nhánh nhờ lịch tốt process khác vừa tìm thấy. Kết quả gộp lại và
+# sort theo (cost, keys) nên không phụ thuộc process nào xong trước.
+
+# số việc tối thiểu mỗi process (nhiều việc nhỏ thì chia tải đều hơn)
+TASKS_PER_WORKER = 8
+
+_pool_state: dict = {}
+
+
+def _split_prefixes(levels: list, min_tasks: int) -> List[Tuple[int, ...]]:
+    """Các tiền tố (chỉ số option ở từng tầng đầu) không trùng nhau, đủ min_tasks việc."""
+    prefixes: List[Tuple[Tuple[int, ...], int]] = [((), 0)]
+    depth = 0
+    while len(prefixes) < min_tasks and depth < len(levels) - 1:
+        prefixes = [
+            (prefix + (i,), blocked | row)
+            for prefix, blocked in prefixes
+            for i, (_, flag, row, _) in enumerate(levels[depth])
+            if not blocked & flag
+        ]
+        depth += 1
+    return [prefix for prefix, _ in prefixes]
+
+
+def _init_pool(levels, out_pos, k, weights, shared_bound, shared_nodes, max_nodes, time_left_at):
+    _pool_state.update(
+        levels=levels, out_pos=out_pos, k=k, weights=weights,
+        shared_bound=shared_bound, shared_nodes=shared_nodes,
+        max_nodes=max_nodes, time_left_at=time_left_at,
+    )
+
+
+def _best_job(prefix: Tuple[int, ...]):
+    """Chạy trong process con: nhánh và cận trên cây con có tiền tố prefix."""
+    st = _pool_state
+    levels = st["levels"]
+    task_levels = [[levels[d][i]] for d, i in enumerate(prefix)] + levels[len(prefix):]
+    deadline = None
+    if st["time_left_at"] is not None:
+        # đổi hạn chót theo giờ hệ thống sang đồng hồ perf_counter của process này
+        deadline = time.perf_counter() + (st["time_left_at"] - time.time())
+    stats = SolverStats()
+    if st["shared_nodes"].value > (st["max_nodes"] or float("inf")):
+        stats.stopped = "max_nodes"
+        return [], stats
+    if deadline is not None and time.perf_counter() > deadline:
+        stats.stopped = "timeout"
+        return [], stats
+    best = _search_best(
+        task_levels, st["out_pos"], st["k"], st["weights"], stats, deadline,
+        st["max_nodes"], st["shared_bound"], st["shared_nodes"],
+    )
+    return best, stats
+
+
+def _parallel_best(
+    levels: list,
+    out_pos: List[int],
+    k: int,
+    weights: ScoreWeights,
+    workers: int,
+    timeout: float | None,
+    max_nodes: int | None,
+    stats: SolverStats,
+) -> List[Tuple[float, Tuple, Tuple[int, ...]]]:
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    prefixes = _split_prefixes(levels, workers * TASKS_PER_WORKER)
+    if not prefixes:
+        return []
+
+    shared_bound = multiprocessing.Value("d", float("inf"))
+    shared_nodes = multiprocessing.Value("q", 0)
+    time_left_at = time.time() + timeout if timeout else None
+
+    merged: List[Tuple[float, Tuple, Tuple[int, ...]]] = []
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(prefixes)),
+        initializer=_init_pool,
+        initargs=(levels, out_pos, k, weights, shared_bound, shared_nodes, max_nodes, time_left_at),
+    ) as pool:
+        # map giữ thứ tự việc (tiền tố rẻ trước) -> cận tốt đến sớm
+        for best, job_stats in pool.map(_best_job, prefixes):
+            merged.extend(best)
+            stats.nodes += job_stats.nodes
+            stats.pruned += job_stats.pruned
+            stats.solutions += job_stats.solutions
+            stats.stopped = stats.stopped or job_stats.stopped
+
+    merged.sort(key=lambda entry: entry[:2])
+    return merged[:k]
+
+
 # ====== ICS EXPORT ======
 
 def convert_date_format(date_str: str) -> str:
@@ -169,10 +1026,16 @@ def convert_date_format(date_str: str) -> str:
     return f"{y}{m.zfill(2)}{d.zfill(2)}"
 
 
-def create_ics_from_sessions(sessions: List[Session], output_file: str) -> None:
+def create_ics_from_sessions(
+    sessions: List[Session],
+    output_file: str,
+    classes: Mapping[Session, str] | None = None,
+) -> None:
     """
     Xuất list Session ra file .ics (import cho Google Calendar, v.v).
+    classes: buổi -> lớp ghi vào mô tả (session_classes), mặc định s.class_name.
     """
+    classes = classes or {}
     current_time = datetime.now().strftime("%Y%m%dT%H%M%SZ")
 
     ics_content = [
@@ -205,7 +1068,7 @@ def create_ics_from_sessions(sessions: List[Session], output_file: str) -> None:
 
         desc = (
             f"Loại: {s.subject_type}\\n"
-            f"Lớp: {s.class_name}\\n"
+            f"Lớp: {classes.get(s, s.class_name)}\\n"
             f"Nhóm: {s.group}\\n"
             f"Giảng viên: {s.lecturer_name}\\n"
             f"Phòng: {s.room}\\n"
@@ -222,3 +1085,87 @@ def create_ics_from_sessions(sessions: List[Session], output_file: str) -> None:
         f.write('\n'.join(ics_content))
 
     print(f"✅ Đã tạo file ICS: {output_file}")
+
+
+# ====== CHẠY KHÔNG CẦN GUI ======
+
+def main():
+    """
+    Xếp lịch tốt nhất từ thư mục HTML lịch học, vd:
+
+        py logic.py "Cơ sở dữ liệu" "Hệ điều hành" --top 3 --prefer-lecturer "Nguyễn Văn A"
+    """
+    import argparse
+    import json
+    import os
+
+    from bell_schedule import BellConfig
+    from parser_html import load_all_sessions
+
+    ap = argparse.ArgumentParser(description="Xếp lịch không trùng, tốt nhất theo trọng số (không cần GUI).")
+    ap.add_argument("subjects", nargs="+", help="tên các môn muốn học (như trong danh sách môn)")
+    ap.add_argument("--html-dir", default="html_all_classes")
+    ap.add_argument("--config", default="config.json",
+                    help="đọc score_weights / bảng giờ từ file này (nếu có)")
+    ap.add_argument("--top", type=int, default=5, help="số lịch tốt nhất cần in")
+    ap.add_argument("--timeout", type=float, default=30)
+    ap.add_argument("--workers", type=int, default=1,
+                    help="số process tìm song song (0 = mọi nhân CPU)")
+    ap.add_argument("--prefer-lecturer", action="append", default=[], help="GV ưa thích (lặp lại được)")
+    ap.add_argument("--prefer-room", action="append", default=[], help="phòng ưa thích (lặp lại được)")
+    ap.add_argument("--ics", default=None, help="xuất lịch tốt nhất ra file .ics")
+    args = ap.parse_args()
+
+    config = {}
+    if os.path.exists(args.config):
+        with open(args.config, encoding="utf-8") as f:
+            config = json.load(f)
+    try:
+        weights = ScoreWeights.from_config(config)
+        bells = BellConfig.from_config(config).for_semester(config.get("ctl00$ContentPlaceHolder$cboHocKy"))
+    except (TypeError, ValueError) as e:
+        print(f"⛔ Config không hợp lệ: {e}")
+        return
+    weights.preferred_lecturers += tuple(args.prefer_lecturer)
+    weights.preferred_rooms += tuple(args.prefer_room)
+
+    dedup = SessionDedup(load_all_sessions(args.html_dir, bells=bells))
+    options = build_course_options(dedup)
+    print(dedup.stats().summary())
+
+    known = {key[1] for key in options}
+    unknown = [name for name in args.subjects if name not in known]
+    if unknown:
+        print(f"⛔ Không có môn: {', '.join(unknown)}")
+        print("Các môn có trong dữ liệu: " + ", ".join(sorted(known)))
+        return
+
+    stats = SolverStats()
+    ranked = best_timetables(
+        options, args.subjects, k=args.top, weights=weights, bells=bells,
+        timeout=args.timeout, stats=stats, workers=args.workers,
+    )
+    if not ranked:
+        if stats.missing:
+            print(f"❌ Các môn sau không có lớp nào dùng được: {', '.join(stats.missing)}")
+        else:
+            print(f"❌ Không có cách chọn nào không trùng lịch ({stats.summary()}).")
+        return
+
+    for i, t in enumerate(ranked, start=1):
+        print(f"#{i} {t.summary()}")
+        for course_code, subject_name, class_name, group in t.keys:
+            group_str = f"nhóm {group}" if group else "không nhóm"
+            print(f"    [{course_code}] {subject_name} - lớp {class_name} - {group_str}")
+    print(f"({stats.summary()})")
+
+    if args.ics:
+        keys = ranked[0].keys
+        create_ics_from_sessions(
+            [s for key in keys for s in options[key]], args.ics,
+            classes=session_classes(options, keys),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,11 @@
 import os
 import sys      # 👈 THÊM DÒNG NÀY
 import json
-from datetime import datetime
+import multiprocessing
+import time
 
 from tkinter import (
-    Tk, Listbox, Text, Scrollbar, END, SINGLE,
+    Tk, Listbox, Text, Scrollbar, END, SINGLE, MULTIPLE,
     BOTH, VERTICAL, HORIZONTAL, BooleanVar,
     Toplevel, Entry
 )
@@ -13,18 +14,32 @@ from tkinter import (
 from tkinter import messagebox, filedialog
 from tkinter import ttk
 
-from parser_html import load_all_sessions
+from parser_html import DEFAULT_ENGINE, load_all_sessions, parse_html_files, semester_dir
+from parse_cache import ParseCache
+from html_watch import HtmlDirWatcher
+from bell_schedule import DEFAULT_BELLS, BellConfig
+from compat_index import CompatibilityIndex
 from logic import (
+    SessionDedup,
     build_course_options,
+    merge_course_options,
+    ScoreWeights,
+    SolverStats,
+    best_timetables,
     find_conflicts,
+    iter_timetables,
     print_conflicts,
     create_ics_from_sessions,
+    session_classes,
 )
 
 import webbrowser
 from pathlib import Path
 from read_ics import build_html_from_ics
-from down_html import download_for_class  # dùng để tải html cho từng lớp
+
+# Lúc tải nhiều lớp: gom lịch các lớp xong trong khoảng này rồi mới dựng lại
+# danh sách môn 1 lần (mỗi lần dựng lại phải sort + vẽ lại cả Listbox)
+UI_REFRESH_SECONDS = 0.5
 
 
 class ScheduleGUI:
@@ -67,9 +82,15 @@ class ScheduleGUI:
         # ====== BIẾN TRẠNG THÁI ======
         self.config: dict = {}
         self.registered_classes: list[str] = []
+        self.bells = DEFAULT_BELLS  # bảng giờ tiết, đọc lại từ config ở bootstrap
+        # config['html_semester']: tải / đọc / theo dõi html_all_classes/<học kỳ>/
+        # (như down_html --semesters); None = thẳng html_all_classes như cũ
+        self.html_semester: str | None = None
 
         self.all_sessions = []
+        self.session_dedup = SessionDedup()  # buổi trùng giữa các lớp chỉ giữ 1 bản
         self.options = {}
+        self.compat = CompatibilityIndex()  # option nào trùng option nào (bộ lọc không trùng)
         self.all_keys: list[tuple] = []
         self.filtered_keys: list[tuple] = []
         self.selected_keys: list[tuple] = []
@@ -78,6 +99,10 @@ class ScheduleGUI:
         # Để biết có đang trùng lịch không (tránh popup liên tục)
         self._had_conflict_popup = False
 
+        # theo dõi file HTML thay đổi để reload từng lớp (không dựng lại từ đầu)
+        self.html_watcher = HtmlDirWatcher(self.html_dir)
+        self._bulk_loading = False
+
         # cửa sổ cấu hình lớp đăng ký
         self.reg_window = None
         self.lb_reg_classes = None
@@ -88,6 +113,7 @@ class ScheduleGUI:
 
         # ====== LOAD CONFIG & BOOTSTRAP ======
         self._load_config_and_bootstrap()
+        self._schedule_html_poll()
 
     # ===================== CONFIG / DOWNLOAD =====================
 
@@ -118,11 +144,14 @@ class ScheduleGUI:
                     classes.append(code)
         self.registered_classes = classes
         self.config["classes"] = self.registered_classes
+        semester = self.config.get("html_semester")
+        self.html_semester = str(semester) if semester else None
+        self.html_watcher = HtmlDirWatcher(self.html_dir, self.html_semester)
+        self._load_bell_schedule()
 
         # 3) Nếu có lớp -> tải html + load lịch
         if self.registered_classes:
             self._download_html_for_registered_classes()
-            self._reload_sessions_from_html()
         else:
             # Không có lớp: vẫn load thử html hiện có (nếu có),
             # rồi mở cửa sổ "Lớp đăng ký" để nhắc người dùng.
@@ -134,6 +163,26 @@ class ScheduleGUI:
             )
             self._open_registered_classes_window(auto_open=True)
 
+    def _load_bell_schedule(self):
+        """Chọn bảng giờ tiết theo config (bell_schedules...) và học kỳ đang xem."""
+        try:
+            bell_config = BellConfig.from_config(self.config)
+        except ValueError as e:
+            messagebox.showwarning(
+                "Bảng giờ không hợp lệ",
+                f"Bảng giờ tiết trong config.json bị lỗi:\n{e}\n\nDùng bảng giờ mặc định."
+            )
+            bell_config = BellConfig()
+        semester = self.html_semester or self.config.get("ctl00$ContentPlaceHolder$cboHocKy")
+        self.bells = bell_config.for_semester(semester)
+
+    def _report_unknown_periods(self):
+        """In các chuỗi tiết không có trong bảng giờ (gặp từ lần báo trước)."""
+        msg = self.bells.report_unknown()
+        if msg:
+            print(msg)
+        self.bells.reset_unknown()
+
     def _save_config(self):
         """Ghi self.config ra config.json."""
         try:
@@ -147,10 +196,29 @@ class ScheduleGUI:
             )
 
     def _download_html_for_registered_classes(self):
-        """Tải HTML lịch học cho toàn bộ lớp trong self.registered_classes (hiện màn loading đơn giản)."""
-        if not self.registered_classes:
+        """Tải + load lịch cho toàn bộ lớp trong self.registered_classes."""
+        self._download_and_index_classes(self.registered_classes, reset=True)
+
+    def _download_and_index_classes(self, class_codes: list[str], reset: bool = True):
+        """
+        Tải HTML lịch học cho các lớp class_codes (hiện màn loading + tiến độ).
+        Lớp nào tải xong được parse ngay (pipeline.iter_class_sessions), không
+        đợi tải hết rồi mới đọc lại thư mục; danh sách môn được dựng lại theo
+        từng đợt UI_REFRESH_SECONDS chứ không phải sau mỗi lớp.
+
+        reset=True: bắt đầu lại từ đầu như _reload_sessions_from_html
+        (bỏ môn đã chọn); reset=False: chỉ thay lịch của các lớp class_codes.
+        """
+        if not class_codes:
             return
 
+        if reset:
+            self.all_sessions = []
+            self.session_dedup = SessionDedup()
+            self.options = {}
+            self._reset_selection()
+        self._refresh_option_index()
+
         win = Toplevel(self.root)
         win.title("Đang tải lịch các lớp")
         win.resizable(False, False)
@@ -158,57 +226,252 @@ class ScheduleGUI:
         lbl = ttk.Label(win, text="Đang chuẩn bị...", padding=10)
         lbl.pack(fill="x")
 
-        pb = ttk.Progressbar(win, mode="determinate", maximum=len(self.registered_classes))
+        pb = ttk.Progressbar(win, mode="determinate", maximum=len(class_codes))
         pb.pack(fill="x", padx=10, pady=(0, 10))
 
         win.update_idletasks()
 
-        total = len(self.registered_classes)
-        for idx, cls in enumerate(self.registered_classes, start=1):
-            lbl.config(text=f"Đang tải lịch cho lớp {cls} ({idx}/{total})...")
-            pb["value"] = idx - 1
-            win.update()
+        total = len(class_codes)
+        lbl.config(text=f"Đang tải lịch cho {total} lớp...")
+        win.update()
 
-            try:
-                download_for_class(cls)
-            except Exception as e:
-                print(f"⛔ Lỗi tải lớp {cls}: {e}")
+        # import lúc cần: không nạp requests / downloader khi mở app
+        from down_html import DownloadConfig, failed_classes
+        from html_cache import DownloadCache
+        from pipeline import iter_class_sessions  # tải + parse html các lớp (song song)
+
+        parse_cache = ParseCache(self.html_dir)
+        results = []
+        pending: dict[str, list] = {}  # lớp đã parse, chưa đưa vào danh sách môn
+        last_refresh = time.perf_counter()
+        self._bulk_loading = True
+        try:
+            stream = iter_class_sessions(
+                class_codes,
+                out_dir=self.html_dir,
+                config=DownloadConfig.from_dict(self.config),
+                engine=self.config.get("download_engine", "thread"),
+                rate=self.config.get("download_rate"),
+                cache=DownloadCache(
+                    self.html_dir,
+                    ttl=self.config.get("cache_ttl", 3600),
+                ),
+                store_mode=self.config.get("store_mode", "full"),
+                semesters=[self.html_semester] if self.html_semester else None,
+                parser_engine=self.config.get("parser_engine", DEFAULT_ENGINE),
+                bells=self.bells,
+                parse_cache=parse_cache,
+            )
+            for done, (res, sessions) in enumerate(stream, start=1):
+                results.append(res)
+                pending[res.class_code] = sessions
+                if time.perf_counter() - last_refresh >= UI_REFRESH_SECONDS:
+                    self._patch_classes(pending)
+                    pending = {}
+                    last_refresh = time.perf_counter()
+
+                status = {
+                    "ok": "xong",
+                    "unchanged": "không đổi",
+                    "cached": "vừa tải, bỏ qua",
+                }.get(res.status, "lỗi")
+                lbl.config(text=f"Lớp {res.class_code} {status} ({done}/{total})...")
+                pb["value"] = done
+                win.update()
+        except Exception as e:
+            print(f"⛔ Lỗi tải lịch: {e}")
+        finally:
+            self._bulk_loading = False
+            if pending:
+                self._patch_classes(pending)
 
         pb["value"] = total
         lbl.config(text="Hoàn tất tải lịch.")
         win.update()
         win.destroy()
 
+        # Khi load lại từ đầu: đọc thêm các file HTML cũ của lớp không nằm
+        # trong đợt tải (giống _reload_sessions_from_html đọc cả thư mục)
+        if reset:
+            self._load_extra_html_files(exclude=set(class_codes), cache=parse_cache)
+        else:
+            parse_cache.save()
+        self.html_watcher.reset()
+        print(f"Đã load {len(self.all_sessions)} buổi học (session).")
+        print(self.session_dedup.stats().summary())
+        self._report_unknown_periods()
+
+        # Báo các lớp tải lỗi / bị ngắt giữa chừng, cho phép tải lại
+        failed = failed_classes(results)
+        if failed and messagebox.askyesno(
+            "Tải lịch chưa xong",
+            f"Không tải được {len(failed)} lớp:\n{', '.join(failed)}\n\n"
+            "Bạn có muốn thử tải lại các lớp này không?"
+        ):
+            self._download_and_index_classes(failed, reset=False)
+
+    def _patch_classes(self, updates: dict[str, list]):
+        """
+        Thay lịch của các lớp trong updates ({class_name: sessions}, list rỗng =
+        bỏ lớp đó) ngay trong self.all_sessions / self.options, không dựng lại
+        từ đầu. Môn đã chọn / môn đang xem được giữ lại nếu vẫn còn.
+        """
+        names = set(updates)
+        self.session_dedup.remove_classes(names)
+        for sessions in updates.values():
+            self.session_dedup.add(sessions)
+        self.all_sessions = self.session_dedup.sessions()
+
+        merge_course_options(self.options, self.session_dedup, names)
+
+        had_selection = bool(self.selected_keys)
+        self.selected_keys[:] = [k for k in self.selected_keys if k in self.options]
+        if self.current_key is not None and self.current_key not in self.options:
+            self.current_key = None
+            self._clear_detail()
+
+        self._refresh_option_index()
+        if had_selection:
+            # lịch của môn đã chọn có thể đã đổi -> vẽ lại + kiểm tra trùng lại
+            self._refresh_selected_list()
+
+    def _load_extra_html_files(self, exclude: set[str], cache: ParseCache | None = None):
+        """
+        Đọc các file HTML của lớp ngoài exclude rồi cập nhật danh sách môn 1 lần.
+        Đi qua load_all_sessions như _reload_sessions_from_html (cache parse +
+        parse song song); file của các lớp vừa tải đã có trong cache nên
+        không bị parse lại. cache được save() khi xong.
+        """
+        # load_all_sessions đếm lại tiết lạ của mọi file (kể cả lớp vừa tải)
+        self.bells.reset_unknown()
+        try:
+            sessions = load_all_sessions(
+                self.html_dir,
+                self.html_semester,
+                engine=self.config.get("parser_engine", DEFAULT_ENGINE),
+                workers=self.config.get("parse_workers", 0),
+                cache=cache or ParseCache(self.html_dir),
+                bells=self.bells,
+            )
+        except FileNotFoundError:
+            return
+        updates: dict[str, list] = {}
+        for s in sessions:
+            if s.class_name not in exclude:
+                updates.setdefault(s.class_name, []).append(s)
+        if updates:
+            self._patch_classes(updates)
+
     def _reload_sessions_from_html(self):
         """Đọc lại toàn bộ html_all_classes -> self.options, self.subject_names, ..."""
-        print(f"Đang đọc các file HTML trong: {self.html_dir}")
+        print(f"Đang đọc các file HTML trong: {semester_dir(self.html_dir, self.html_semester)}")
         try:
-            self.all_sessions = load_all_sessions(self.html_dir)
+            sessions = load_all_sessions(
+                self.html_dir,
+                self.html_semester,
+                engine=self.config.get("parser_engine", DEFAULT_ENGINE),
+                workers=self.config.get("parse_workers", 0),
+                cache=ParseCache(self.html_dir),
+                bells=self.bells,
+            )
         except FileNotFoundError:
-            self.all_sessions = []
-        print(f"Đã load {len(self.all_sessions)} buổi học (session).")
+            sessions = []
+        # gộp buổi trùng giữa các lớp trước khi dựng option / kiểm tra trùng
+        self.session_dedup = SessionDedup(sessions)
+        self.all_sessions = self.session_dedup.sessions()
+        print(f"Đã load {len(sessions)} buổi học (session).")
+        print(self.session_dedup.stats().summary())
+        self._report_unknown_periods()
 
         # build options
         if self.all_sessions:
-            self.options = build_course_options(self.all_sessions)
-            self.all_keys = sorted(
-                self.options.keys(),
-                key=lambda k: (k[1], k[2], k[3])  # subject_name, class_name, group
-            )
-            self.filtered_keys = list(self.all_keys)
-            self.subject_names = sorted({k[1] for k in self.options.keys()})
+            self.options = build_course_options(self.session_dedup)
         else:
             self.options = {}
-            self.all_keys = []
-            self.filtered_keys = []
-            self.subject_names = []
 
-        # reset chọn môn
-        self.selected_keys.clear()
-        self.current_key = None
+        self._reset_selection()
+        self._refresh_option_index()
+        self.html_watcher.reset()
+
+    def _reload_changed_html(self):
+        """
+        Reload từng phần: chỉ parse lại các file .html mới / đã đổi trong
+        thư mục đang đọc (html_dir hoặc html_dir/<html_semester>/) và bỏ lịch
+        của file đã bị xoá (so stat với lần poll trước). Đi qua ParseCache
+        như load_all_sessions: file chỉ bị touch / ghi lại y hệt thì lấy
+        Session từ cache, không parse lại. Trả về DirChanges.
+        """
+        changes = self.html_watcher.poll()
+        if not changes:
+            return changes
+
+        cache = ParseCache(self.html_dir)
+        updates: dict[str, list] = {}
+        for class_name in changes.updated:
+            try:
+                (updates[class_name],) = parse_html_files(
+                    [(class_name, self.html_watcher.path_of(class_name))],
+                    engine=self.config.get("parser_engine", DEFAULT_ENGINE),
+                    cache=cache,
+                    bells=self.bells,
+                )
+            except Exception as e:
+                # file có thể đang ghi dở, lần poll sau sẽ thử lại
+                print(f"⛔ Lỗi đọc lịch lớp {class_name}: {e}")
+                self.html_watcher.snapshot.pop(class_name, None)
+        for class_name in changes.removed:
+            updates[class_name] = []
+        if changes.removed:
+            cache.prune(
+                self.html_watcher.html_dir,
+                {self.html_watcher.path_of(c) for c in self.html_watcher.snapshot},
+            )
+        cache.save()
+
+        print(
+            f"🔄 HTML thay đổi: +{len(changes.added)} ~{len(changes.changed)} "
+            f"-{len(changes.removed)} lớp"
+        )
+        if updates:
+            self._patch_classes(updates)
+        self._report_unknown_periods()
+        return changes
+
+    def _schedule_html_poll(self):
+        """Poll html_dir mỗi config['watch_interval'] giây (0 = tắt)."""
+        interval = self.config.get("watch_interval", 2)
+        if not interval or interval <= 0:
+            return
+        self.root.after(int(interval * 1000), self._poll_html_dir)
+
+    def _poll_html_dir(self):
+        # đang tải / reload toàn bộ thì bỏ qua, xong sẽ reset watcher
+        if not self._bulk_loading:
+            try:
+                self._reload_changed_html()
+            except Exception as e:
+                print(f"⛔ Lỗi reload lịch: {e}")
+        self._schedule_html_poll()
+
+    def _refresh_option_index(self):
+        """Tính lại all_keys / subject_names từ self.options và vẽ lại danh sách môn."""
+        # chỉ index lại các option mới / vừa đổi
+        self.compat.sync(self.options)
+        self.all_keys = sorted(
+            self.options.keys(),
+            key=lambda k: (k[1], k[2], k[3])  # subject_name, class_name, group
+        )
+        self.filtered_keys = list(self.all_keys)
+        self.subject_names = sorted({k[1] for k in self.options.keys()})
 
         self._refresh_subject_combobox()
         self._update_course_list()
+
+    def _reset_selection(self):
+        """Bỏ hết môn đã chọn / môn đang xem."""
+        self.selected_keys.clear()
+        self.current_key = None
+
         self._clear_detail()
         self.lb_selected.delete(0, END)
         self._update_conflict_status()
@@ -245,6 +508,13 @@ class ScheduleGUI:
         )
         chk_non_conflict.pack(anchor="w", pady=(0, 5))
 
+        btn_solver = ttk.Button(
+            frame_left,
+            text="🧩 Tự xếp lịch...",
+            command=self._open_timetable_solver
+        )
+        btn_solver.pack(anchor="w", pady=(0, 5))
+
         lbl_courses = ttk.Label(
             frame_left,
             text="Môn học (gộp LT + TH, chia theo lớp & nhóm):"
@@ -563,8 +833,8 @@ class ScheduleGUI:
             return
 
         # --- XOÁ FILE HTML TƯƠNG ỨNG ---
-        # file dạng: html_all_classes/<MÃ_LỚP>.html
-        html_path = os.path.join(self.html_dir, f"{code}.html")
+        # file dạng: html_all_classes/[<html_semester>/]<MÃ_LỚP>.html
+        html_path = os.path.join(semester_dir(self.html_dir, self.html_semester), f"{code}.html")
         try:
             if os.path.exists(html_path):
                 os.remove(html_path)
@@ -594,7 +864,6 @@ class ScheduleGUI:
 
         # tải html + reload lịch
         self._download_html_for_registered_classes()
-        self._reload_sessions_from_html()
 
     # ===================== helpers =====================
 
@@ -603,6 +872,9 @@ class ScheduleGUI:
             return
         values = ["Tất cả môn"] + (self.subject_names or [])
         self.cmb_class["values"] = values
+        # giữ môn đang lọc nếu vẫn còn (vd. sau khi reload từng phần)
+        if self.cmb_class.get() in values[1:]:
+            return
         if values:
             try:
                 self.cmb_class.current(0)
@@ -652,51 +924,185 @@ class ScheduleGUI:
         if getattr(self, "var_filter_non_conflict", None) is not None \
            and self.var_filter_non_conflict.get() and self.selected_keys:
 
-            # Gom tất cả session của các môn đã chọn
-            selected_sessions = []
-            for sk in self.selected_keys:
-                selected_sessions.extend(self.options[sk])
-
-            non_conflicting_keys = []
-            for k in keys:
-                candidate_sessions = self.options[k]
-                if not self._has_conflict_with_selected(
-                    selected_sessions,
-                    candidate_sessions,
-                ):
-                    non_conflicting_keys.append(k)
-
-            keys = non_conflicting_keys
+            # bỏ các lớp trùng với môn đã chọn hoặc tự trùng với chính nó
+            # (tra bitset trong self.compat, không chạy find_conflicts lại)
+            keys = self.compat.filter_compatible(keys, self.selected_keys)
 
         self.filtered_keys = keys
         for key in self.filtered_keys:
             self.lb_courses.insert(END, self._format_option_label(key))
 
-    def _has_conflict_with_selected(
-        self,
-        selected_sessions: list,
-        candidate_sessions: list,
-    ) -> bool:
+    # ===================== TỰ XẾP LỊCH =====================
+
+    def _format_timetable_label(self, idx: int, combo: tuple) -> str:
+        parts = [
+            f"{k[1]}: {k[2]}" + (f" nhóm {k[3]}" if k[3] else "")
+            for k in combo
+        ]
+        return f"{idx}. " + " | ".join(parts)
+
+    def _open_timetable_solver(self):
         """
-        Trả về True nếu candidate_sessions tạo thêm xung đột
-        với selected_sessions (hoặc tự xung đột với chính nó).
+        Cửa sổ chọn các môn muốn học rồi tìm mọi cách chọn lớp / nhóm không
+        trùng lịch (logic.iter_timetables). Lịch tìm được hiện dần ngay khi
+        có; chọn 1 lịch rồi "Dùng lịch này" để thay danh sách môn đã chọn.
+        "Lịch tốt nhất" xếp hạng theo ít ngày / ít tiết trống / ít tiết tối /
+        GV, phòng ưa thích (logic.best_timetables, trọng số config
+        "score_weights").
         """
-        if not candidate_sessions or not selected_sessions:
-            return False
+        if not self.options:
+            messagebox.showinfo("Tự xếp lịch", "Chưa có dữ liệu môn học.")
+            return
 
-        combined = list(selected_sessions) + list(candidate_sessions)
-        conflicts = find_conflicts(combined)
-        if not conflicts:
-            return False
+        win = Toplevel(self.root)
+        win.title("Tự xếp lịch không trùng")
+        win.geometry("820x480")
 
-        # chỉ quan tâm xung đột trong đó có ít nhất 1 buổi thuộc môn candidate
-        for a, b in conflicts:
-            in_candidate_a = a in candidate_sessions
-            in_candidate_b = b in candidate_sessions
-            if in_candidate_a or in_candidate_b:
-                return True
+        frame = ttk.Frame(win, padding=10)
+        frame.pack(fill=BOTH, expand=True)
+        frame.rowconfigure(1, weight=1)
+        frame.columnconfigure(1, weight=1)
 
-        return False
+        ttk.Label(frame, text="Các môn muốn học:").grid(row=0, column=0, sticky="w")
+        ttk.Label(frame, text="Các lịch không trùng:").grid(
+            row=0, column=1, sticky="w", padx=(10, 0)
+        )
+
+        lb_subjects = Listbox(frame, selectmode=MULTIPLE, exportselection=False, width=34)
+        lb_subjects.grid(row=1, column=0, sticky="ns")
+        # chọn sẵn các môn đang có trong danh sách đã chọn
+        chosen = {k[1] for k in self.selected_keys}
+        for i, name in enumerate(self.subject_names):
+            lb_subjects.insert(END, name)
+            if name in chosen:
+                lb_subjects.selection_set(i)
+
+        lb_results = Listbox(frame, selectmode=SINGLE, exportselection=False)
+        lb_results.grid(row=1, column=1, sticky="nsew", padx=(10, 0))
+        res_scroll_x = Scrollbar(frame, orient=HORIZONTAL, command=lb_results.xview)
+        res_scroll_x.grid(row=2, column=1, sticky="ew", padx=(10, 0))
+        lb_results.config(xscrollcommand=res_scroll_x.set)
+
+        lbl_status = ttk.Label(frame, text="Chọn môn rồi bấm 'Tìm lịch'.")
+        lbl_status.grid(row=3, column=0, columnspan=2, sticky="w", pady=(5, 0))
+
+        results: list[tuple] = []
+
+        def chosen_subjects() -> list[str]:
+            subjects = [self.subject_names[i] for i in lb_subjects.curselection()]
+            if not subjects:
+                lbl_status.config(text="⚠ Chưa chọn môn nào.")
+            return subjects
+
+        def run():
+            subjects = chosen_subjects()
+            if not subjects:
+                return
+            results.clear()
+            lb_results.delete(0, END)
+            lbl_status.config(text="Đang tìm...")
+            win.update_idletasks()
+
+            stats = SolverStats()
+            stream = iter_timetables(
+                self.options, subjects,
+                limit=self.config.get("solver_limit", 200),
+                timeout=self.config.get("solver_timeout", 5),
+                max_nodes=self.config.get("solver_max_nodes", 2_000_000),
+                index=self.compat,
+                stats=stats,
+            )
+            for combo in stream:
+                results.append(combo)
+                lb_results.insert(END, self._format_timetable_label(len(results), combo))
+                # hiện ngay lịch đầu tiên, sau đó vẽ lại theo lô
+                if len(results) == 1 or len(results) % 20 == 0:
+                    lbl_status.config(text=f"Đã tìm được {len(results)} lịch...")
+                    win.update_idletasks()
+
+            if stats.missing:
+                text = "❌ Không có lớp nào dùng được cho: " + ", ".join(stats.missing)
+            elif not results:
+                text = f"❌ Không có cách chọn nào không trùng lịch ({stats.summary()})."
+            else:
+                text = f"✅ {stats.summary()}"
+            lbl_status.config(text=text)
+            if results:
+                lb_results.selection_set(0)
+
+        def run_best():
+            subjects = chosen_subjects()
+            if not subjects:
+                return
+            try:
+                weights = ScoreWeights.from_config(self.config)
+            except (TypeError, ValueError) as e:
+                messagebox.showwarning(
+                    "Trọng số không hợp lệ",
+                    f"score_weights trong config.json bị lỗi:\n{e}\n\nDùng trọng số mặc định."
+                )
+                weights = ScoreWeights()
+            results.clear()
+            lb_results.delete(0, END)
+            lbl_status.config(text="Đang tìm lịch tốt nhất...")
+            win.update_idletasks()
+
+            stats = SolverStats()
+            ranked = best_timetables(
+                self.options, subjects,
+                k=self.config.get("optimizer_top_k", 20),
+                weights=weights,
+                bells=self.bells,
+                timeout=self.config.get("solver_timeout", 5),
+                max_nodes=self.config.get("solver_max_nodes", 2_000_000),
+                index=self.compat,
+                stats=stats,
+                # > 1 = chia cho nhiều process (0 = mọi nhân CPU)
+                workers=self.config.get("solver_workers", 1),
+            )
+            for t in ranked:
+                results.append(t.keys)
+                lb_results.insert(
+                    END, f"{self._format_timetable_label(len(results), t.keys)}  [{t.summary()}]"
+                )
+
+            if stats.missing:
+                text = "❌ Không có lớp nào dùng được cho: " + ", ".join(stats.missing)
+            elif not results:
+                text = "❌ Không có cách chọn nào không trùng lịch."
+            else:
+                done = "" if not stats.stopped else " - chưa chắc là tốt nhất"
+                text = (
+                    f"⭐ {len(results)} lịch tốt nhất trong {stats.solutions} lịch đã chấm, "
+                    f"{stats.elapsed * 1000:.0f} ms{done}"
+                )
+            lbl_status.config(text=text)
+            if results:
+                lb_results.selection_set(0)
+
+        def apply(event=None):
+            sel = lb_results.curselection()
+            if not sel:
+                return
+            self.selected_keys[:] = list(results[sel[0]])
+            self.current_key = None
+            self._clear_detail()
+            self._refresh_selected_list()
+            win.destroy()
+
+        lb_results.bind("<Double-Button-1>", apply)
+
+        frame_btns = ttk.Frame(frame)
+        frame_btns.grid(row=4, column=0, columnspan=2, sticky="ew", pady=(5, 0))
+        ttk.Button(frame_btns, text="🔍 Tìm lịch", command=run).pack(side="left")
+        ttk.Button(frame_btns, text="⭐ Lịch tốt nhất", command=run_best).pack(
+            side="left", padx=(5, 0)
+        )
+        ttk.Button(
+            frame_btns, text="✅ Dùng lịch này (thay các môn đã chọn)", command=apply
+        ).pack(side="right")
+
+        win.transient(self.root)
 
     # ===================== event handlers =====================
 
@@ -754,10 +1160,12 @@ class ScheduleGUI:
         return "Khác"
 
     @staticmethod
-    def _weekday_vi(date_str: str) -> str:
-        d = datetime.strptime(date_str, "%d-%m-%Y")
+    def _weekday_vi(weekday: int) -> str:
+        """weekday: Session.weekday (0 = Thứ 2, -1 = không rõ ngày)."""
+        if weekday < 0:
+            return "?"
         mapping = ["Thứ 2", "Thứ 3", "Thứ 4", "Thứ 5", "Thứ 6", "Thứ 7", "Chủ nhật"]
-        return mapping[d.weekday()]
+        return mapping[weekday]
 
     def _clear_detail(self):
         self.txt_detail.config(state="normal")
@@ -767,10 +1175,7 @@ class ScheduleGUI:
     def _show_course_detail(self, key: tuple):
         sessions = sorted(
             self.options.get(key, []),
-            key=lambda s: (
-                self._date_sort_key(s.date),
-                s.start,
-            ),
+            key=lambda s: (s.day, s.start_min),
         )
 
         course_code, subject_name, class_name, group = key
@@ -787,7 +1192,7 @@ class ScheduleGUI:
         self.txt_detail.insert(END, "-" * 70 + "\n")
 
         for s in sessions:
-            weekday = self._weekday_vi(s.date)
+            weekday = self._weekday_vi(s.weekday)
             buoi = self._buoi_from_lesson(s.lesson_period)
             time_range = f"{s.start[:2]}:{s.start[2:4]} - {s.end[:2]}:{s.end[2:4]}"
             line = (
@@ -798,11 +1203,6 @@ class ScheduleGUI:
 
         self.txt_detail.config(state="disabled")
 
-    @staticmethod
-    def _date_sort_key(date_str: str):
-        d, m, y = date_str.split("-")
-        return int(y), int(m), int(d)
-
     # ---------- add/remove course ----------
 
     def _add_current_course(self):
@@ -853,16 +1253,17 @@ class ScheduleGUI:
         self._update_course_list()
 
     # ---------- conflicts & export ----------
-    def _format_conflicts_text(self, conflicts):
+    def _format_conflicts_text(self, conflicts, classes):
         """
         Tạo chuỗi text đẹp để hiện trong messagebox cho các cặp trùng lịch.
+        classes: buổi -> lớp theo các môn đã chọn (session_classes).
         """
         lines = []
         for idx, (a, b) in enumerate(conflicts, start=1):
             lines.append(
                 f"{idx}. {a.date} - tiết {a.lesson_period}\n"
-                f"   {a.subject_name} ({a.class_name}, nhóm {a.group}, phòng {a.room})\n"
-                f"   ↔ {b.subject_name} ({b.class_name}, nhóm {b.group}, phòng {b.room})"
+                f"   {a.subject_name} ({classes.get(a, a.class_name)}, nhóm {a.group}, phòng {a.room})\n"
+                f"   ↔ {b.subject_name} ({classes.get(b, b.class_name)}, nhóm {b.group}, phòng {b.room})"
             )
             # Giới hạn cho đỡ dài, cần thì bỏ giới hạn này
             if idx >= 10:
@@ -898,11 +1299,13 @@ class ScheduleGUI:
                 text=f"❌ Có {len(conflicts)} cặp trùng lịch (chi tiết in console).",
                 foreground="red"
             )
-            print_conflicts(conflicts)
+            # option dùng chung Session giữa các lớp: lớp lấy từ key đã chọn
+            classes = session_classes(self.options, self.selected_keys)
+            print_conflicts(conflicts, classes)
 
             # 👉 Hiện messagebox + chi tiết các cặp trùng
             if not self._had_conflict_popup:
-                detail_text = self._format_conflicts_text(conflicts)
+                detail_text = self._format_conflicts_text(conflicts, classes)
                 messagebox.showwarning(
                     "Trùng lịch",
                     f"Đang có {len(conflicts)} cặp buổi học trùng lịch:\n\n{detail_text}"
@@ -942,7 +1345,10 @@ class ScheduleGUI:
             return
 
         # 1) Xuất ICS
-        create_ics_from_sessions(all_sessions, filename)
+        create_ics_from_sessions(
+            all_sessions, filename,
+            classes=session_classes(self.options, self.selected_keys),
+        )
 
         # 2) Đọc ICS -> tạo file HTML viewer (đặt cạnh file ICS)
         try:
@@ -990,4 +1396,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # bản đóng gói (.exe) cần dòng này để process parse song song chạy được
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,222 @@
+# mock_portal.py
+"""
+Server HTTP giả lập trang XemLichHoc.aspx để thử downloader ở local,
+không cần gọi vào portal thật.
+
+Chạy riêng:
+    py mock_portal.py 8765
+
+Hoặc dùng trong code:
+    server, url = start_mock_portal()
+    download_classes(["D20CQCN01-N"], url=url)
+    server.shutdown()
+
+Giả lập điều kiện mạng (dùng cho bench_download.py):
+    server, url = start_mock_portal(latency=0.05, jitter=0.02, error_rate=0.05, n_rows=200)
+"""
+import gzip
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+SUBJECTS = [
+    "Quản trị mạng",
+    "Lập trình Python",
+    "Cơ sở dữ liệu",
+    "Mạng máy tính",
+    "Hệ điều hành",
+    "Trí tuệ nhân tạo",
+    "Kinh tế chính trị",
+    "Tiếng Anh chuyên ngành",
+]
+LECTURERS = ["Nguyễn Văn A", "Trần Thị B", "Lê Văn C", "Phạm Thị D"]
+ROOMS = ["A101", "A205", "B302", "C404", "PM01"]
+
+
+def build_schedule_page(
+    class_code: str,
+    semester: str = "37",
+    n_rows: int = 40,
+    viewstate: str = "/wEPDwUKMTc5NTg2NTYyNg9kFgJmD2QWAgIBD2Q",
+) -> str:
+    """
+    Sinh 1 trang HTML có cấu trúc giống trang thật:
+    form ASP.NET + 1 bảng table-lich_hoc với n_rows buổi học.
+    Cùng class_code + semester thì luôn sinh ra cùng nội dung.
+    """
+    rnd = random.Random(f"{semester}/{class_code}")
+    rows = []
+    for i in range(n_rows):
+        subject = rnd.choice(SUBJECTS)
+        kind = rnd.choice(["Lý thuyết: 30 tiết", "Thực hành: 48 tiết"])
+        group = rnd.choice([0, 0, 1, 2])
+        name = f"{subject} ({kind})" + (f" Nhóm {group}" if group else "")
+        p1 = rnd.randint(1, 12)
+        p2 = min(14, p1 + rnd.randint(0, 2))
+        day = 1 + (i % 28)
+        month = 8 + (i // 28) % 4
+        date = f"{day:02d}-{month:02d}-2025"
+        rows.append(
+            "<tr>"
+            f"<td>{1000 + SUBJECTS.index(subject):012d}</td>"
+            f"<td>{name.replace(' (', '<br>(', 1)}</td>"
+            f"<td>{p1} -&gt; {p2}</td>"
+            f"<td>{rnd.choice(LECTURERS)}</td>"
+            f"<td>{rnd.choice(ROOMS)}</td>"
+            f"<td>Từ: {date}<br>Đến: {date}</td>"
+            "</tr>"
+        )
+
+    return (
+        "<!DOCTYPE html><html><head><title>Xem lịch học</title></head><body>"
+        '<form method="post" action="./XemLichHoc.aspx?k=1" id="aspnetForm">'
+        f'<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="{viewstate}" />'
+        '<input type="hidden" name="__VIEWSTATEGENERATOR" id="__VIEWSTATEGENERATOR" value="147CF116" />'
+        f'<input name="ctl00$ContentPlaceHolder$txtMaLopHoc" type="text" value="{class_code}" />'
+        '<table class="table table-lich_hoc">'
+        "<tr><th>Mã HP</th><th>Tên môn</th><th>Tiết</th><th>Giảng viên</th>"
+        "<th>Phòng</th><th>Thời gian học</th></tr>"
+        + "".join(rows)
+        + "</table></form></body></html>"
+    )
+
+
+class MockPortalHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # giữ kết nối (keep-alive) như server thật
+    # header và body được ghi 2 lần: không tắt Nagle thì mỗi response bị
+    # delayed-ACK giữ thêm ~40ms, làm sai số đo của bench_download.py
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass  # tắt log mỗi request cho đỡ rối
+
+    def _send_html(self, html: str, status: int = 200):
+        body = html.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if not urlparse(self.path).path.endswith("XemLichHoc.aspx"):
+            self._send_html("<h1>404</h1>", status=404)
+            return
+        self.server.stats["get"] += 1
+        self._send_html(build_schedule_page("", n_rows=0, viewstate=self.server.viewstate))
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        form = parse_qs(self.rfile.read(length).decode("utf-8"))
+        if not urlparse(self.path).path.endswith("XemLichHoc.aspx"):
+            self._send_html("<h1>404</h1>", status=404)
+            return
+        self.server.stats["post"] += 1
+        self.server.simulate_latency()
+        if self.server.should_fail():
+            self.server.stats["errors"] += 1
+            self._send_html("<h1>Service Unavailable</h1>", status=503)
+            return
+        # giống ASP.NET: __VIEWSTATE cũ / sai -> lỗi 500
+        if form.get("__VIEWSTATE", [""])[0] != self.server.viewstate:
+            self.server.stats["rejected"] += 1
+            self._send_html(
+                "<h1>Server Error</h1><p>Validation of viewstate MAC failed.</p>",
+                status=500,
+            )
+            return
+        class_code = form.get("ctl00$ContentPlaceHolder$txtMaLopHoc", [""])[0]
+        semester = form.get("ctl00$ContentPlaceHolder$cboHocKy", ["37"])[0]
+        self._send_html(
+            build_schedule_page(
+                class_code, semester,
+                n_rows=self.server.n_rows,
+                viewstate=self.server.viewstate,
+            )
+        )
+
+
+class MockPortalServer(ThreadingHTTPServer):
+    """
+    ThreadingHTTPServer kèm state giả lập:
+      - viewstate: giá trị __VIEWSTATE hợp lệ hiện tại (đổi bằng rotate_viewstate)
+      - stats: đếm số GET / POST / POST bị từ chối / POST trả lỗi 503
+      - latency (+ jitter ngẫu nhiên): số giây chờ trước khi trả mỗi POST
+      - error_rate: tỉ lệ POST trả 503 (0..1)
+      - n_rows: số buổi học mỗi trang (quyết định kích thước payload)
+    """
+    daemon_threads = True
+    request_queue_size = 128  # bench bắn nhiều kết nối cùng lúc
+
+    def __init__(
+        self,
+        addr,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        n_rows: int = 40,
+        seed: int | None = None,
+    ):
+        super().__init__(addr, MockPortalHandler)
+        self.viewstate = "/wEPDwUKMTc5NTg2NTYyNg9kFgJmD2QWAgIBD2Q"
+        self.stats = {"get": 0, "post": 0, "rejected": 0, "errors": 0}
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.n_rows = n_rows
+        self._rnd = random.Random(seed)
+        self._rnd_lock = threading.Lock()
+
+    def simulate_latency(self):
+        delay = self.latency
+        if self.jitter:
+            with self._rnd_lock:
+                delay += self._rnd.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def should_fail(self) -> bool:
+        if self.error_rate <= 0:
+            return False
+        with self._rnd_lock:
+            return self._rnd.random() < self.error_rate
+
+    def rotate_viewstate(self):
+        """Giả lập server restart / state hết hạn: state cũ không còn hợp lệ."""
+        self.viewstate = f"/wEPDw{random.getrandbits(64):016x}"
+
+
+def start_mock_portal(host: str = "127.0.0.1", port: int = 0, **options):
+    """
+    Chạy server giả lập ở luồng nền.
+    Trả về (server, url) với url trỏ tới XemLichHoc.aspx, port=0 = tự chọn port trống.
+    options: latency, jitter, error_rate, n_rows, seed (xem MockPortalServer).
+    Gọi server.shutdown() khi dùng xong.
+    """
+    server = MockPortalServer((host, port), **options)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://{host}:{server.server_address[1]}/XemLichHoc.aspx"
+    return server, url
+
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    server = MockPortalServer(("127.0.0.1", port))
+    print(f"Mock portal chạy tại http://127.0.0.1:{port}/XemLichHoc.aspx (Ctrl+C để dừng)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,57 @@
-# models.py
-from dataclasses import dataclass
+from dataclasses import dataclass, field, fields
+from datetime import date as _date
+from functools import lru_cache
 
-@dataclass
+# ===== BẢNG CHUỖI DÙNG CHUNG =====
+# Tên môn, giảng viên, phòng, lớp, ngày... lặp lại hàng nghìn lần giữa các
+# buổi học; parser đưa mọi chuỗi qua intern() để các Session dùng chung
+# 1 object str thay vì mỗi dòng 1 bản sao.
+_STRINGS: dict[str, str] = {}
+
+
+def intern(s: str) -> str:
+    """Trả về bản dùng chung của s trong bảng chuỗi."""
+    return _STRINGS.setdefault(s, s)
+
+
+def interned_count() -> int:
+    return len(_STRINGS)
+
+
+def clear_interned():
+    """Xoá bảng chuỗi (Session đang có vẫn giữ chuỗi của nó)."""
+    _STRINGS.clear()
+
+
+# ===== GIẢI MÃ NGÀY / GIỜ =====
+# Ngày và giờ giữ dạng chuỗi để hiển thị, nhưng mỗi Session tính sẵn dạng
+# số 1 lần lúc tạo để sort / so sánh trùng lịch chỉ so số nguyên.
+# Cùng 1 chuỗi ngày/giờ lặp lại rất nhiều nên cache kết quả giải mã.
+
+@lru_cache(maxsize=None)
+def date_ordinal(date_str: str) -> int:
+    """'dd-mm-yyyy' -> date.toordinal(); 0 nếu không đọc được (ngày chưa xếp...)."""
+    try:
+        d, m, y = date_str.split('-')
+        return _date(int(y), int(m), int(d)).toordinal()
+    except ValueError:
+        return 0
+
+
+@lru_cache(maxsize=None)
+def time_minutes(hhmmss: str) -> int:
+    """'HHMMSS' -> số phút từ 0h."""
+    return int(hhmmss[:2]) * 60 + int(hhmmss[2:4])
+
+
+@dataclass(frozen=True, slots=True)
 class Session:
     """
     Đại diện cho 1 buổi học (một dòng trong lịch).
+    Bất biến (frozen) và hash được, dùng làm key dict / phần tử set được.
+
+    day / start_min / end_min được tính từ date / start / end khi tạo,
+    không tham gia so sánh (==, hash).
     """
     course_code: str      # Mã học phần
     subject_name: str     # Tên môn
@@ -17,3 +64,31 @@ class Session:
     start: str            # "HHMMSS" - giờ bắt đầu
     end: str              # "HHMMSS" - giờ kết thúc
     class_name: str       # Tên lớp hành chính (vd: D20CQCN01-N)
+
+    day: int = field(init=False, repr=False, compare=False)        # date.toordinal(), 0 = không rõ
+    start_min: int = field(init=False, repr=False, compare=False)  # phút từ 0h
+    end_min: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "day", date_ordinal(self.date))
+        object.__setattr__(self, "start_min", time_minutes(self.start))
+        object.__setattr__(self, "end_min", time_minutes(self.end))
+
+    @property
+    def weekday(self) -> int:
+        """0 = Thứ 2 ... 6 = Chủ nhật (như date.weekday()), -1 nếu không rõ ngày."""
+        return (self.day - 1) % 7 if self.day else -1
+
+    def __reduce__(self):
+        # unpickle (cache parse, process pool) cũng đi qua bảng chuỗi,
+        # không tạo lại mỗi Session 1 bản sao chuỗi
+        return make_session, tuple(getattr(self, name) for name in SESSION_FIELDS)
+
+
+# các trường truyền vào Session(...) theo đúng thứ tự (không gồm trường tính sẵn)
+SESSION_FIELDS = tuple(f.name for f in fields(Session) if f.init)
+
+
+def make_session(*values) -> Session:
+    """Tạo Session với các trường chuỗi đã intern (thứ tự trường như Session)."""
+    return Session(*(intern(v) if type(v) is str else v for v in values))
@@ -0,0 +1,148 @@
+# parse_cache.py
+"""
+Cache kết quả parse HTML -> list[Session] giữa các lần mở app.
+
+File <html_dir>/_parse_cache.pkl lưu với mỗi file lịch (khoá theo đường dẫn
+tương đối trong html_dir):
+  - size, mtime_ns: stat lúc parse
+  - sha256: hash nội dung lúc parse
+  - bells: fingerprint bảng giờ tiết dùng khi parse
+  - sessions: list[Session] đã parse
+
+Khi reload:
+  - size + mtime_ns không đổi -> dùng luôn, không đọc file
+  - stat đổi nhưng hash y hệt (vd. copy lại file) -> dùng luôn, cập nhật stat
+  - còn lại (hoặc parse với bảng giờ khác) -> parse lại
+
+Cả file cache bị bỏ khi PARSE_CACHE_VERSION hoặc parser_html.PARSER_VERSION
+đổi, nên nâng cấp parser thì không đọc nhầm Session kiểu cũ.
+"""
+import hashlib
+import os
+import pickle
+import threading
+from dataclasses import dataclass
+
+from models import Session
+from parser_html import PARSER_VERSION
+
+PARSE_CACHE_NAME = "_parse_cache.pkl"
+PARSE_CACHE_VERSION = 3  # 2: Session frozen + slots, 3: thêm fingerprint bảng giờ
+
+
+@dataclass
+class ParsedEntry:
+    size: int
+    mtime_ns: int
+    sha256: str
+    bells: str
+    sessions: list[Session]
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ParseCache:
+    """
+    Cache dùng chung cho 1 lần reload (an toàn khi gọi từ nhiều luồng).
+    Gọi save() sau khi dùng xong để ghi ra đĩa.
+    """
+
+    def __init__(self, html_dir: str, path: str | None = None):
+        self.html_dir = html_dir
+        self.path = path or os.path.join(html_dir, PARSE_CACHE_NAME)
+        self.version = (PARSE_CACHE_VERSION, PARSER_VERSION)
+        self._lock = threading.Lock()
+        self._entries: dict[str, ParsedEntry] = {}
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _key(self, path: str) -> str:
+        return os.path.relpath(path, self.html_dir).replace(os.sep, "/")
+
+    def _load(self):
+        try:
+            with open(self.path, "rb") as f:
+                raw = pickle.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"⚠️ Cache parse hỏng ({e}), sẽ parse lại.")
+            return
+
+        if not isinstance(raw, dict) or raw.get("version") != self.version:
+            print("ℹ️ Parser đã đổi phiên bản, bỏ cache parse cũ.")
+            self._dirty = True  # ghi đè file cũ ở lần save() tới
+            return
+        self._entries = raw.get("entries", {})
+
+    def save(self):
+        """Ghi cache ra đĩa (chỉ khi có thay đổi), ghi qua file tạm cho an toàn."""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"version": self.version, "entries": self._entries}
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.path)
+            self._dirty = False
+
+    def lookup(self, path: str, bells: str) -> tuple[list[Session] | None, tuple]:
+        """
+        bells: fingerprint bảng giờ sẽ dùng để parse (BellSchedule.fingerprint()).
+
+        Trả về (sessions, stamp):
+          - sessions: list đã parse nếu file chưa đổi, None nếu phải parse lại
+          - stamp: đưa lại cho store() sau khi parse, để khỏi stat/hash lần nữa
+        """
+        st = os.stat(path)
+        key = self._key(path)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry.bells != bells:
+            entry = None  # giờ tiết trong Session cũ tính theo bảng giờ khác
+
+        if entry is not None and entry.size == st.st_size and entry.mtime_ns == st.st_mtime_ns:
+            self.hits += 1
+            return entry.sessions, (st.st_size, st.st_mtime_ns, entry.sha256, bells)
+
+        digest = file_sha256(path)
+        if entry is not None and entry.size == st.st_size and entry.sha256 == digest:
+            # nội dung y hệt, chỉ khác mtime: cập nhật stat cho lần sau
+            with self._lock:
+                entry.mtime_ns = st.st_mtime_ns
+                self._dirty = True
+            self.hits += 1
+            return entry.sessions, (st.st_size, st.st_mtime_ns, digest, bells)
+
+        self.misses += 1
+        return None, (st.st_size, st.st_mtime_ns, digest, bells)
+
+    def store(self, path: str, stamp: tuple, sessions: list[Session]):
+        size, mtime_ns, digest, bells = stamp
+        with self._lock:
+            self._entries[self._key(path)] = ParsedEntry(size, mtime_ns, digest, bells, sessions)
+            self._dirty = True
+
+    def prune(self, html_dir: str, keep: set[str]):
+        """Bỏ entry của các file trong html_dir (không tính thư mục con) không còn trong keep."""
+        prefix = self._key(os.path.join(html_dir, "x"))[:-1]  # "" hoặc "37/"
+        keep_keys = {self._key(p) for p in keep}
+        with self._lock:
+            stale = [
+                k for k in self._entries
+                if k.startswith(prefix) and "/" not in k[len(prefix):] and k not in keep_keys
+            ]
+            for k in stale:
+                del self._entries[k]
+            if stale:
+                self._dirty = True
@@ -1,98 +1,135 @@
 # parser_html.py
 import os
 import re
-from bs4 import BeautifulSoup
+from concurrent.futures import ProcessPoolExecutor
+from html import escape
+from html.parser import HTMLParser
+from typing import Iterable, Iterator
 
-from models import Session
+from bell_schedule import DEFAULT_BELLS, BellConfig, BellSchedule
+from models import Session, intern
 
+# Engine parse bảng lịch:
+#   "fast": đọc luồng sự kiện của html.parser, chỉ gom text các ô trong
+#           bảng table-lich_hoc, không dựng cây DOM (mặc định)
+#   "bs4":  dựng cây BeautifulSoup cả trang như code gốc (để đối chiếu)
+PARSER_ENGINES = ("fast", "bs4")
+DEFAULT_ENGINE = "fast"
 
-def parse_schedule_html(html: str, class_name: str) -> list[Session]:
+# Tăng số này mỗi khi đổi cách parse ra Session (cột, format, giờ tiết...)
+# để parse_cache bỏ các kết quả parse cũ
+PARSER_VERSION = 1
+
+# Ít file hơn thế này thì parse tuần tự luôn: dựng process pool còn lâu hơn parse
+PARALLEL_MIN_FILES = 16
+
+# Đọc file theo từng đoạn này khi stream (engine "fast")
+READ_CHUNK_SIZE = 64 * 1024
+
+_DATE_RE = re.compile(r"\d{2}-\d{2}-\d{4}")
+
+# ===== XỬ LÝ 1 DÒNG (dùng chung cho mọi engine) =====
+
+def extract_subject_type(s: str) -> str:
+    return 'Lý thuyết' if 'Lý thuyết' in s else 'Thực hành'
+
+
+def extract_subject_name_and_group(s: str) -> tuple[str, int]:
     """
-    Parse HTML lịch học của 1 lớp thành danh sách Session.
+    Tách tên môn + nhóm từ chuỗi ở cột 'Tên môn'.
+    Ví dụ:
+      "Quản trị mạng (Thực hành: 48 tiết) Nhóm 2"
     """
+    s_lower = s.lower()
+    words = [w.strip() for w in s.split(' ') if w.strip()]
+
+    if 'nhóm' not in s_lower:
+        # Không có từ "nhóm" => không có nhóm
+        # Bỏ 4 từ cuối: "(Lý", "thuyết:", "30", "tiết)" hoặc "(Thực", "hành:", "48", "tiết)"
+        return ' '.join(words[:-4]), 0
+    else:
+        # Có "nhóm" => nhóm ở từ cuối cùng
+        try:
+            group = int(words[-1])
+        except ValueError:
+            group = 0
+        # Đuôi thường là: "(Thực", "hành:", "48", "tiết)", "Nhóm", "2" => bỏ 6 từ
+        return ' '.join(words[:-6]), group
+
+
+def extract_date(s: str) -> str:
+    """
+    Lấy ngày học (đầu tiên) dạng 'dd-mm-yyyy' từ cột 'Thời gian học'.
+
+    Ví dụ:
+      "Từ: 06-04-2026 Đến: 06-04-2026" -> "06-04-2026"
+      "Thứ 2 (11-08-2025)"            -> "11-08-2025"
+    """
+    m = _DATE_RE.search(s)
+    if m:
+        return m.group(0)
+    return s  # fallback nếu format lạ, đỡ bị crash
+
+
+def convert_lesson_period_to_time(
+    lesson_period: str,
+    bells: BellSchedule = DEFAULT_BELLS,
+) -> tuple[str, str]:
+    """
+    Map từ tiết sang giờ bắt đầu / kết thúc theo bảng giờ bells.
+    Tiết lạ -> 07:00-07:45 như code cũ, nhưng được đếm trong bells.unknown.
+    """
+    return bells.time_of(lesson_period)
+
+
+def session_from_cells(
+    cells: list[str],
+    class_name: str,
+    bells: BellSchedule = DEFAULT_BELLS,
+) -> Session | None:
+    """
+    Dựng Session từ text các ô <td> của 1 dòng (đã gộp <br> bằng khoảng
+    trắng và strip, giống tag.get_text(" ", strip=True)).
+    Trả về None với dòng "kết thúc" như code gốc.
+    """
+    name_cell = cells[1]
+    # Bỏ dòng "kết thúc" như code gốc
+    if 'kết thúc' in name_cell.lower():
+        return None
+
+    subject_name, group = extract_subject_name_and_group(name_cell)
+    lesson_period = cells[2]
+    start, end = bells.time_of(lesson_period)
+
+    # chuỗi lặp lại nhiều (tên môn, GV, phòng, ngày...) dùng chung qua intern()
+    return Session(
+        course_code=intern(cells[0]),
+        subject_name=intern(subject_name),
+        subject_type=extract_subject_type(name_cell),
+        group=group,
+        lesson_period=intern(lesson_period),
+        lecturer_name=intern(cells[3]),
+        room=intern(cells[4]),
+        date=intern(extract_date(cells[5])),
+        start=start,
+        end=end,
+        class_name=intern(class_name)
+    )
+
+
+# ===== ENGINE "bs4" =====
+
+def _iter_schedule_bs4(html: str, class_name: str, bells: BellSchedule) -> Iterator[Session]:
+    # bs4 cần cả cây trang nên không stream được, chỉ yield dần kết quả
+    from bs4 import BeautifulSoup
 
     def fresh(tag):
         # Gộp các <br> bằng khoảng trắng để text liền mạch, dễ tách
         return tag.get_text(" ", strip=True)
 
-    def extract_subject_type(text_tag):
-        s = fresh(text_tag)
-        return 'Lý thuyết' if 'Lý thuyết' in s else 'Thực hành'
-
-    def extract_subject_name_and_group(text_tag):
-        """
-        Tách tên môn + nhóm từ chuỗi ở cột 'Tên môn'.
-        Ví dụ:
-          "Quản trị mạng (Thực hành: 48 tiết) Nhóm 2"
-        """
-        s = fresh(text_tag)
-        s_lower = s.lower()
-        words = [w.strip() for w in s.split(' ') if w.strip()]
-
-        if 'nhóm' not in s_lower:
-            # Không có từ "nhóm" => không có nhóm
-            # Bỏ 4 từ cuối: "(Lý", "thuyết:", "30", "tiết)" hoặc "(Thực", "hành:", "48", "tiết)"
-            return ' '.join(words[:-4]), 0
-        else:
-            # Có "nhóm" => nhóm ở từ cuối cùng
-            try:
-                group = int(words[-1])
-            except ValueError:
-                group = 0
-            # Đuôi thường là: "(Thực", "hành:", "48", "tiết)", "Nhóm", "2" => bỏ 6 từ
-            return ' '.join(words[:-6]), group
-
-    def extract_date(text_tag):
-        """
-        Lấy ngày học (đầu tiên) dạng 'dd-mm-yyyy' từ cột 'Thời gian học'.
-
-        Ví dụ:
-          "Từ: 06-04-2026 Đến: 06-04-2026" -> "06-04-2026"
-          "Thứ 2 (11-08-2025)"            -> "11-08-2025"
-        """
-        s = fresh(text_tag)
-        m = re.search(r"\d{2}-\d{2}-\d{4}", s)
-        if m:
-            return m.group(0)
-        return s  # fallback nếu format lạ, đỡ bị crash
-
-    def convert_lesson_period_to_time(lesson_period: str):
-        """
-        Map từ tiết sang giờ bắt đầu / kết thúc.
-        Dùng y như code cũ.
-        """
-        time_table = {
-            1: ("070000", "075000"),
-            2: ("075500", "084500"),
-            3: ("085000", "094000"),
-            4: ("095000", "104000"),
-            5: ("104500", "113500"),
-            6: ("123000", "132000"),
-            7: ("132500", "141500"),
-            8: ("142000", "151000"),
-            9: ("152000", "161000"),
-            10: ("161500", "170500"),
-            11: ("173000", "182000"),
-            12: ("182500", "191500"),
-            13: ("192000", "201000"),
-            14: ("201500", "210500"),
-        }
-        try:
-            p1, p2 = lesson_period.split(" -> ")
-            start_lesson = int(p1)
-            end_lesson = int(p2)
-            start_time = time_table[start_lesson][0]
-            end_time = time_table[end_lesson][1]
-            return start_time, end_time
-        except Exception:
-            # fallback nếu có lỗi format
-            return "070000", "074500"
-
     soup = BeautifulSoup(html, 'html.parser')
     all_tables = soup.find_all('table', class_='table-lich_hoc')
 
-    sessions: list[Session] = []
-
     for table in all_tables:
         lectures = table.find_all('tr')
         for lecture in lectures:
@@ -100,61 +137,414 @@ def parse_schedule_html(html: str, class_name: str) -> list[Session]:
             if not in4:
                 continue
 
-            # Bỏ dòng "kết thúc" như code gốc
-            if 'kết thúc' in fresh(in4[1]).lower():
-                continue
+            session = session_from_cells([fresh(td) for td in in4[:6]], class_name, bells)
+            if session is not None:
+                yield session
+
+
+# ===== ENGINE "fast" =====
 
-            course_code = fresh(in4[0])
-            subject_name, group = extract_subject_name_and_group(in4[1])
-            subject_type = extract_subject_type(in4[1])
-            lesson_period = fresh(in4[2])
-            lecturer_name = fresh(in4[3])
-            room = fresh(in4[4])
-            date = extract_date(in4[5])
-            start, end = convert_lesson_period_to_time(lesson_period)
-
-            sessions.append(Session(
-                course_code=course_code,
-                subject_name=subject_name,
-                subject_type=subject_type,
-                group=group,
-                lesson_period=lesson_period,
-                lecturer_name=lecturer_name,
-                room=room,
-                date=date,
-                start=start,
-                end=end,
-                class_name=class_name
-            ))
-
-    return sessions
-
-
-def parse_html_file(path: str, class_name: str) -> list[Session]:
+class _ScheduleRowParser(HTMLParser):
     """
-    Đọc file HTML từ disk rồi parse.
+    Đọc tuần tự các thẻ, chỉ để ý phần nằm trong <table class="table-lich_hoc">:
+    mỗi <tr> là 1 dòng, mỗi <td> là 1 ô, text trong ô được strip từng đoạn
+    rồi nối bằng 1 khoảng trắng (giống get_text(" ", strip=True)).
+    Phần còn lại của trang (form, viewstate, menu...) bị bỏ qua, không lưu gì.
+
+    feed() được gọi nhiều lần với từng đoạn HTML; các dòng đã xong nằm trong
+    self.rows, bên gọi lấy ra (và xoá) sau mỗi lần feed.
     """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows: list[list[str]] = []
+        self._table_depth = 0      # số <table> đang mở, tính từ bảng lịch ngoài cùng
+        self._row: list[str] | None = None
+        self._cell: list[str] | None = None
+        self._text: list[str] = []  # 1 đoạn text có thể bị cắt ra nhiều lần handle_data
+        self._skip = 0             # đang trong <script>/<style>
+
+    def _flush_text(self):
+        # hết 1 đoạn text (gặp thẻ / comment): strip rồi mới đưa vào ô
+        if self._text:
+            data = "".join(self._text).strip()
+            self._text = []
+            if data and self._cell is not None:
+                self._cell.append(data)
+
+    def _close_cell(self):
+        self._flush_text()
+        if self._cell is not None:
+            self._row.append(" ".join(self._cell))
+            self._cell = None
+
+    def _close_row(self):
+        self._close_cell()
+        if self._row:
+            self.rows.append(self._row)
+        self._row = None
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_text()
+        if tag == "table":
+            if self._table_depth:
+                self._table_depth += 1
+            else:
+                classes = next((v for k, v in attrs if k == "class"), None) or ""
+                if "table-lich_hoc" in classes.split():
+                    self._table_depth = 1
+            return
+        if not self._table_depth:
+            return
+        if tag == "tr":
+            self._close_row()
+            self._row = []
+        elif tag == "td" and self._row is not None:
+            self._close_cell()
+            self._cell = []
+        elif tag == "th":
+            self._close_cell()
+        elif tag in ("script", "style"):
+            self._skip += 1
+
+    def handle_endtag(self, tag):
+        self._flush_text()
+        if not self._table_depth:
+            return
+        if tag == "table":
+            self._table_depth -= 1
+            if not self._table_depth:
+                self._close_row()
+        elif tag == "tr":
+            self._close_row()
+        elif tag == "td":
+            self._close_cell()
+        elif tag in ("script", "style") and self._skip:
+            self._skip -= 1
+
+    def handle_data(self, data):
+        if self._cell is not None and not self._skip:
+            self._text.append(data)
+
+    def handle_comment(self, data):
+        self._flush_text()
+
+    def close(self):
+        super().close()
+        self._close_row()  # trang bị cắt cụt, thiếu </table>
+
+
+def iter_cell_rows(chunks: Iterable[str]) -> Iterator[list[str]]:
+    """
+    Text các ô <td> của từng dòng trong các bảng table-lich_hoc,
+    đọc HTML theo từng đoạn (chunks) và yield dòng ngay khi đóng xong.
+    """
+    parser = _ScheduleRowParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+        if parser.rows:
+            yield from parser.rows
+            parser.rows.clear()
+    parser.close()
+    yield from parser.rows
+    parser.rows.clear()
+
+
+def extract_schedule_rows(html: str) -> list[list[str]]:
+    """Text các ô <td> của từng dòng trong các bảng table-lich_hoc."""
+    return list(iter_cell_rows([html]))
+
+
+def _iter_schedule_fast(chunks: Iterable[str], class_name: str, bells: BellSchedule) -> Iterator[Session]:
+    for cells in iter_cell_rows(chunks):
+        session = session_from_cells(cells, class_name, bells)
+        if session is not None:
+            yield session
+
+
+def _check_engine(engine: str):
+    if engine not in PARSER_ENGINES:
+        raise ValueError(f"engine parse không hợp lệ: {engine!r} (chọn {', '.join(PARSER_ENGINES)})")
+
+
+def iter_schedule_rows(
+    html: str,
+    class_name: str = "",
+    engine: str = DEFAULT_ENGINE,
+    bells: BellSchedule = DEFAULT_BELLS,
+) -> Iterator[Session]:
+    """
+    Bản generator của parse_schedule_html: yield từng Session theo thứ tự
+    dòng trong trang, không dựng list.
+    """
+    _check_engine(engine)
+    if engine == "bs4":
+        return _iter_schedule_bs4(html, class_name, bells)
+    return _iter_schedule_fast([html], class_name, bells)
+
+
+def parse_schedule_html(
+    html: str,
+    class_name: str,
+    engine: str = DEFAULT_ENGINE,
+    bells: BellSchedule = DEFAULT_BELLS,
+) -> list[Session]:
+    """
+    Parse HTML lịch học của 1 lớp thành danh sách Session.
+    engine: "fast" (mặc định) hoặc "bs4", kết quả như nhau (xem check_parser.py).
+    bells: bảng giờ tiết (bell_schedule.BellSchedule).
+    """
+    return list(iter_schedule_rows(html, class_name, engine=engine, bells=bells))
+
+
+# ===== CẮT GỌN HTML (chỉ giữ bảng lịch) =====
+
+_SCHEDULE_TABLE_RE = re.compile(
+    r"""<table\b[^>]*\bclass\s*=\s*["'][^"']*\btable-lich_hoc\b[^"']*["'][^>]*>""",
+    re.IGNORECASE,
+)
+_TABLE_TAG_RE = re.compile(r"<(/?)table\b[^>]*>", re.IGNORECASE)
+
+
+def extract_schedule_tables(html: str) -> list[str]:
+    """
+    Cắt ra các bảng <table class="... table-lich_hoc ..."> nguyên văn
+    (kể cả bảng lồng bên trong), bỏ hết phần còn lại của trang.
+    """
+    tables: list[str] = []
+    pos = 0
+    while True:
+        m = _SCHEDULE_TABLE_RE.search(html, pos)
+        if not m:
+            break
+        depth = 0
+        end = len(html)
+        for t in _TABLE_TAG_RE.finditer(html, m.start()):
+            depth += -1 if t.group(1) else 1
+            if depth == 0:
+                end = t.end()
+                break
+        tables.append(html[m.start():end])
+        pos = end
+    return tables
+
+
+def build_schedule_fragment(
+    tables: list[str],
+    class_name: str,
+    semester: str,
+    fetched_at: str,
+) -> str:
+    """
+    Ghép các bảng lịch thành 1 file HTML nhỏ, kèm metadata (lớp, học kỳ,
+    thời điểm tải) trong <meta>. parse_schedule_html đọc được như trang gốc.
+    """
+    meta = "".join(
+        f'<meta name="{name}" content="{escape(str(value), quote=True)}">'
+        for name, value in (
+            ("schedule-class", class_name),
+            ("schedule-semester", semester),
+            ("fetched-at", fetched_at),
+        )
+    )
+    return (
+        f'<!DOCTYPE html><html><head><meta charset="utf-8">{meta}</head><body>\n'
+        + "\n".join(tables)
+        + "\n</body></html>\n"
+    )
+
+
+def iter_html_file(
+    path: str,
+    class_name: str,
+    engine: str = DEFAULT_ENGINE,
+    bells: BellSchedule = DEFAULT_BELLS,
+) -> Iterator[Session]:
+    """
+    Bản generator của parse_html_file. Engine "fast" đọc file theo từng
+    đoạn READ_CHUNK_SIZE nên không giữ cả file trong bộ nhớ.
+    """
+    _check_engine(engine)
     with open(path, 'r', encoding='utf-8') as f:
-        html = f.read()
-    return parse_schedule_html(html, class_name)
+        if engine == "bs4":
+            yield from _iter_schedule_bs4(f.read(), class_name, bells)
+        else:
+            chunks = iter(lambda: f.read(READ_CHUNK_SIZE), "")
+            yield from _iter_schedule_fast(chunks, class_name, bells)
+
+
+def parse_html_file(
+    path: str,
+    class_name: str,
+    engine: str = DEFAULT_ENGINE,
+    bells: BellSchedule = DEFAULT_BELLS,
+) -> list[Session]:
+    """
+    Đọc file HTML từ disk rồi parse.
+    """
+    return list(iter_html_file(path, class_name, engine=engine, bells=bells))
 
 
-def load_all_sessions(html_dir: str) -> list[Session]:
+def semester_dir(html_dir: str, semester: str | None = None) -> str:
+    """
+    Thư mục chứa file .html của học kỳ semester: html_dir/<semester>/ như
+    down_html.download_classes(semesters=...) ghi ra, None = chính html_dir.
+    """
+    return html_dir if semester is None else os.path.join(html_dir, str(semester))
+
+
+def list_html_files(html_dir: str) -> list[tuple[str, str]]:
+    """
+    [(class_name, path)] của các file .html trong html_dir, sắp theo tên file
+    để thứ tự Session không phụ thuộc hệ điều hành / thứ tự os.listdir.
+    """
+    files = []
+    for filename in sorted(os.listdir(html_dir)):
+        if not filename.lower().endswith('.html'):
+            continue
+        class_name = os.path.splitext(filename)[0]
+        files.append((class_name, os.path.join(html_dir, filename)))
+    return files
+
+
+def iter_sessions(
+    html_dir: str,
+    semester: str | None = None,
+    engine: str = DEFAULT_ENGINE,
+    bells: BellSchedule = DEFAULT_BELLS,
+) -> Iterator[Session]:
+    """
+    Bản generator của load_all_sessions (tuần tự, không cache): yield Session
+    của từng file theo thứ tự tên file, mỗi lúc chỉ đọc 1 file, nên duyệt
+    được hàng nghìn lớp (thống kê, kiểm tra trùng, xuất ICS...) mà bộ nhớ
+    không tăng theo số file.
+    """
+    for class_name, path in list_html_files(semester_dir(html_dir, semester)):
+        yield from iter_html_file(path, class_name, engine=engine, bells=bells)
+
+
+def _parse_file_job(job: tuple[str, str, str, BellSchedule]) -> list[Session]:
+    # hàm top-level để gửi được sang process con
+    path, class_name, engine, bells = job
+    return parse_html_file(path, class_name, engine=engine, bells=bells)
+
+
+def resolve_workers(workers: int | None) -> int:
+    """workers <= 0 hoặc None = dùng hết số nhân CPU."""
+    if not workers or workers <= 0:
+        return os.cpu_count() or 1
+    return workers
+
+
+def parse_html_files(
+    files: list[tuple[str, str]],
+    engine: str = DEFAULT_ENGINE,
+    workers: int | None = 1,
+    cache=None,
+    bells: BellSchedule = DEFAULT_BELLS,
+) -> list[list[Session]]:
+    """
+    Parse các file [(class_name, path)] (xem list_html_files), trả về list
+    Session của từng file theo đúng thứ tự files. workers / cache / bells
+    như load_all_sessions; file parse mới được cache.store() nhưng không
+    save(), bên gọi tự save khi xong.
+    """
+    jobs = [(path, class_name, engine, bells) for class_name, path in files]
+
+    per_file: list[list[Session] | None] = [None] * len(jobs)
+    stamps: list[tuple | None] = [None] * len(jobs)
+    if cache is not None:
+        fingerprint = bells.fingerprint()
+        for i, job in enumerate(jobs):
+            per_file[i], stamps[i] = cache.lookup(job[0], fingerprint)
+            if per_file[i] is not None:
+                bells.count_unknown(per_file[i])
+    todo = [i for i, sessions in enumerate(per_file) if sessions is None]
+
+    workers = min(resolve_workers(workers), len(todo))
+    if workers <= 1 or len(todo) < PARALLEL_MIN_FILES:
+        parsed = map(_parse_file_job, (jobs[i] for i in todo))
+        for i, sessions in zip(todo, parsed):
+            per_file[i] = sessions
+    else:
+        # chia thành vài chunk / process để giảm số lần gửi qua lại giữa các process
+        chunksize = max(1, len(todo) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # map() trả kết quả đúng thứ tự jobs dù file nào parse xong trước
+            parsed = pool.map(_parse_file_job, [jobs[i] for i in todo], chunksize=chunksize)
+            for i, sessions in zip(todo, parsed):
+                per_file[i] = sessions
+                # process con đếm tiết lạ trên bản sao bells của nó
+                bells.count_unknown(sessions)
+
+    if cache is not None:
+        for i in todo:
+            cache.store(jobs[i][0], stamps[i], per_file[i])
+    return per_file
+
+
+def load_all_sessions(
+    html_dir: str,
+    semester: str | None = None,
+    engine: str = DEFAULT_ENGINE,
+    workers: int | None = 1,
+    cache=None,
+    bells: BellSchedule = DEFAULT_BELLS,
+) -> list[Session]:
     """
     Đọc tất cả file .html trong thư mục html_dir,
     mỗi file coi như lịch của 1 lớp.
     Tên lớp = tên file (bỏ .html).
+
+    semester: đọc thư mục con html_dir/<semester>/ (xem
+    down_html.download_classes(semesters=...)) thay vì html_dir.
+
+    workers: số process parse song song (1 = tuần tự, 0/None = số nhân CPU).
+    Kết quả luôn theo thứ tự tên file, song song hay tuần tự đều như nhau.
+
+    cache: parse_cache.ParseCache (None = không dùng). Chỉ file mới / đã
+    đổi (hoặc parse với bảng giờ khác) mới phải parse, cache được ghi ra
+    đĩa khi xong.
+
+    bells: bảng giờ tiết; tiết lạ của mọi buổi trả về (kể cả lấy từ cache
+    hay process con) được đếm trong bells.unknown.
     """
-    all_sessions: list[Session] = []
+    html_dir = semester_dir(html_dir, semester)
+    files = list_html_files(html_dir)
+    per_file = parse_html_files(files, engine=engine, workers=workers, cache=cache, bells=bells)
 
-    for filename in os.listdir(html_dir):
-        if not filename.lower().endswith('.html'):
-            continue
+    if cache is not None:
+        cache.prune(html_dir, {path for _, path in files})
+        cache.save()
 
-        class_name = os.path.splitext(filename)[0]
-        path = os.path.join(html_dir, filename)
+    return [s for sessions in per_file for s in sessions]
 
-        sessions = parse_html_file(path, class_name)
-        all_sessions.extend(sessions)
 
-    return all_sessions
+def load_sessions_by_semester(
+    html_dir: str,
+    semesters: list[str],
+    engine: str = DEFAULT_ENGINE,
+    workers: int | None = 1,
+    cache=None,
+    bells: BellConfig | BellSchedule = DEFAULT_BELLS,
+) -> dict[str, list[Session]]:
+    """
+    Đọc nhiều học kỳ cùng lúc: {semester: list[Session]}.
+    Mỗi học kỳ giữ riêng để build_course_options không gộp nhầm
+    lịch của cùng 1 lớp ở 2 học kỳ khác nhau.
+    Học kỳ chưa có thư mục thì trả về list rỗng.
+
+    bells: 1 bảng giờ cho mọi học kỳ, hoặc BellConfig để mỗi học kỳ
+    dùng bảng giờ của nó (bell_schedule_by_semester).
+    """
+    result: dict[str, list[Session]] = {}
+    for sem in semesters:
+        sem_bells = bells.for_semester(sem) if isinstance(bells, BellConfig) else bells
+        try:
+            result[str(sem)] = load_all_sessions(
+                html_dir, semester=sem, engine=engine, workers=workers, cache=cache,
+                bells=sem_bells,
+            )
+        except FileNotFoundError:
+            result[str(sem)] = []
+    return result
@@ -0,0 +1,125 @@
+# pipeline.py
+"""
+Pipeline tải -> parse -> đưa vào index chạy gối nhau:
+mỗi lớp tải xong được parse ngay trên worker (không đọc lại từ đĩa),
+trong khi các lớp khác vẫn đang tải. Bên gọi nhận Session theo từng lớp
+ngay khi có, nên GUI hiện được môn đầu tiên trước khi tải xong lớp cuối.
+
+    options = {}
+    for res, sessions in iter_class_sessions(["D20CQCN01-N", ...]):
+        merge_course_options(options, sessions, [res.class_code])
+"""
+import os
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterator
+
+from bell_schedule import DEFAULT_BELLS, BellConfig, BellSchedule
+from down_html import OUT_DIR, DownloadResult, download_classes
+from models import Session
+from parse_cache import ParseCache
+from parser_html import DEFAULT_ENGINE, parse_html_file, parse_schedule_html
+
+_DONE = object()
+
+
+def _parse_result(
+    res: DownloadResult,
+    out_dir: str,
+    parser_engine: str = DEFAULT_ENGINE,
+    bells: BellConfig | BellSchedule = DEFAULT_BELLS,
+    parse_cache: ParseCache | None = None,
+) -> tuple[DownloadResult, list[Session]]:
+    """
+    Parse nội dung 1 lớp vừa tải. Lớp không có html trong bộ nhớ (bỏ qua do
+    cache, hoặc tải lỗi) thì đọc file cũ trên đĩa nếu còn, giống như khi
+    reload cả thư mục. Lỗi parse 1 lớp không làm hỏng cả đợt.
+
+    parse_cache: file trên đĩa chưa đổi từ lần parse trước (lớp "cached" /
+    "unchanged") thì lấy luôn Session đã parse, không parse lại.
+    """
+    if isinstance(bells, BellConfig):
+        bells = bells.for_semester(res.semester)
+    try:
+        path = res.path or os.path.join(out_dir, res.semester or "", f"{res.class_code}.html")
+        stamp = None
+        if parse_cache is not None and os.path.exists(path):
+            sessions, stamp = parse_cache.lookup(path, bells.fingerprint())
+            if sessions is not None:
+                bells.count_unknown(sessions)
+                return res, sessions
+
+        if res.html is not None:
+            # html trong bộ nhớ chính là nội dung vừa ghi ra path
+            sessions = parse_schedule_html(
+                res.html, res.class_code, engine=parser_engine, bells=bells,
+            )
+        elif os.path.exists(path):
+            sessions = parse_html_file(path, res.class_code, engine=parser_engine, bells=bells)
+        else:
+            return res, []
+        if stamp is not None:
+            parse_cache.store(path, stamp, sessions)
+        return res, sessions
+    except Exception as e:
+        print(f"⛔ Lỗi parse lịch lớp {res.class_code}: {e}")
+    return res, []
+
+
+def iter_class_sessions(
+    class_codes: list[str],
+    out_dir: str = OUT_DIR,
+    parse_workers: int = 2,
+    parser_engine: str = DEFAULT_ENGINE,
+    bells: BellConfig | BellSchedule = DEFAULT_BELLS,
+    parse_cache: ParseCache | None = None,
+    **download_kwargs,
+) -> Iterator[tuple[DownloadResult, list[Session]]]:
+    """
+    Tải các lớp (download_classes chạy ở luồng nền) và yield
+    (DownloadResult, list[Session]) của từng lớp ngay khi lớp đó parse xong.
+    Thứ tự yield = thứ tự xong, không phải thứ tự class_codes.
+    parser_engine: engine của parser_html.parse_schedule_html ("fast" / "bs4").
+    bells: bảng giờ tiết, hoặc BellConfig để chọn theo học kỳ của từng lớp.
+    parse_cache: parse_cache.ParseCache dùng chung với load_all_sessions;
+    bên gọi tự save() khi xong.
+
+    download_kwargs được chuyển thẳng cho download_classes
+    (max_workers, engine, cache, retry, store_mode, ...).
+    """
+    out: queue.Queue = queue.Queue()
+    parse_pool = ThreadPoolExecutor(max_workers=max(1, parse_workers))
+
+    def on_result(res: DownloadResult, done: int, total: int):
+        fut = parse_pool.submit(_parse_result, res, out_dir, parser_engine, bells, parse_cache)
+        fut.add_done_callback(out.put)
+
+    def producer():
+        try:
+            download_classes(
+                class_codes,
+                out_dir=out_dir,
+                on_result=on_result,
+                keep_html=True,
+                **download_kwargs,
+            )
+        except Exception as e:
+            out.put(e)
+        finally:
+            # chờ parse nốt các lớp đã tải rồi mới báo xong
+            parse_pool.shutdown(wait=True)
+            out.put(_DONE)
+
+    threading.Thread(target=producer, daemon=True).start()
+
+    while True:
+        item = out.get()
+        if item is _DONE:
+            break
+        if isinstance(item, Exception):
+            raise item
+        fut: Future = item
+        res, sessions = fut.result()
+        res.html = None  # parse xong thì bỏ, đỡ tốn bộ nhớ
+        yield res, sessions
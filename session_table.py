@@ -0,0 +1,217 @@
+# session_table.py
+"""
+Bảng lịch dạng cột (columnar) cho dữ liệu cả học kỳ.
+
+Mỗi trường của Session là 1 cột array (module array, không cần numpy):
+  - cột chuỗi (môn, lớp, GV, phòng, ngày...) được mã hoá từ điển:
+    cột chỉ lưu mã số nguyên, chuỗi thật nằm 1 lần trong self.values[col]
+  - group, day, start_min, end_min lưu thẳng dạng số
+
+Dùng cho thống kê / lọc hàng loạt và làm nguồn dữ liệu cho
+logic.build_course_options:
+
+    table = SessionTable.from_sessions(sessions)       # hoặc from_html_dir(...)
+    rows = table.select(class_name="D20CQCN01-N", date_from="01-09-2025")
+    table.sessions(rows)                               # -> list[Session] khi cần
+"""
+from array import array
+from itertools import islice
+from operator import attrgetter
+from typing import Iterable, Iterator
+
+from bell_schedule import DEFAULT_BELLS, BellSchedule
+from models import SESSION_FIELDS, Session, date_ordinal, make_session
+
+# Cột chuỗi mã hoá từ điển (theo thứ tự trường của Session)
+STRING_COLUMNS = tuple(name for name in SESSION_FIELDS if name != "group")
+
+# Số dòng mã hoá mỗi lượt trong extend() (đọc từ generator thì chỉ giữ chừng này)
+BATCH_SIZE = 4096
+
+
+NUMERIC_COLUMNS = {"group": "i", "day": "i", "start_min": "H", "end_min": "H"}
+
+
+class SessionTable:
+    """
+    Các cột cùng độ dài, dòng i của mọi cột là 1 buổi học.
+
+    keep_objects=True (from_sessions): giữ luôn object Session gốc, session(i)
+    trả lại đúng object đó; cột chỉ được mã hoá khi dùng tới lần đầu (vd.
+    build_course_options chỉ cần 4 cột khoá).
+    keep_objects=False (from_html_dir): không giữ Session nào, mọi cột được
+    mã hoá ngay, session(i) dựng Session mới từ các cột.
+    """
+
+    def __init__(self, keep_objects: bool = False):
+        self._cols: dict[str, array] = {name: array("I") for name in STRING_COLUMNS}
+        self._cols.update({name: array(t) for name, t in NUMERIC_COLUMNS.items()})
+        self.values: dict[str, list[str]] = {name: [] for name in STRING_COLUMNS}
+        self._lookup: dict[str, dict[str, int]] = {name: {} for name in STRING_COLUMNS}
+        self._objects: list[Session] | None = [] if keep_objects else None
+        self._size = 0
+
+    # ===== DỰNG BẢNG =====
+
+    @classmethod
+    def from_sessions(cls, sessions: Iterable[Session], keep_objects: bool = True) -> "SessionTable":
+        table = cls(keep_objects=keep_objects)
+        table.extend(sessions)
+        return table
+
+    @classmethod
+    def from_html_dir(
+        cls,
+        html_dir: str,
+        semester: str | None = None,
+        engine: str | None = None,
+        bells: BellSchedule = DEFAULT_BELLS,
+    ) -> "SessionTable":
+        """
+        Parse thẳng từ thư mục HTML vào bảng, không giữ list Session nào.
+        bells: bảng giờ tiết dùng khi parse.
+        """
+        from parser_html import DEFAULT_ENGINE, iter_sessions
+
+        table = cls(keep_objects=False)
+        table.extend(iter_sessions(
+            html_dir, semester=semester, engine=engine or DEFAULT_ENGINE,
+            bells=bells,
+        ))
+        return table
+
+    def _encode(self, name: str, batch: list[Session]):
+        col = self._cols[name]
+        if name in NUMERIC_COLUMNS:
+            col.extend(map(attrgetter(name), batch))
+            return
+        lookup = self._lookup[name]
+        known = len(lookup)
+        put = lookup.setdefault
+        # giá trị mới nhận mã = số giá trị đã có (len tính trước setdefault)
+        col.extend([put(v, len(lookup)) for v in map(attrgetter(name), batch)])
+        if len(lookup) > known:
+            # dict giữ thứ tự chèn: các key mới nằm cuối, đúng thứ tự mã
+            self.values[name].extend(islice(lookup, known, None))
+
+    def extend(self, sessions: Iterable[Session]):
+        if self._objects is not None:
+            # cột được mã hoá sau, khi column() cần tới
+            self._objects.extend(sessions)
+            self._size = len(self._objects)
+            return
+        # mã hoá theo từng cột, từng lô: nhanh hơn nhiều so với từng dòng
+        it = iter(sessions)
+        while True:
+            batch = list(islice(it, BATCH_SIZE))
+            if not batch:
+                break
+            for name in self._cols:
+                self._encode(name, batch)
+            self._size += len(batch)
+
+    def append(self, s: Session):
+        self.extend((s,))
+
+    def __len__(self) -> int:
+        return self._size
+
+    # ===== ĐỌC =====
+
+    def column(self, name: str) -> array:
+        """Cột name (mã số với cột chuỗi), mã hoá nốt các dòng mới nếu cần."""
+        col = self._cols[name]
+        if len(col) < self._size:
+            self._encode(name, self._objects[len(col):])
+        return col
+
+    def code_of(self, column: str, value: str) -> int | None:
+        """Mã của value trong cột chuỗi column, None nếu không có dòng nào."""
+        self.column(column)
+        return self._lookup[column].get(value)
+
+    def value(self, column: str, row: int) -> str | int:
+        if column in NUMERIC_COLUMNS:
+            return self.column(column)[row]
+        return self.values[column][self.column(column)[row]]
+
+    def session(self, row: int) -> Session:
+        """Session của dòng row (object gốc nếu keep_objects, không thì dựng mới)."""
+        if self._objects is not None:
+            return self._objects[row]
+        return make_session(*(self.value(name, row) for name in SESSION_FIELDS))
+
+    def sessions(self, rows: Iterable[int] | None = None) -> list[Session]:
+        if rows is None:
+            rows = range(len(self))
+        if self._objects is not None:
+            objects = self._objects
+            return [objects[i] for i in rows]
+        return [self.session(i) for i in rows]
+
+    def __iter__(self) -> Iterator[Session]:
+        for i in range(len(self)):
+            yield self.session(i)
+
+    # ===== LỌC =====
+
+    def select(
+        self,
+        course_code: str | None = None,
+        subject_name: str | None = None,
+        class_name: str | None = None,
+        group: int | None = None,
+        date_from: str | int | None = None,
+        date_to: str | int | None = None,
+        rows: Iterable[int] | None = None,
+    ) -> array:
+        """
+        Chỉ số các dòng thoả mọi điều kiện đã cho (điều kiện None = bỏ qua).
+        date_from / date_to: 'dd-mm-yyyy' hoặc ordinal, tính cả 2 đầu.
+        rows: chỉ lọc trong các dòng này (vd. kết quả select trước đó).
+        """
+        result = array("I", range(len(self)) if rows is None else rows)
+
+        for name, value in (
+            ("course_code", course_code),
+            ("subject_name", subject_name),
+            ("class_name", class_name),
+            ("group", group),
+        ):
+            if value is None:
+                continue
+            code = value if name in NUMERIC_COLUMNS else self.code_of(name, value)
+            if code is None:
+                return array("I")
+            col = self.column(name)
+            result = array("I", [i for i in result if col[i] == code])
+
+        if date_from is not None or date_to is not None:
+            lo = date_ordinal(date_from) if isinstance(date_from, str) else (date_from or 0)
+            hi = date_ordinal(date_to) if isinstance(date_to, str) else date_to
+            col = self.column("day")
+            if hi is None:
+                result = array("I", [i for i in result if col[i] >= lo])
+            else:
+                result = array("I", [i for i in result if lo <= col[i] <= hi])
+
+        return result
+
+    def group_rows(self, columns: tuple[str, ...]) -> dict[tuple, list[int]]:
+        """
+        Gom chỉ số dòng theo giá trị các cột (mã số với cột chuỗi),
+        giữ thứ tự xuất hiện đầu tiên của mỗi nhóm và thứ tự dòng trong nhóm.
+        """
+        cols = [self.column(name) for name in columns]
+        groups: dict[tuple, list[int]] = {}
+        for i, key in enumerate(zip(*cols)):
+            bucket = groups.get(key)
+            if bucket is None:
+                groups[key] = [i]
+            else:
+                bucket.append(i)
+        return groups
+
+    def nbytes(self) -> int:
+        """Số byte của các cột đã mã hoá (không tính chuỗi trong từ điển)."""
+        return sum(len(c) * c.itemsize for c in self._cols.values())
@@ -0,0 +1,7 @@
+# tests/conftest.py
+# Các module của app nằm phẳng ở thư mục gốc repo (không phải package):
+# cho phép test import thẳng, chạy pytest từ thư mục nào cũng được.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
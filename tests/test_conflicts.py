@@ -0,0 +1,66 @@
+# tests/test_conflicts.py
+"""
+logic.find_conflicts (mask theo ngày) phải cho đúng các cặp trùng, đúng thứ
+tự và đúng object như find_conflicts bản gốc (bench_conflicts.baseline_find_conflicts).
+"""
+import random
+from argparse import Namespace
+
+import pytest
+
+from bench_conflicts import baseline_find_conflicts, build_students
+from logic import find_conflicts
+from models import make_session
+
+
+def same_pairs(a: list, b: list) -> bool:
+    return len(a) == len(b) and all(x[0] is y[0] and x[1] is y[1] for x, y in zip(a, b))
+
+
+def make(i: int, date: str, start: str, end: str, period: str = "1 -> 2"):
+    return make_session(f"{i:03d}", f"Môn {i}", "Lý thuyết", 0, period, "GV", "A101", date, start, end, "L")
+
+
+@pytest.mark.parametrize("seed,clash", [(1, 0.2), (2, 0.6), (3, 1.0)])
+def test_same_as_baseline_on_generated_schedules(seed, clash):
+    args = Namespace(students=150, courses=8, catalog=60, weeks=6, clash=clash, seed=seed)
+    students = build_students(args)
+    for sessions in students:
+        assert same_pairs(find_conflicts(sessions), baseline_find_conflicts(sessions))
+    assert any(find_conflicts(s) for s in students)
+
+
+def test_same_as_baseline_on_random_times():
+    # giờ bất kỳ (không theo tiết), nhiều buổi cùng ngày, kể cả buổi 0 phút
+    rnd = random.Random(7)
+    for _ in range(300):
+        sessions = []
+        for i in range(rnd.randint(0, 25)):
+            start = rnd.randrange(7 * 60, 20 * 60, 5)
+            end = start + rnd.choice([0, 5, 45, 50, 95, 150])
+            sessions.append(make(
+                i, f"{rnd.randint(1, 4):02d}-09-2025",
+                f"{start // 60:02d}{start % 60:02d}00", f"{end // 60:02d}{end % 60:02d}00",
+            ))
+        assert same_pairs(find_conflicts(sessions), baseline_find_conflicts(sessions))
+
+
+def test_edge_times():
+    sessions = [
+        make(1, "01-09-2025", "070000", "084500"),
+        make(2, "01-09-2025", "070000", "074500", period="x"),   # cùng giờ bắt đầu
+        make(3, "01-09-2025", "080000", "080000", period="?"),   # 0 phút, nằm trong buổi 1
+        make(4, "01-09-2025", "090000", "083000", period="?"),   # kết thúc trước bắt đầu
+        make(5, "02-09-2025", "085000", "094000"),
+        make(6, "02-09-2025", "094000", "104000"),               # chỉ chạm nhau, không trùng
+    ]
+    conflicts = find_conflicts(sessions)
+    assert same_pairs(conflicts, baseline_find_conflicts(sessions))
+    assert [(a.course_code, b.course_code) for a, b in conflicts] == [("002", "001"), ("001", "003")]
+
+
+def test_unknown_date_is_ignored():
+    # bản gốc lỗi ValueError với ngày không đọc được; bản mới bỏ qua buổi đó
+    known = [make(1, "01-09-2025", "070000", "084500"), make(2, "01-09-2025", "080000", "090000")]
+    unknown = make(3, "chưa xếp", "070000", "084500")
+    assert same_pairs(find_conflicts(known + [unknown]), baseline_find_conflicts(known))
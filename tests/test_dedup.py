@@ -0,0 +1,106 @@
+# tests/test_dedup.py
+"""
+Option dựng từ SessionDedup phải giống option dựng từ list Session gốc:
+cùng key, cùng buổi theo đúng thứ tự; chỉ khác class_name của buổi dùng
+chung (lớp thật lấy từ key, xem logic.session_classes).
+"""
+import random
+
+from logic import (
+    SessionDedup,
+    build_course_options,
+    create_ics_from_sessions,
+    merge_course_options,
+    section_key,
+    session_classes,
+)
+from models import make_session
+
+
+def make(code: str, group: int, date: str, class_name: str, period: str = "1 -> 2"):
+    kind = "Lý thuyết" if group == 0 else "Thực hành"
+    return make_session(code, f"Môn {code}", kind, group, period, "GV", "A101", date, "070000", "084500", class_name)
+
+
+def random_semester(seed: int, classes: int = 6) -> list:
+    """Mỗi lớp lấy ngẫu nhiên 1 phần các buổi chung, theo thứ tự ngẫu nhiên, kèm vài buổi riêng."""
+    rnd = random.Random(seed)
+    shared = [
+        (f"{c:03d}", g, f"{d:02d}-09-2025")
+        for c in range(8) for g in (0, 1, 2) for d in range(1, 6)
+    ]
+    rows = []
+    for k in range(classes):
+        class_name = f"K{k + 1}"
+        picked = rnd.sample(shared, rnd.randint(10, len(shared)))
+        picked += [(f"9{k:02d}", rnd.choice([0, 1]), f"{d:02d}-10-2025") for d in range(1, 4)]
+        if rnd.random() < 0.5:
+            picked.append(picked[0])  # dòng lặp lại ngay trong 1 lớp
+        rows += [make(code, g, date, class_name) for code, g, date in picked]
+    return rows
+
+
+def shape(options: dict) -> dict:
+    return {key: [section_key(s) for s in sessions] for key, sessions in options.items()}
+
+
+def test_same_options_as_flat_list():
+    for seed in range(5):
+        rows = random_semester(seed)
+        flat = build_course_options(rows)
+        dedup = SessionDedup(rows)
+        options = build_course_options(dedup)
+        assert shape(options) == shape(flat)
+        assert dedup.stats().removed > 0
+        # lớp của từng buổi lấy theo key option thì trùng với list gốc
+        for key in options:
+            assert set(session_classes(options, [key]).values()) == {key[2]}
+
+
+def test_keeps_each_class_order():
+    rows = [
+        make("001", 0, "02-09-2025", "A"),
+        make("001", 0, "03-09-2025", "A"),
+        make("001", 0, "03-09-2025", "B"),
+        make("001", 0, "02-09-2025", "B"),
+    ]
+    options = build_course_options(SessionDedup(rows))
+    assert [s.date for s in options[("001", "Môn 001", "B", 0)]] == ["03-09-2025", "02-09-2025"]
+    assert [s.date for s in options[("001", "Môn 001", "A", 0)]] == ["02-09-2025", "03-09-2025"]
+
+
+def test_classes_share_session_objects():
+    rows = [make("001", 0, "02-09-2025", "A"), make("001", 0, "02-09-2025", "B")]
+    options = build_course_options(SessionDedup(rows))
+    a, b = options[("001", "Môn 001", "A", 0)], options[("001", "Môn 001", "B", 0)]
+    assert a[0] is b[0]
+
+
+def test_incremental_merge_matches_full_build():
+    rows = random_semester(11)
+    first = [s for s in rows if s.class_name in ("K1", "K2")]
+    dedup = SessionDedup(first)
+    options = build_course_options(dedup)
+
+    # thêm các lớp còn lại, rồi nạp lại K1 với lịch mới (bỏ 1 buổi)
+    rest = [s for s in rows if s.class_name not in ("K1", "K2")]
+    dedup.add(rest)
+    merge_course_options(options, dedup, sorted({s.class_name for s in rest}))
+    k1 = [s for s in rows if s.class_name == "K1"][1:]
+    dedup.remove_classes(["K1"])
+    dedup.add(k1)
+    merge_course_options(options, dedup, ["K1"])
+
+    expected = [s for s in rows if s.class_name != "K1"] + k1
+    assert shape(options) == shape(build_course_options(expected))
+    assert len(dedup) == len({section_key(s) for s in expected})
+
+
+def test_ics_uses_class_of_option(tmp_path):
+    rows = [make("001", 0, "02-09-2025", "K1"), make("001", 0, "02-09-2025", "K2")]
+    options = build_course_options(SessionDedup(rows))
+    key = ("001", "Môn 001", "K2", 0)
+    out = tmp_path / "k2.ics"
+    create_ics_from_sessions(options[key], str(out), classes=session_classes(options, [key]))
+    text = out.read_text(encoding="utf-8")
+    assert "Lớp: K2" in text and "Lớp: K1" not in text
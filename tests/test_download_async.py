@@ -0,0 +1,93 @@
+# tests/test_download_async.py
+"""
+Engine "async" (httpx) chạy trên mock_portal: kết quả giống engine
+"thread", và lớp quá hạn / bị huỷ không còn ghi file về sau.
+"""
+import asyncio
+import json
+import os
+import time
+
+import pytest
+
+pytest.importorskip("httpx")
+
+from down_html import DownloadConfig, RetryPolicy, download_classes, download_classes_async
+from html_cache import MANIFEST_NAME, DownloadCache
+from mock_portal import start_mock_portal
+from parser_html import load_all_sessions
+
+CODES = [f"K{i:02d}" for i in range(8)]
+
+
+@pytest.fixture
+def portal():
+    servers = []
+
+    def start(**options):
+        server, url = start_mock_portal(**options)
+        servers.append(server)
+        return server, url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def html_files(path) -> dict[str, bytes]:
+    return {p.name: p.read_bytes() for p in path.glob("*.html")}
+
+
+def test_same_files_as_thread_engine(tmp_path, portal):
+    server, url = portal(n_rows=10)
+    for engine in ("thread", "async"):
+        rejected = server.stats["rejected"]
+        results = download_classes(
+            CODES, url=url, out_dir=str(tmp_path / engine), engine=engine,
+            config=DownloadConfig(), semesters=["38"], max_workers=2,
+            # server đổi state giữa đợt tải, các lớp sau phải tự lấy lại
+            on_result=lambda res, done, total: done == 1 and server.rotate_viewstate(),
+        )
+        assert [r.status for r in results] == ["ok"] * len(CODES)
+        assert server.stats["rejected"] > rejected
+    # trang có __VIEWSTATE nên so lịch đã parse chứ không so byte
+    assert load_all_sessions(str(tmp_path / "thread"), "38") == load_all_sessions(str(tmp_path / "async"), "38")
+
+
+def test_timeout_does_not_write_later(tmp_path, portal):
+    _, url = portal(n_rows=5, latency=0.5)
+    results = download_classes(
+        CODES[:3], url=url, out_dir=str(tmp_path), engine="async", timeout=0.1,
+        config=DownloadConfig(), cache=DownloadCache(str(tmp_path)),
+        retry=RetryPolicy(max_attempts=2, base_delay=0.01, max_delay=0.01),
+        max_consecutive_failures=0,
+    )
+    assert {(r.status, r.attempts) for r in results} == {("error", 2)}
+    assert all("Timeout" in r.error for r in results)
+    time.sleep(0.6)  # server trả lời xong thì kết nối đã đóng, không ai ghi file
+    assert html_files(tmp_path) == {}
+
+
+def test_cancel_keeps_files_and_manifest_in_sync(tmp_path, portal):
+    _, url = portal(n_rows=5, latency=0.3)
+    cache = DownloadCache(str(tmp_path))
+
+    async def run():
+        task = asyncio.ensure_future(download_classes_async(
+            CODES, concurrency=3, url=url, out_dir=str(tmp_path),
+            config=DownloadConfig(), cache=cache,
+        ))
+        await asyncio.sleep(0.45)  # đợt đầu xong, đợt 2 đang chờ server
+        t0 = time.perf_counter()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return time.perf_counter() - t0
+
+    assert asyncio.run(run()) < 0.2
+    time.sleep(0.4)
+    with open(tmp_path / MANIFEST_NAME, encoding="utf-8") as f:
+        entries = json.load(f)["entries"]
+    written = set(html_files(tmp_path))
+    assert 0 < len(written) < len(CODES)
+    assert written == {os.path.basename(key) for key in entries}
@@ -0,0 +1,45 @@
+# tests/test_html_watch.py
+"""
+HtmlDirWatcher phải theo dõi đúng thư mục load_all_sessions đọc, và file
+chỉ bị ghi lại y hệt thì parse_html_files lấy từ ParseCache.
+"""
+import os
+import shutil
+
+from html_watch import HtmlDirWatcher
+from parse_cache import ParseCache
+from parser_html import load_all_sessions, parse_html_files
+
+PAGE = os.path.join(os.path.dirname(__file__), "pages", "D20CQCN01-N.html")
+
+
+def test_watches_semester_folder(tmp_path):
+    sem_dir = tmp_path / "37"
+    sem_dir.mkdir()
+    watcher = HtmlDirWatcher(str(tmp_path), "37")
+    shutil.copy(PAGE, sem_dir / "A.html")
+    shutil.copy(PAGE, tmp_path / "TOP.html")  # thư mục khác học kỳ, bỏ qua
+
+    changes = watcher.poll()
+    assert changes.added == ["A"] and not changes.changed
+    assert watcher.path_of("A") == str(sem_dir / "A.html")
+    loaded = {s.class_name for s in load_all_sessions(str(tmp_path), "37")}
+    assert loaded == set(watcher.snapshot) == {"A"}
+
+    os.remove(sem_dir / "A.html")
+    assert watcher.poll().removed == ["A"]
+
+
+def test_rewritten_file_comes_from_cache(tmp_path):
+    path = tmp_path / "A.html"
+    shutil.copy(PAGE, path)
+    files = [("A", str(path))]
+    cache = ParseCache(str(tmp_path))
+    (first,) = parse_html_files(files, cache=cache)
+    cache.save()
+
+    path.write_bytes(path.read_bytes())  # mtime đổi, nội dung y hệt
+    cache = ParseCache(str(tmp_path))
+    (again,) = parse_html_files(files, cache=cache)
+    assert (cache.hits, cache.misses) == (1, 0)
+    assert again == first
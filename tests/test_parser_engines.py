@@ -0,0 +1,92 @@
+# tests/test_parser_engines.py
+"""
+Engine "fast" phải parse ra đúng cùng danh sách Session với engine "bs4"
+(code gốc) trên các trang mẫu trong tests/pages: trang đầy đủ, bản chỉ giữ
+bảng lịch, và các dòng khó (bảng rỗng, thiếu tiết, tiết lạ, bảng cụt...).
+Tên lớp = tên file tới dấu chấm đầu tiên.
+"""
+import os
+
+import pytest
+
+from bell_schedule import DEFAULT_PERIODS, BellSchedule
+from parser_html import PARSER_ENGINES, parse_html_file, parse_schedule_html
+
+PAGES_DIR = os.path.join(os.path.dirname(__file__), "pages")
+PAGES = sorted(f for f in os.listdir(PAGES_DIR) if f.endswith(".html"))
+
+
+def read_page(filename: str) -> str:
+    with open(os.path.join(PAGES_DIR, filename), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def class_of(filename: str) -> str:
+    return filename.split(".", 1)[0]
+
+
+def parse_both(filename: str) -> dict[str, tuple[list, BellSchedule]]:
+    """{engine: (sessions, bảng giờ riêng đã đếm tiết lạ)} cho 1 trang."""
+    html = read_page(filename)
+    out = {}
+    for engine in PARSER_ENGINES:
+        bells = BellSchedule(DEFAULT_PERIODS)
+        out[engine] = parse_schedule_html(html, class_of(filename), engine=engine, bells=bells), bells
+    return out
+
+
+@pytest.mark.parametrize("filename", PAGES)
+def test_engines_give_same_sessions(filename):
+    out = parse_both(filename)
+    fast, fast_bells = out["fast"]
+    bs4, bs4_bells = out["bs4"]
+    assert fast == bs4
+    # == không so day / start_min / end_min (trường tính sẵn)
+    assert [(s.day, s.start_min, s.end_min) for s in fast] == [(s.day, s.start_min, s.end_min) for s in bs4]
+    assert fast_bells.unknown == bs4_bells.unknown
+
+
+@pytest.mark.parametrize("filename", PAGES)
+def test_file_stream_matches_string_parse(filename):
+    # engine "fast" đọc file theo từng đoạn, phải ra như parse cả chuỗi
+    path = os.path.join(PAGES_DIR, filename)
+    for engine in PARSER_ENGINES:
+        assert parse_html_file(path, class_of(filename), engine=engine) == parse_schedule_html(
+            read_page(filename), class_of(filename), engine=engine,
+        )
+
+
+def test_full_page():
+    sessions, _ = parse_both("D20CQCN01-N.html")["fast"]
+    assert len(sessions) == 40
+    assert {s.class_name for s in sessions} == {"D20CQCN01-N"}
+    assert all(s.day and s.start_min < s.end_min for s in sessions)
+
+
+def test_empty_table():
+    for sessions, bells in parse_both("empty-table.html").values():
+        assert sessions == []
+        assert not bells.unknown
+
+
+def test_missing_period():
+    for sessions, bells in parse_both("missing-period.html").values():
+        assert [s.lesson_period for s in sessions] == ["", ""]
+        assert [(s.start, s.end) for s in sessions] == [("070000", "074500")] * 2
+        assert [s.group for s in sessions] == [0, 1]
+        assert bells.unknown == {"": 2}
+
+
+def test_unknown_bell():
+    for sessions, bells in parse_both("unknown-bell.html").values():
+        assert [(s.start, s.end) for s in sessions] == [
+            ("070000", "074500"),   # tiết 15, 16 không có trong bảng giờ
+            ("070000", "074500"),   # tiết đầu > tiết cuối
+            ("182500", "210500"),
+        ]
+        assert bells.unknown == {"15 -> 16": 1, "3 -> 1": 1}
+
+
+def test_end_of_course_row_is_skipped():
+    for sessions, _ in parse_both("ket-thuc-row.html").values():
+        assert [s.subject_name for s in sessions] == ["Mạng"]